@@ -0,0 +1,16 @@
+"""
+API HTTP local (JSON) de solo lectura sobre la biblioteca, para otras
+herramientas (proyección, pantallas). Es opcional: la app no la arranca.
+
+Uso (desde src/):
+    python -m api --port 8765
+    curl -s "http://127.0.0.1:8765/songs?q=santo&key=Re&limit=20"
+    curl -s http://127.0.0.1:8765/songs/12
+    curl -s http://127.0.0.1:8765/characters
+
+Rutas:
+    /songs          búsqueda (q, key, character, tempo, match_all, sort, desc,
+                    offset, limit; lyrics=1 busca en las letras)
+    /songs/<id>     registro completo con letra y acordes
+    /characters     caracteres disponibles
+"""
@@ -0,0 +1,35 @@
+"""
+Arranque de la API desde la línea de comandos (python -m api).
+"""
+import argparse
+import asyncio
+
+from models import SongApp
+
+from .server import ApiServer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m api", description="API HTTP local de la biblioteca")
+    parser.add_argument("--data-dir", default=None, help="directorio de datos (por defecto, el de la app)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    app = SongApp(data_dir=args.data_dir)
+    # Solo lectura: sin copias automáticas
+    app.store.backup_interval = None
+    server = ApiServer(app, args.host, args.port)
+
+    async def run():
+        await server.start()
+        print(f"✅ API en http://{server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
+    return 0
@@ -0,0 +1,263 @@
+"""
+Servidor HTTP/1.1 mínimo sobre asyncio (solo biblioteca estándar).
+
+Cada respuesta lleva un ETag derivado de SongApp.generation: si el cliente
+manda el mismo en If-None-Match se responde 304 sin ejecutar la consulta.
+Las conexiones se mantienen abiertas (keep-alive) y los cuerpos grandes
+van comprimidos con gzip cuando el cliente lo acepta. Las respuestas ya
+armadas se guardan por generación, así que sondear sin ETag tampoco repite
+el trabajo mientras la biblioteca no cambie.
+"""
+import asyncio
+import gzip
+import json
+import re
+from collections import OrderedDict
+from email.utils import formatdate
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from models.indexes import FILTER_DIMENSIONS, SORT_FIELDS
+
+# Cuerpos menores no compensan el gzip
+GZIP_MIN_BYTES = 1024
+# Segundos que una conexión puede quedar inactiva entre peticiones
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADER_LINES = 100
+# Respuestas guardadas (por ruta, generación y codificación)
+RESPONSE_CACHE_SIZE = 256
+
+_SONG_RE = re.compile(r"^/songs/(\d+)$")
+
+REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+}
+
+
+class ApiError(Exception):
+    """Error esperado: se responde con `status` y {"error": mensaje}"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(params, name, default=""):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params, name, default=None):
+    value = _param(params, name, None)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(400, f"{name} debe ser un número")
+
+
+def _filters(params):
+    """key, character y tempo se pueden repetir o separar con comas; match_all=character,key"""
+    values = [[v for value in params.get(dimension, []) for v in value.split(",") if v]
+              for dimension in FILTER_DIMENSIONS]
+    modes = {}
+    for dimension in ",".join(params.get("match_all", [])).split(","):
+        if not dimension:
+            continue
+        if dimension not in FILTER_DIMENSIONS:
+            raise ApiError(400, f"Dimensión desconocida: {dimension}")
+        modes[dimension] = "and"
+    return values + [modes]
+
+
+class SongApi:
+    """Rutas de la API sobre una SongApp (sin nada de red: se puede probar directo)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._cache = OrderedDict()
+
+    def etag(self):
+        return f'W/"{self.app.generation}"'
+
+    def respond(self, method, target, headers):
+        """Retorna (estado, cabeceras, cuerpo) para una petición ya leída"""
+        if method not in ("GET", "HEAD"):
+            return self._error(405, f"Método no permitido: {method}", {"Allow": "GET, HEAD"})
+        # ✅ Ver los cambios que hicieron otros procesos (la app, la CLI)
+        self.app.store.reload_if_changed()
+        etag = self.etag()
+        if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            return 304, {"ETag": etag}, b""
+        use_gzip = "gzip" in headers.get("accept-encoding", "")
+        key = (target, use_gzip)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == etag:
+            self._cache.move_to_end(key)
+            return 200, dict(cached[1]), cached[2]
+        try:
+            result = self.route(target)
+        except ApiError as e:
+            return self._error(e.status, str(e))
+        body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        response_headers = {"Content-Type": "application/json; charset=utf-8", "ETag": etag,
+                            "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if use_gzip and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            response_headers["Content-Encoding"] = "gzip"
+        self._cache[key] = (etag, response_headers, body)
+        if len(self._cache) > RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return 200, dict(response_headers), body
+
+    def _error(self, status, message, headers=None):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        return status, dict(headers or {}, **{"Content-Type": "application/json; charset=utf-8"}), body
+
+    def route(self, target):
+        parts = urlsplit(target)
+        path = unquote(parts.path).rstrip("/") or "/"
+        params = parse_qs(parts.query)
+        if path == "/songs":
+            return self.search(params)
+        match = _SONG_RE.match(path)
+        if match:
+            return self.song(int(match.group(1)))
+        if path == "/characters":
+            return {"version": self.app.version, "characters": self.app.get_characters()}
+        if path == "/":
+            return {"version": self.app.version, "endpoints": ["/songs", "/songs/<id>", "/characters"]}
+        raise ApiError(404, f"Ruta desconocida: {path}")
+
+    def search(self, params):
+        """
+        /songs?q=&key=&character=&tempo=&match_all=&sort=&desc=1&offset=&limit=
+        Con lyrics=1 `q` se busca en las letras (por relevancia, sin ordenar).
+        """
+        query = _param(params, "q")
+        filters = _filters(params)
+        offset = max(_int_param(params, "offset", 0), 0)
+        limit = _int_param(params, "limit")
+        store = self.app.store
+        if _param(params, "lyrics") in ("1", "true"):
+            songs = self.app.search_lyrics(query, *filters)
+            total = len(songs)
+            songs = songs[offset:None if limit is None else offset + limit]
+        else:
+            sort = _param(params, "sort", "added")
+            if sort not in SORT_FIELDS:
+                raise ApiError(400, f"Orden desconocido: {sort}")
+            result = self.app.query_songs(query, *filters, sort=sort, descending=_param(params, "desc") in ("1", "true"),
+                                          offset=offset, limit=limit)
+            songs, total = result["songs"], result["total"]
+        # Copias tomadas con el lock: otro hilo puede estar editando
+        with store.lock.read():
+            songs = [dict(song) for song in songs]
+        return {"version": self.app.version, "total": total, "offset": offset, "songs": songs}
+
+    def song(self, song_id):
+        detail = self.app.get_song_detail(song_id)
+        if detail is None:
+            raise ApiError(404, f"No existe la canción {song_id}")
+        return detail
+
+
+class ApiServer:
+    """Atiende SongApi por HTTP/1.1 con conexiones persistentes"""
+
+    def __init__(self, app, host="127.0.0.1", port=8765):
+        self.api = SongApi(app)
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Con port=0 el sistema elige uno libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_request(self, reader):
+        """(método, destino, versión, cabeceras) o None si el cliente cerró"""
+        line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise ApiError(400, "Línea de petición inválida")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise ApiError(431, "Demasiadas cabeceras")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise ApiError(400, "Content-Length inválido")
+        if length < 0:
+            raise ApiError(400, "Content-Length inválido")
+        if length:
+            # Ninguna ruta usa el cuerpo, pero hay que consumirlo para la siguiente petición
+            await reader.readexactly(length)
+        return method, target, version, headers
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ApiError as e:
+                    await self._write(writer, *self.api._error(e.status, str(e)), head=False, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                try:
+                    # Las consultas van en un hilo: el almacén es seguro entre hilos
+                    response = await asyncio.to_thread(self.api.respond, method, target, headers)
+                except Exception as e:
+                    print(f"Error atendiendo {method} {target}: {e}")
+                    response = self.api._error(500, "Error interno")
+                await self._write(writer, *response, head=method == "HEAD", keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _write(self, writer, status, headers, body, head, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Date: {formatdate(usegmt=True)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT}")
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and not head and status != 304:
+            writer.write(body)
+        await writer.drain()
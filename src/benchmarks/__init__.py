@@ -0,0 +1,4 @@
+"""
+Pruebas de carga y benchmarks del modelo de datos.
+Se ejecutan desde `src/`, por ejemplo: python -m benchmarks.stress_concurrency
+"""
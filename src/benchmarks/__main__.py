@@ -0,0 +1,40 @@
+"""
+Suite de benchmarks del modelo.
+
+Uso (desde src/):
+    python -m benchmarks --sizes 1000 10000 100000 --output resultados.json
+    python -m benchmarks --compare antes.json despues.json
+"""
+import argparse
+import sys
+
+from . import model_bench
+from .report import compare, write_report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="tamaños de biblioteca (hasta 1000000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=10.0, help="segundos máximos por benchmark")
+    parser.add_argument("--data-dir", default=None, help="directorio para las bibliotecas generadas")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    results = model_bench.run(args.sizes, args.repeat, args.budget, args.data_dir)
+    write_report(args.output, results, sizes=args.sizes)
+
+    for r in results:
+        print(f"{r['size']:>8}  {r['name']:<34} {r['median_ms']:>10.3f} ms")
+    print(f"✅ Resultados guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Página de Flet sin cliente para medir la interfaz.
+
+HeadlessConnection procesa los comandos como lo haría el servidor local
+(mantiene los ids de controles) pero no envía nada: solo cuenta los lotes
+y los bytes que se habrían mandado al dispositivo.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import flet as ft
+from flet.core.control_event import ControlEvent
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import CommandEncoder, PageCommandsBatchResponsePayload
+
+from models.store import get_shared_store
+
+
+class HeadlessConnection(LocalConnection):
+    """Conexión local que mide los mensajes en lugar de enviarlos"""
+
+    def __init__(self):
+        super().__init__()
+        self.page_url = "http://localhost"
+        self.bytes_sent = 0
+        self.batches = 0
+
+    def send_commands(self, session_id, commands):
+        results = []
+        messages = []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        self.bytes_sent += len(json.dumps(messages, cls=CommandEncoder, separators=(",", ":")))
+        self.batches += 1
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+    def send_command(self, session_id, command):
+        return self.send_commands(session_id, [command])
+
+
+def make_page(session_id="bench"):
+    """Crea una página headless con su propio event loop. Retorna (page, conexión, cerrar)"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    executor = ThreadPoolExecutor()
+    connection = HeadlessConnection()
+    page = ft.Page(connection, session_id, loop, executor)
+
+    def close():
+        loop.call_soon_threadsafe(loop.stop)
+        executor.shutdown(wait=False)
+
+    return page, connection, close
+
+
+def count_controls(control):
+    """Número de controles del árbol que cuelga de `control` (incluido)"""
+    total = 1
+    for child in control._get_children():
+        total += count_controls(child)
+    return total
+
+
+def start_app(data_dir):
+    """
+    Ejecuta main() sobre una página headless con la biblioteca de `data_dir`
+    ya cargada. Retorna (page, conexión, cerrar, main_view).
+    """
+    from main import main as app_main
+
+    # main() usa el directorio de datos de la plataforma
+    os.environ["FLET_APP_STORAGE_DATA"] = data_dir
+    store = get_shared_store(os.path.join(data_dir, "user_data.json"))
+    store.snapshot_delay = None
+    store.backup_interval = None
+    store.ensure_loaded()
+
+    page, connection, close = make_page()
+    app_main(page)
+    main_view = page.session.get("main_view")
+
+    # page.go("/") procesa la ruta en el event loop: esperar a que termine
+    deadline = time.time() + 30
+    while not page.views and time.time() < deadline:
+        time.sleep(0.01)
+    with main_view.render_lock:
+        pass
+    return page, connection, close, main_view
+
+
+def navigate(page, route):
+    """Ejecuta route_change de forma síncrona (page.go lo haría en el event loop)"""
+    page.route = route
+    page.on_route_change(ControlEvent(target="page", name="route_change", data=route, page=page, control=page))
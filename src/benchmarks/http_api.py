@@ -0,0 +1,151 @@
+"""
+Prueba de la API HTTP local contra localhost.
+
+Levanta el servidor sobre una biblioteca sintética en un puerto libre y,
+con una sola conexión persistente, comprueba ETag/304, gzip y keep-alive;
+edita la biblioteca desde otro proceso (la CLI) para ver que el ETag
+cambia, y mide cuánto cuesta sondear con y sin If-None-Match.
+
+Uso (desde src/):
+    python -m benchmarks.http_api --songs 5000 --polls 500
+"""
+import argparse
+import asyncio
+import gzip
+import http.client
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .synthetic import write_library
+
+
+def _start_server(app):
+    """Arranca ApiServer en un hilo con su propio bucle; retorna (servidor, detener)"""
+    from api.server import ApiServer
+
+    loop = asyncio.new_event_loop()
+    server = ApiServer(app, port=0)
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return server, stop
+
+
+def _get(conn, path, **headers):
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    return response, response.read()
+
+
+def _poll(conn, path, count, etag=None):
+    """Milisegundos por petición sondeando `path` `count` veces"""
+    headers = {"Accept-Encoding": "gzip"}
+    if etag:
+        headers["If-None-Match"] = etag
+    start = time.perf_counter()
+    for _ in range(count):
+        _get(conn, path, **headers)
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def run(songs=5000, polls=500, data_dir=None):
+    """Ejecuta la prueba y retorna (errores, resumen)"""
+    from models import SongApp
+
+    root = data_dir or tempfile.mkdtemp(prefix="adorapp-api-")
+    write_library(root, songs)
+    app = SongApp(data_dir=root)
+    app.store.backup_interval = None
+    app.store.snapshot_delay = None
+    server, stop = _start_server(app)
+    conn = http.client.HTTPConnection("127.0.0.1", server.port)
+    errors, summary = [], {}
+    path = "/songs?key=Re&key=Sol&sort=title"
+
+    response, plain = _get(conn, path)
+    etag = response.getheader("ETag")
+    sock = conn.sock
+    data = json.loads(plain)
+    if response.status != 200 or not etag or not data["songs"]:
+        errors.append(f"GET {path}: {response.status}, ETag {etag}")
+
+    response, body = _get(conn, path, **{"Accept-Encoding": "gzip"})
+    if response.getheader("Content-Encoding") != "gzip" or gzip.decompress(body) != plain:
+        errors.append("la respuesta gzip no coincide con la normal")
+    summary["bytes"] = (len(plain), len(body))
+
+    response, body = _get(conn, path, **{"If-None-Match": etag})
+    if response.status != 304 or body:
+        errors.append(f"If-None-Match con el ETag vigente respondió {response.status}")
+    if conn.sock is not sock:
+        errors.append("la conexión no se mantuvo abierta")
+
+    response, _ = _get(conn, "/songs/999999999")
+    if response.status != 404:
+        errors.append(f"canción inexistente respondió {response.status}")
+    response, body = _get(conn, "/characters")
+    if response.status != 200 or not json.loads(body)["characters"]:
+        errors.append("/characters no respondió la lista")
+
+    summary["poll_304_ms"] = _poll(conn, path, polls, etag)
+    summary["poll_cached_ms"] = _poll(conn, path, polls)
+
+    # Otro proceso edita la biblioteca: el ETag tiene que cambiar
+    song_id = data["songs"][0]["id"]
+    subprocess.run([sys.executable, "-m", "cli", "--data-dir", root, "update", str(song_id), "--title", "Editada"],
+                   check=True, capture_output=True)
+    response, body = _get(conn, f"/songs/{song_id}", **{"If-None-Match": etag})
+    if response.status != 200 or json.loads(body)["title"] != "Editada":
+        errors.append(f"tras editar desde otro proceso respondió {response.status}")
+    new_etag = response.getheader("ETag")
+
+    # Guardar solo la letra también cambia el ETag (el detalle la incluye)
+    app.save_body(song_id, "Santo, santo, santo", "")
+    response, body = _get(conn, f"/songs/{song_id}", **{"If-None-Match": new_etag})
+    if response.status != 200 or json.loads(body)["lyrics"] != "Santo, santo, santo":
+        errors.append(f"tras guardar la letra respondió {response.status}")
+    if conn.sock is not sock:
+        errors.append("la conexión se cerró durante la prueba")
+
+    conn.close()
+    stop()
+    app.close()
+    if data_dir is None:
+        shutil.rmtree(root, ignore_errors=True)
+    return errors, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=5000)
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--data-dir", default=None)
+    args = parser.parse_args(argv)
+
+    errors, summary = run(args.songs, args.polls, args.data_dir)
+    plain, compressed = summary["bytes"]
+    print(f"Respuesta: {plain / 1024:.1f} KB, con gzip {compressed / 1024:.1f} KB")
+    print(f"Sondeo con If-None-Match (304): {summary['poll_304_ms']:.2f} ms/petición")
+    print(f"Sondeo sin ETag (respuesta guardada): {summary['poll_cached_ms']:.2f} ms/petición")
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        return 1
+    print("✅ ETag, 304, gzip y keep-alive correctos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
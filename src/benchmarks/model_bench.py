@@ -0,0 +1,142 @@
+"""
+Benchmarks de la capa de modelo (SongStore / SongApp).
+
+Mide carga, guardado, búsqueda con combinaciones típicas de filtros y
+operaciones de escritura sobre bibliotecas sintéticas de distintos tamaños.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from models.indexes import SongIndex
+from models.store import SongStore
+from .synthetic import write_library
+
+# Combinaciones típicas de filtros de MainView: (nombre, query, key, character, tempo)
+SEARCH_MIXES = [
+    ("sin_filtros", "", "", "", ""),
+    ("texto", "santo", "", "", ""),
+    ("texto_sin_resultados", "xyzzy", "", "", ""),
+    ("tono", "", "Re", "", ""),
+    ("caracter", "", "", "Adoración", ""),
+    ("tempo", "", "", "", "Lenta"),
+    ("tono_caracter", "", "Sol", "Alabanza", ""),
+    ("todos", "cristo", "Re", "Adoración", "Lenta"),
+    ("multi_tono_caracter", "", ["Re", "Sol"], ["Adoración", "Oración"], ""),
+]
+
+# Canciones con letra en los benchmarks de búsqueda en letras, y su vocabulario
+LYRICS_SONGS = 5000
+LYRICS_WORDS = (
+    "santo gloria aleluya señor jesús cruz amor gracia fuego espíritu cielo tierra rey paz vida "
+    "luz camino verdad digno alabad cantad poder reino trono nombre sangre eterno fiel al el la de"
+).split()
+
+
+def measure(fn, repeat=5, budget=10.0):
+    """
+    Ejecuta `fn` hasta `repeat` veces (o hasta agotar `budget` segundos)
+    y retorna estadísticas en milisegundos.
+    """
+    times = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+        if time.perf_counter() - started > budget:
+            break
+    times.sort()
+    return {
+        "runs": len(times),
+        "min_ms": round(times[0], 3),
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "max_ms": round(times[-1], 3),
+    }
+
+
+def _open_store(data_file):
+    store = SongStore(data_file)
+    store.snapshot_delay = None  # sin hilos de snapshot ni copias durante las mediciones
+    store.backup_interval = None
+    return store
+
+
+def bench_size(size, data_dir, repeat=5, budget=10.0):
+    """Ejecuta todos los benchmarks para una biblioteca de `size` canciones"""
+    data_file = write_library(data_dir, size)
+    results = []
+
+    def record(name, stats, **extra):
+        results.append(dict({"size": size, "name": name}, **stats, **extra))
+
+    # Carga: JSON completo y arranque en frío con el snapshot binario
+    store = _open_store(data_file)
+    record("load_user_data", measure(store.load_user_data, repeat, budget))
+    # Comparable con cold_start_snapshot: sin snapshot hay que parsear y además construir los índices
+    record("cold_start_json", measure(lambda: SongIndex.build(store.load_user_data()["songs"]), repeat, budget))
+
+    store.ensure_loaded()
+    store.flush_snapshot()
+    record("cold_start_snapshot", measure(lambda: _open_store(data_file).ensure_loaded(), repeat, budget))
+
+    record("save_user_data", measure(store.save_user_data, repeat, budget))
+
+    for name, query, key, character, tempo in SEARCH_MIXES:
+        matches = len(store.search_songs(query, key, character, tempo))
+        stats = measure(lambda: store.search_songs(query, key, character, tempo), repeat * 4, budget)
+        record(f"search_songs:{name}", stats, matches=matches)
+
+    # Páginas ordenadas (el primer uso construye el orden mantenido)
+    for name, query, key, sort in [("titulo_pagina", "", "", "title"), ("tono_titulo_pagina", "", "Re", "title"),
+                                   ("texto_tempo_pagina", "santo", "", "tempo")]:
+        store.query_songs(query, key, sort=sort, limit=50)
+        stats = measure(lambda: store.query_songs(query, key, sort=sort, offset=50, limit=50), repeat * 4, budget)
+        record(f"query_songs:{name}", stats)
+
+    # Letras: cuerpos aparte y búsqueda BM25 sobre el índice (sin leer cuerpos)
+    rng = random.Random(size)
+    with store.bodies.file_lock:
+        for song in store.get_all_songs()[:LYRICS_SONGS]:
+            store.bodies.put(store._song_uid(song["id"]), {
+                "lyrics": " ".join(rng.choice(LYRICS_WORDS) for _ in range(150)), "chords": "",
+            })
+    record("rebuild_lyrics_index", measure(store.rebuild_lyrics_index, 1, budget))
+    for query in ("santo santo", "gloria al rey", "espír"):
+        matches = len(store.search_lyrics(query))
+        record(f"search_lyrics:{query}", measure(lambda: store.search_lyrics(query), repeat * 4, budget), matches=matches)
+
+    # Duplicados: el informe construye el índice LSH; luego cada consulta usa solo sus grupos
+    clusters = len(store.duplicate_clusters())
+    record("duplicate_clusters", measure(store.duplicate_clusters, 1, budget), clusters=clusters)
+    record("find_duplicates", measure(lambda: store.find_duplicates("Cuan grande es el Senor"), repeat * 4, budget))
+
+    # Escrituras (cada una persiste la biblioteca completa)
+    added = []
+
+    def add():
+        added.append(store.add_song("Benchmark canción", "Re", "Adoración", "Lenta")["id"])
+
+    record("add_song", measure(add, repeat, budget))
+
+    targets = iter(list(added) * 4)
+    record("update_song", measure(lambda: store.update_song(next(targets), key="Mi"), repeat, budget))
+
+    to_delete = iter(added)
+    record("delete_song", measure(lambda: store.delete_song(next(to_delete)), len(added), budget))
+
+    return results
+
+
+def run(sizes, repeat=5, budget=10.0, data_dir=None):
+    """Ejecuta los benchmarks para cada tamaño y retorna la lista de resultados"""
+    base_dir = data_dir or tempfile.mkdtemp(prefix="adorapp-bench-")
+    results = []
+    for size in sizes:
+        size_dir = os.path.join(base_dir, str(size))
+        print(f"▶ {size} canciones...")
+        results.extend(bench_size(size, size_dir, repeat, budget))
+    return results
@@ -0,0 +1,85 @@
+"""
+Escenario "navegar 1000 veces": comprueba que la memoria no crece sin límite.
+
+Recorre en bucle las rutas de la app (incluida la edición con su diálogo de
+confirmación) sobre una página headless, con tracemalloc activo. Tras un
+calentamiento compara la memoria retenida al final con la del inicio y
+falla (código 1) si el crecimiento supera --max-growth-kb.
+
+Uso (desde src/):
+    python -m benchmarks.navigation_memory --navigations 1000
+"""
+import argparse
+import gc
+import sys
+import tempfile
+import tracemalloc
+
+from components import show_confirmation_dialog
+from diagnostics import memory
+from .headless import navigate, start_app
+from .synthetic import write_library
+
+ROUTES = ["/", "/add", "/", "/edit", "/settings", "/settings/characters"]
+
+
+def _traced_after_gc():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def run(navigations=1000, warmup=100, songs=50, data_dir=None):
+    """Retorna (memoria tras el calentamiento, memoria final) en bytes"""
+    data_dir = data_dir or tempfile.mkdtemp(prefix="adorapp-memory-")
+    write_library(data_dir, songs)
+    memory.start(snapshot_every=max(1, navigations // 10), frames=1)
+    page, _, close, main_view = start_app(data_dir)
+    library = main_view.app.get_all_songs()
+
+    def step(i):
+        route = ROUTES[i % len(ROUTES)]
+        if route == "/edit":
+            page.session.set("editing_song_id", library[i % len(library)]["id"])
+        navigate(page, route)
+        if route == "/edit":
+            show_confirmation_dialog(page, "Confirmar eliminación", "¿Eliminar?", lambda: None)
+            page.overlay[-1].open = False  # cancelar
+
+    try:
+        for i in range(warmup):
+            step(i)
+        memory.reset()
+        before = _traced_after_gc()
+        for i in range(navigations):
+            step(warmup + i)
+        print(memory.report())
+        memory.reset()  # los snapshots también ocupan memoria trazada
+        after = _traced_after_gc()
+    finally:
+        main_view.app.close()
+        close()
+    return before, after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--navigations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--songs", type=int, default=50)
+    parser.add_argument("--max-growth-kb", type=float, default=512.0)
+    parser.add_argument("--data-dir", default=None)
+    args = parser.parse_args(argv)
+
+    before, after = run(args.navigations, args.warmup, args.songs, args.data_dir)
+    growth_kb = (after - before) / 1024
+    print(f"\nMemoria tras calentamiento: {before / 1024:.0f} KB, al final: {after / 1024:.0f} KB "
+          f"({growth_kb:+.1f} KB en {args.navigations} navegaciones)")
+    if growth_kb > args.max_growth_kb:
+        print(f"❌ La memoria creció más de {args.max_growth_kb:.0f} KB")
+        return 1
+    print("✅ Memoria acotada")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
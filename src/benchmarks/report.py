@@ -0,0 +1,37 @@
+"""
+Formato común de resultados (JSON) y comparación entre dos ejecuciones.
+"""
+import json
+import platform
+import time
+
+
+def write_report(path, results, **meta):
+    """Guarda los resultados junto con los datos del entorno"""
+    report = {
+        "meta": dict({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        }, **meta),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def compare(old_path, new_path):
+    """Imprime la variación de la mediana de cada benchmark presente en ambos archivos"""
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["size"], r["name"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    print(f"{'tamaño':>8}  {'benchmark':<34} {'antes':>10} {'después':>10} {'cambio':>8}")
+    for r in new:
+        before = old.get((r["size"], r["name"]))
+        if not before:
+            continue
+        a, b = before["median_ms"], r["median_ms"]
+        change = (b - a) / a * 100 if a else 0.0
+        print(f"{r['size']:>8}  {r['name']:<34} {a:>9.2f}ms {b:>9.2f}ms {change:>+7.1f}%")
@@ -0,0 +1,122 @@
+"""
+Prueba de estrés multi-proceso sobre user_data.json.
+
+Varios procesos agregan, actualizan y eliminan canciones a la vez sobre el
+mismo directorio de datos. Al final se comprueba que no se perdió ningún
+cambio y que la versión del archivo cuenta todos los guardados.
+
+Uso (desde src/):
+    python -m benchmarks.stress_concurrency --workers 6 --ops 150
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+
+def _worker(data_dir, worker_id, ops, seed, results):
+    from models import SongApp
+
+    rng = random.Random(seed)
+    app = SongApp(data_dir=data_dir)
+    expected = {}   # título -> estado esperado (None si se eliminó)
+    own_ids = {}    # título -> id
+    commits = 0
+
+    for i in range(ops):
+        action = rng.random()
+        alive = [t for t, state in expected.items() if state is not None]
+        if action < 0.5 or not alive:
+            title = f"w{worker_id}-{i}"
+            song = app.add_song(title, "Re", "Alabanza", "Lenta")
+            own_ids[title] = song["id"]
+            expected[title] = {"key": "Re", "tempo": "Lenta"}
+            commits += 1
+        elif action < 0.8:
+            title = rng.choice(alive)
+            key = rng.choice(["Do", "Mi", "Sol", "La"])
+            if not app.update_song(own_ids[title], key=key):
+                results.put(("error", worker_id, f"update perdido: {title}"))
+                return
+            expected[title] = {"key": key, "tempo": "Lenta"}
+            commits += 1
+        else:
+            title = rng.choice(alive)
+            app.delete_song(own_ids[title])
+            expected[title] = None
+            commits += 1
+
+    results.put(("ok", worker_id, {"expected": expected, "ids": own_ids, "commits": commits}))
+
+
+def run(workers=6, ops=150, data_dir=None):
+    """Ejecuta la prueba y retorna una lista de errores (vacía si todo fue bien)"""
+    data_dir = data_dir or tempfile.mkdtemp(prefix="adorapp-stress-")
+    os.makedirs(data_dir, exist_ok=True)
+    data_file = os.path.join(data_dir, "user_data.json")
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump({"version": 0, "songs": [], "characters": []}, f)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_worker, args=(data_dir, n, ops, n * 7919, results))
+        for n in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    outcomes = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+
+    errors = [msg for status, _, msg in outcomes if status == "error"]
+    with open(data_file, "r", encoding="utf-8") as f:
+        final = json.load(f)
+    songs_by_title = {s["title"]: s for s in final["songs"]}
+
+    ids = [s["id"] for s in final["songs"]]
+    if len(ids) != len(set(ids)):
+        errors.append("ids duplicados en el archivo final")
+
+    total_commits = 0
+    for status, worker_id, payload in outcomes:
+        if status != "ok":
+            continue
+        total_commits += payload["commits"]
+        for title, state in payload["expected"].items():
+            song = songs_by_title.get(title)
+            if state is None:
+                if song is not None:
+                    errors.append(f"{title}: debía estar eliminada")
+            elif song is None:
+                errors.append(f"{title}: se perdió")
+            elif song["id"] != payload["ids"][title] or song["key"] != state["key"]:
+                errors.append(f"{title}: estado incorrecto {song}")
+
+    if final.get("version") != total_commits:
+        errors.append(f"versión {final.get('version')} != {total_commits} guardados")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument("--ops", type=int, default=150)
+    parser.add_argument("--data-dir", default=None)
+    args = parser.parse_args(argv)
+
+    errors = run(args.workers, args.ops, args.data_dir)
+    if errors:
+        for error in errors[:20]:
+            print(f"❌ {error}")
+        print(f"❌ {len(errors)} errores")
+        return 1
+    print(f"✅ {args.workers} procesos x {args.ops} operaciones sin pérdidas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Prueba de sincronización entre dos dispositivos simulados.
+
+Parte de la misma biblioteca en dos directorios de datos, hace ediciones,
+altas y bajas en ambos (algunas sobre las mismas canciones), intercambia
+los archivos de cambios en los dos sentidos y comprueba que las dos
+bibliotecas quedan iguales y que cada archivo solo llevaba lo cambiado.
+Un tercer dispositivo que solo habla con B comprueba que los cambios se
+reenvían (C -> B -> A).
+
+Uso (desde src/):
+    python -m benchmarks.sync_devices --songs 5000 --edits 10
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from .synthetic import write_library
+
+
+def _open(data_dir):
+    from models import SongApp
+
+    app = SongApp(data_dir=data_dir)
+    app.store.backup_interval = None
+    app.store.snapshot_delay = None
+    return app
+
+
+def _edit(app, rng, edits, tag):
+    """Hace `edits` cambios al azar (ediciones, altas y bajas)"""
+    songs = app.get_all_songs()
+    for i in range(edits):
+        action = rng.random()
+        song = rng.choice(songs)
+        if action < 0.6:
+            app.update_song(song["id"], key=rng.choice(["Do", "Re", "Mi", "Fa", "Sol", "La"]), title=f"{tag}-{i}")
+        elif action < 0.8:
+            app.add_song(f"{tag} nueva {i}", "Re", "Alabanza", "Lenta")
+        else:
+            app.delete_song(song["id"])
+        songs = app.get_all_songs()
+
+
+def _content(app):
+    """Biblioteca comparable entre dispositivos: uid -> campos (sin el id local)"""
+    from models.sync import song_record
+
+    return {record["uid"]: record for record in map(song_record, app.get_all_songs())}
+
+
+def run(songs=5000, edits=10, data_dir=None, seed=7):
+    """Ejecuta la prueba y retorna (errores, resumen)"""
+    root = data_dir or tempfile.mkdtemp(prefix="adorapp-sync-")
+    dir_a, dir_b = os.path.join(root, "a"), os.path.join(root, "b")
+    write_library(dir_a, songs)
+    os.makedirs(dir_b, exist_ok=True)
+    shutil.copy2(os.path.join(dir_a, "user_data.json"), os.path.join(dir_b, "user_data.json"))
+    # C parte de la misma biblioteca y solo intercambia con B
+    dir_c = os.path.join(root, "c")
+    os.makedirs(dir_c, exist_ok=True)
+    shutil.copy2(os.path.join(dir_a, "user_data.json"), os.path.join(dir_c, "user_data.json"))
+    a, b, c = _open(dir_a), _open(dir_b), _open(dir_c)
+    rng = random.Random(seed)
+    errors, summary = [], {}
+
+    # Las dos copias editan también las mismas canciones (conflictos)
+    shared = rng.sample(a.get_all_songs(), 2)
+    _edit(a, rng, edits, "A")
+    _edit(b, rng, edits, "B")
+    for song in shared:
+        a.update_song(song["id"], tempo="Rápida")
+        b.update_song(song["id"], tempo="Moderada")
+
+    file_a, file_b = os.path.join(root, "a.changes.json"), os.path.join(root, "b.changes.json")
+    summary["export_a"] = a.export_changes(file_a)
+    summary["export_b"] = b.export_changes(file_b)
+    summary["import_b"] = b.import_changes(file_a)
+    summary["import_a"] = a.import_changes(file_b)
+    summary["bytes"] = os.path.getsize(file_a) + os.path.getsize(file_b)
+    summary["library_bytes"] = os.path.getsize(os.path.join(dir_a, "user_data.json"))
+
+    if _content(a) != _content(b):
+        errors.append("las bibliotecas no coinciden tras sincronizar")
+    moved = summary["export_a"]["songs"] + summary["export_a"]["deleted"]
+    if moved > edits + len(shared):
+        errors.append(f"A exportó {moved} registros para {edits + len(shared)} cambios")
+
+    # Sin cambios nuevos, A como mucho reenvía lo que recibió de B (y B lo descarta)
+    summary["second_round"] = a.export_changes(file_a)
+    b.import_changes(file_a)
+    resent = summary["second_round"]["songs"] + summary["second_round"]["deleted"]
+    if resent > summary["export_b"]["songs"] + summary["export_b"]["deleted"]:
+        errors.append(f"la segunda ronda reenvió {resent} registros")
+    if _content(a) != _content(b):
+        errors.append("las bibliotecas divergen tras la segunda ronda")
+
+    # Con los acuses de ida y vuelta, las lápidas que ya vieron los dos se podan
+    # (B reenvió las de A con su propio orden: hace falta que A se lo confirme)
+    b.export_changes(file_b)
+    summary["third_round"] = a.import_changes(file_b)
+    a.export_changes(file_a)
+    b.import_changes(file_a)
+    summary["tombstones"] = (a.sync_status()["tombstones"], b.sync_status()["tombstones"])
+    if summary["tombstones"] != (0, 0):
+        errors.append(f"quedaron lápidas ya confirmadas: {summary['tombstones']}")
+    if _content(a) != _content(b):
+        errors.append("las bibliotecas divergen tras podar las lápidas")
+
+    # Lo que B recibe de C llega a A en la siguiente exportación de B, aunque
+    # el sello de C sea anterior a la última exportación de B
+    file_c = os.path.join(root, "c.changes.json")
+    c.update_song(rng.choice(c.get_all_songs())["id"], title="C-editada")
+    c.export_changes(file_c)
+    b.import_changes(file_c)
+    b.export_changes(file_b)
+    a.import_changes(file_b)
+    if "C-editada" not in {record["title"] for record in _content(a).values()}:
+        errors.append("A no recibió a través de B el cambio de C")
+
+    a.close()
+    b.close()
+    c.close()
+    if data_dir is None:
+        shutil.rmtree(root, ignore_errors=True)
+    return errors, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=5000)
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument("--data-dir", default=None)
+    args = parser.parse_args(argv)
+
+    errors, summary = run(args.songs, args.edits, args.data_dir)
+    for name in ("export_a", "export_b", "import_b", "import_a", "second_round", "third_round", "tombstones"):
+        print(f"{name:<13} {summary[name]}")
+    print(f"Archivos de cambios: {summary['bytes'] / 1024:.1f} KB (biblioteca: {summary['library_bytes'] / 1024:.0f} KB)")
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        return 1
+    print("✅ Las dos bibliotecas quedaron iguales")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
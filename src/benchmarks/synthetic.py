@@ -0,0 +1,68 @@
+"""
+Generador de bibliotecas sintéticas realistas para benchmarks.
+
+Produce títulos en español, tonos de MUSICAL_KEYS, caracteres múltiples
+("Adoración,Alabanza") y tempos, con una distribución parecida a la de
+una biblioteca real (muchas canciones con un solo carácter, algunas sin tono).
+"""
+import json
+import os
+import random
+
+from models.constants import DEFAULT_CHARACTERS, MUSICAL_KEYS
+
+_OPENINGS = [
+    "Cuán grande es", "Santo es", "Digno es", "Al que está sentado", "Te alabaré",
+    "Eres mi", "Quiero levantar", "Renuévame", "Ven y llena", "Mi Dios es",
+    "Hay poder en", "Sublime gracia de", "Cristo es", "Yo te busco", "Aleluya a",
+    "Ríos de", "Tu fidelidad es", "Más allá de", "Nada es imposible para", "Gloria a",
+]
+_SUBJECTS = [
+    "Él", "el Señor", "tu nombre", "mi Rey", "el Cordero", "la sangre", "tu amor",
+    "mi Salvador", "Jesús", "tu presencia", "agua viva", "mi refugio", "tu gracia",
+    "el Espíritu", "mi roca", "tu trono", "los cielos", "la cruz", "mi Pastor", "tu luz",
+]
+_SUFFIXES = ["", "", "", "", " (en vivo)", " (acústico)", " II", " - versión coro"]
+_TEMPOS = ["Lenta", "Rápida"]
+
+
+def generate_songs(count, seed=42):
+    """Genera `count` canciones sintéticas con ids consecutivos"""
+    rng = random.Random(seed)
+    songs = []
+    for song_id in range(1, count + 1):
+        title = f"{rng.choice(_OPENINGS)} {rng.choice(_SUBJECTS)}{rng.choice(_SUFFIXES)}"
+        if rng.random() < 0.3:
+            title = f"{title} {song_id}"
+        n_chars = rng.choices([0, 1, 2, 3], weights=[5, 60, 28, 7])[0]
+        characters = rng.sample(DEFAULT_CHARACTERS, n_chars)
+        songs.append({
+            "id": song_id,
+            "title": title,
+            "key": rng.choice(MUSICAL_KEYS) if rng.random() < 0.9 else "",
+            "character": ",".join(characters),
+            "tempo": rng.choice(_TEMPOS) if rng.random() < 0.85 else "",
+        })
+    return songs
+
+
+def generate_library(count, seed=42):
+    """Genera el contenido completo de user_data.json"""
+    return {
+        "version": 1,
+        "songs": generate_songs(count, seed),
+        "characters": DEFAULT_CHARACTERS.copy(),
+    }
+
+
+def write_library(data_dir, count, seed=42):
+    """Escribe una biblioteca sintética en `data_dir/user_data.json` y retorna la ruta"""
+    os.makedirs(data_dir, exist_ok=True)
+    for name in ("user_data.json", "user_data.snapshot"):
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    data_file = os.path.join(data_dir, "user_data.json")
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(generate_library(count, seed), f, ensure_ascii=False, indent=2)
+    return data_file
@@ -0,0 +1,129 @@
+"""
+Benchmark headless de la interfaz: MainView y tarjetas de canción.
+
+Arranca main() sobre una página sin cliente con una biblioteca sintética de
+N canciones y mide, para cada operación, el tiempo de construcción, los
+controles creados y los bytes que se enviarían al dispositivo.
+
+Uso (desde src/):
+    python -m benchmarks.ui_bench --sizes 50 500 2000 --output ui.json
+    python -m benchmarks --compare antes.json despues.json
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from components import create_song_card
+from .headless import count_controls, navigate, start_app
+from .report import write_report
+from .synthetic import write_library
+
+
+def _measure(connection, fn, repeat, budget):
+    """Como model_bench.measure, pero también cuenta lotes y bytes por ejecución"""
+    times = []
+    sent = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        bytes_before, batches_before = connection.bytes_sent, connection.batches
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+        sent.append((connection.bytes_sent - bytes_before, connection.batches - batches_before))
+        if time.perf_counter() - started > budget:
+            break
+    times.sort()
+    return {
+        "runs": len(times),
+        "min_ms": round(times[0], 3),
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "max_ms": round(times[-1], 3),
+        "bytes": max(b for b, _ in sent),
+        "batches": max(n for _, n in sent),
+    }
+
+
+def bench_size(size, data_dir, repeat=5, budget=10.0):
+    """Ejecuta los benchmarks de interfaz con `size` canciones visibles"""
+    write_library(data_dir, size)
+    page, connection, close, main_view = start_app(data_dir)
+    app = main_view.app
+    songs = app.list_songs()["songs"]
+    results = []
+
+    def record(name, stats, **extra):
+        results.append(dict({"size": size, "name": name}, **stats, **extra))
+
+    def route_change(route):
+        navigate(page, route)
+
+    try:
+        cards = []
+        stats = _measure(connection, lambda: cards.append([create_song_card(page, s, main_view.go_to_edit) for s in songs]), repeat, budget)
+        record("create_song_card", stats, controls=sum(count_controls(c) for c in cards[-1]))
+
+        stats = _measure(connection, lambda: main_view.update_results(songs), repeat, budget)
+        record("update_results", stats, controls=count_controls(main_view.results_column))
+
+        def toggle_theme():
+            mode = page.session.get("theme_mode") or "dark"
+            page.session.set("theme_mode", "light" if mode == "dark" else "dark")
+            main_view.refresh_theme()
+
+        record("refresh_theme", _measure(connection, toggle_theme, repeat, budget))
+
+        record("route_change:/", _measure(connection, lambda: route_change("/"), repeat, budget),
+               controls=count_controls(page.views[0]))
+
+        def round_trip():
+            route_change("/settings")
+            route_change("/")
+
+        record("route_change:/settings->/", _measure(connection, round_trip, repeat, budget))
+
+        # Cambio de una canción: solo se reemplaza su tarjeta
+        target = songs[len(songs) // 2].id if songs else None
+        keys = iter(["Mi", "Re"] * repeat)
+        if target is not None:
+            record("patch_card", _measure(connection, lambda: app.update_song(target, key=next(keys)), repeat, budget))
+    finally:
+        page.session.set("theme_mode", "dark")
+        app.close()
+        close()
+    return results
+
+
+def run(sizes, repeat=5, budget=10.0, data_dir=None):
+    base_dir = data_dir or tempfile.mkdtemp(prefix="adorapp-ui-bench-")
+    results = []
+    for size in sizes:
+        print(f"▶ {size} canciones...")
+        results.extend(bench_size(size, os.path.join(base_dir, str(size)), repeat, budget))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=10.0, help="segundos máximos por benchmark")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--output", default="ui_benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.budget, args.data_dir)
+    write_report(args.output, results, sizes=args.sizes, suite="ui")
+
+    print(f"{'tamaño':>8}  {'benchmark':<28} {'mediana':>10} {'controles':>10} {'bytes':>10}")
+    for r in results:
+        print(f"{r['size']:>8}  {r['name']:<28} {r['median_ms']:>8.2f}ms {r.get('controls', ''):>10} {r['bytes']:>10}")
+    print(f"✅ Resultados guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
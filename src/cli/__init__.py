@@ -0,0 +1,9 @@
+"""
+Interfaz de línea de comandos sin Flet, sobre SongApp.
+
+Uso (desde src/):
+    python -m cli search santo --key Re --key Sol --sort title --limit 20
+    python -m cli add --title "Santo" --key Re --character Adoración
+    python -m cli stats --pretty
+    python -m cli duplicates --limit 20
+"""
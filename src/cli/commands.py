@@ -0,0 +1,259 @@
+"""
+Comandos de la línea de comandos. Cada uno recibe la SongApp y los
+argumentos y retorna un resultado serializable a JSON (o lanza
+CommandError). Nunca se importa flet: el arranque es el de cargar el
+snapshot de la biblioteca.
+"""
+import argparse
+import json
+import sys
+from contextlib import redirect_stdout
+
+from models import SongApp
+from models.indexes import FILTER_DIMENSIONS, SORT_FIELDS
+
+
+class CommandError(Exception):
+    """Error esperado (canción inexistente, archivo inválido...): se informa en el JSON"""
+
+
+def open_app(data_dir):
+    """SongApp sin copias automáticas ni temporizadores de snapshot (el proceso dura poco)"""
+    app = SongApp(defer_load=True, data_dir=data_dir)
+    app.store.backup_interval = None
+    app.store.snapshot_delay = None
+    app.store.ensure_loaded()
+    return app
+
+
+def _read_text(path):
+    if path is None:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _modes(values):
+    """--match-all key,character -> {"key": "and", "character": "and"}"""
+    modes = {}
+    for value in values or []:
+        for dimension in value.split(","):
+            if dimension not in FILTER_DIMENSIONS:
+                raise CommandError(f"Dimensión desconocida: {dimension}")
+            modes[dimension] = "and"
+    return modes
+
+
+# ===== CONSULTAS =====
+
+def cmd_search(app, args):
+    filters = (args.key or "", args.character or "", args.tempo or "", _modes(args.match_all))
+    end = None if args.limit is None else args.offset + args.limit
+    if args.preset:
+        songs = app.preset_songs(args.preset)
+        if songs is None:
+            raise CommandError(f"No existe el preset «{args.preset}»")
+        return {"total": len(songs), "songs": songs[args.offset:end]}
+    if args.lyrics:
+        songs = app.search_lyrics(args.query, *filters)
+        return {"total": len(songs), "songs": songs[args.offset:end]}
+    result = app.query_songs(args.query, *filters, sort=args.sort, descending=args.desc,
+                             offset=args.offset, limit=args.limit)
+    return {"total": result["total"], "songs": result["songs"]}
+
+
+def cmd_get(app, args):
+    detail = app.get_song_detail(args.id)
+    if detail is None:
+        raise CommandError(f"No existe la canción {args.id}")
+    return detail
+
+
+def cmd_stats(app, args):
+    return app.stats()
+
+
+def cmd_duplicates(app, args):
+    """Con --title, las canciones parecidas a ese título; si no, todos los grupos"""
+    if args.title:
+        return [song._asdict() for song in app.find_duplicates(args.title)]
+    clusters = app.duplicate_clusters()
+    return {"clusters": len(clusters), "songs": sum(map(len, clusters)),
+            "groups": [[song._asdict() for song in cluster] for cluster in clusters[:args.limit]]}
+
+
+# ===== CAMBIOS =====
+
+def cmd_add(app, args):
+    song = app.add_song(args.title, args.key or "", ",".join(args.character or []), args.tempo or "")
+    for duplicate in app.find_duplicates(song["title"], song["id"]):
+        print(f"Posible duplicado de {duplicate.id} «{duplicate.title}»")
+    lyrics, chords = _read_text(args.lyrics_file), _read_text(args.chords_file)
+    if lyrics or chords:
+        app.save_body(song["id"], lyrics, chords)
+    return app.get_song_detail(song["id"])
+
+
+def cmd_update(app, args):
+    character = None if args.character is None else ",".join(args.character)
+    if not app.update_song(args.id, args.title, args.key, character, args.tempo):
+        raise CommandError(f"No existe la canción {args.id}")
+    if args.lyrics_file or args.chords_file:
+        body = app.get_body(args.id)
+        app.save_body(
+            args.id,
+            _read_text(args.lyrics_file) if args.lyrics_file else body["lyrics"],
+            _read_text(args.chords_file) if args.chords_file else body["chords"],
+        )
+    return app.get_song_detail(args.id)
+
+
+def cmd_delete(app, args):
+    deleted = app.bulk_delete(args.ids)
+    return {"deleted": deleted, "missing": [i for i in args.ids if i not in deleted]}
+
+
+def cmd_import(app, args):
+    """Un archivo de cambios (sync) se fusiona; una lista de canciones se agrega"""
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"No se pudo leer {args.file}: {e}")
+    if isinstance(data, dict) and "format" in data:
+        result = app.import_changes(args.file)
+        if result is None:
+            raise CommandError(f"Archivo de cambios inválido: {args.file}")
+        return result
+    songs = data.get("songs", []) if isinstance(data, dict) else data
+    characters = data.get("characters", []) if isinstance(data, dict) else []
+    if not isinstance(songs, list) or not isinstance(characters, list):
+        raise CommandError(f"Formato inválido en {args.file}: «songs» y «characters» deben ser listas")
+    if not all(isinstance(song, dict) for song in songs):
+        raise CommandError(f"Formato inválido en {args.file}: cada canción debe ser un objeto")
+    if not all(isinstance(character, str) for character in characters):
+        raise CommandError(f"Formato inválido en {args.file}: cada carácter debe ser un texto")
+    added_characters = [c for c in characters if app.add_character(c)]
+    created = app.add_songs(songs)
+    # Canciones importadas que ya estaban (o venían repetidas en el archivo)
+    duplicates = {}
+    for song in created:
+        found = app.find_duplicates(song["title"], song["id"])
+        if found:
+            duplicates[song["id"]] = [duplicate.id for duplicate in found]
+    return {"added": len(created), "ids": [song["id"] for song in created], "characters": added_characters,
+            "duplicates": duplicates}
+
+
+def cmd_export(app, args):
+    if args.changes or args.since is not None:
+        return app.export_changes(args.file, args.since)
+    with app.store.lock.read():
+        songs = [dict(song) for song in app.get_all_songs()]
+    data = {"songs": songs, "characters": app.get_characters(), "presets": app.get_presets()}
+    with open(args.file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return {"songs": len(data["songs"]), "file": args.file}
+
+
+# ===== MANTENIMIENTO =====
+
+def cmd_reindex(app, args):
+    return app.reindex()
+
+
+def cmd_compact(app, args):
+    return app.compact()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Biblioteca de canciones sin interfaz gráfica")
+    parser.add_argument("--data-dir", default=None, help="directorio de datos (por defecto, el de la app)")
+    parser.add_argument("--pretty", action="store_true", help="JSON indentado")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def filters(command):
+        command.add_argument("--key", action="append", help="tono (se puede repetir)")
+        command.add_argument("--character", action="append", help="carácter (se puede repetir)")
+        command.add_argument("--tempo", action="append", help="ritmo (se puede repetir)")
+
+    search = commands.add_parser("search", help="buscar canciones (mismos filtros que la lista)")
+    search.add_argument("query", nargs="?", default="")
+    filters(search)
+    search.add_argument("--match-all", action="append", metavar="DIMENSIONES",
+                        help="exigir todos los valores en key, character y/o tempo (p. ej. character)")
+    search.add_argument("--lyrics", action="store_true", help="buscar el texto en las letras (BM25)")
+    search.add_argument("--preset", help="usar una vista guardada")
+    search.add_argument("--sort", choices=sorted(SORT_FIELDS), default="added")
+    search.add_argument("--desc", action="store_true")
+    search.add_argument("--offset", type=int, default=0)
+    search.add_argument("--limit", type=int, default=None)
+    search.set_defaults(handler=cmd_search)
+
+    get = commands.add_parser("get", help="registro completo de una canción (con letra y acordes)")
+    get.add_argument("id", type=int)
+    get.set_defaults(handler=cmd_get)
+
+    for name, handler in (("add", cmd_add), ("update", cmd_update)):
+        command = commands.add_parser(name, help=f"{'agregar' if name == 'add' else 'editar'} una canción")
+        if name == "update":
+            command.add_argument("id", type=int)
+        command.add_argument("--title", required=name == "add")
+        filters(command)
+        command.add_argument("--lyrics-file")
+        command.add_argument("--chords-file")
+        command.set_defaults(handler=handler)
+
+    delete = commands.add_parser("delete", help="eliminar canciones (un solo guardado)")
+    delete.add_argument("ids", type=int, nargs="+")
+    delete.set_defaults(handler=cmd_delete)
+
+    import_ = commands.add_parser("import", help="importar canciones (JSON) o un archivo de cambios")
+    import_.add_argument("file")
+    import_.set_defaults(handler=cmd_import)
+
+    export = commands.add_parser("export", help="exportar la biblioteca o, con --changes, un archivo de cambios")
+    export.add_argument("file")
+    export.add_argument("--changes", action="store_true")
+    export.add_argument("--since", type=int, default=None, help="sello desde el que exportar cambios")
+    export.set_defaults(handler=cmd_export)
+
+    duplicates = commands.add_parser("duplicates", help="grupos de canciones con títulos casi iguales")
+    duplicates.add_argument("--title", help="solo las canciones parecidas a este título")
+    duplicates.add_argument("--limit", type=int, default=None, help="máximo de grupos a listar")
+    duplicates.set_defaults(handler=cmd_duplicates)
+
+    for name, handler, help_text in (
+        ("reindex", cmd_reindex, "reconstruir índices, snapshot e índice de letras"),
+        ("compact", cmd_compact, "borrar letras huérfanas y rotar copias"),
+        ("stats", cmd_stats, "estadísticas de la biblioteca"),
+    ):
+        commands.add_parser(name, help=help_text).set_defaults(handler=handler)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in ("add", "update"):
+        # Un único valor de tono y ritmo por canción
+        for field in ("key", "tempo"):
+            values = getattr(args, field)
+            setattr(args, field, values[-1] if values else None)
+    out = sys.stdout
+    status = 0
+    # ✅ Los mensajes del modelo van a stderr: stdout solo lleva el JSON
+    with redirect_stdout(sys.stderr):
+        app = open_app(args.data_dir)
+        version = app.version
+        try:
+            result = args.handler(app, args)
+            if app.version != version:
+                # Que el próximo arranque use el snapshot en lugar de parsear el JSON
+                app.flush_snapshot()
+        except CommandError as e:
+            result, status = {"error": str(e)}, 1
+        finally:
+            app.close()
+    json.dump(result, out, ensure_ascii=False, indent=2 if args.pretty else None)
+    out.write("\n")
+    return status
@@ -1,3 +1,3 @@
-from .components import create_header, show_snackbar, show_confirmation_dialog, create_character_item, create_song_card, create_empty_state
+from .components import create_header, show_snackbar, show_confirmation_dialog, open_dialog, create_character_item, create_song_card, create_empty_state
 
-__all__ = ["create_header", "show_snackbar", "show_confirmation_dialog", "create_character_item", "create_song_card", "create_empty_state"]
\ No newline at end of file
+__all__ = ["create_header", "show_snackbar", "show_confirmation_dialog", "open_dialog", "create_character_item", "create_song_card", "create_empty_state"]
\ No newline at end of file
@@ -24,13 +24,13 @@ def get_theme_colors(page):
 
 
 def create_song_card(page, song, on_click_callback):
-    """Crea una tarjeta de canción compacta con tono y caracteres visibles"""
+    """Crea una tarjeta de canción compacta con su tono (`song` es un SongSummary)"""
     colors = get_theme_colors(page)
 
     # Badge de tono
     key_badge = ft.Container(
         content=ft.Text(
-            song.get("key") or "Sin nota",
+            song.key or "Sin nota",
             size=12,
             color="#2d3436",
             weight=ft.FontWeight.BOLD
@@ -49,7 +49,7 @@ def create_song_card(page, song, on_click_callback):
                 border_radius=8,
             ),
             ft.Text(
-                song["title"],
+                song.title,
                 size=15,
                 weight=ft.FontWeight.BOLD,
                 color=colors["text_primary"],
@@ -73,15 +73,25 @@ def create_song_card(page, song, on_click_callback):
     )
 
 
-def create_character_item(page, character, on_delete_callback):
+def create_character_item(page, character, on_delete_callback, on_rename_callback=None):
     """Crea un item de carácter en la lista de configuración"""
     colors = get_theme_colors(page)
+
+    rename_button = ft.IconButton(
+        icon=ft.Icons.EDIT_OUTLINED,
+        icon_color="#74b9ff",
+        icon_size=20,
+        on_click=lambda e: on_rename_callback(character),
+        tooltip="Renombrar o fusionar",
+        visible=on_rename_callback is not None,
+    )
     
     return ft.Container(
         content=ft.Row([
             ft.Icon(ft.Icons.LABEL, color="#a29bfe", size=20),
             ft.Text(character, size=15, color=colors["text_primary"], weight=ft.FontWeight.W_500),
             ft.Container(expand=True),
+            rename_button,
             ft.IconButton(
                 icon=ft.Icons.DELETE_OUTLINE,
                 icon_color="#ff7675",
@@ -141,7 +151,7 @@ def create_empty_state(page, message):
     )
 
 
-def show_confirmation_dialog(page, title, message, on_confirm):
+def show_confirmation_dialog(page, title, message, on_confirm, confirm_text="Eliminar"):
     """Muestra un diálogo de confirmación"""
     def close_dialog(e):
         dialog.open = False
@@ -156,19 +166,29 @@ def show_confirmation_dialog(page, title, message, on_confirm):
         content=ft.Text(message),
         actions=[
             ft.TextButton("Cancelar", on_click=close_dialog),
-            ft.TextButton("Eliminar", on_click=confirm_and_close),
+            ft.TextButton(confirm_text, on_click=confirm_and_close),
         ],
     )
+    open_dialog(page, dialog)
+
+
+def open_dialog(page, dialog):
+    """Muestra un diálogo en el overlay de la página"""
+    # ✅ Quitar los diálogos ya cerrados para que el overlay no crezca sin límite
+    page.overlay[:] = [c for c in page.overlay if not (isinstance(c, ft.AlertDialog) and not c.open)]
     page.overlay.append(dialog)
     dialog.open = True
     page.update()
 
 
-def show_snackbar(page, message, bgcolor="#00b894"):
-    """Muestra un snackbar con un mensaje"""
+def show_snackbar(page, message, bgcolor="#00b894", action=None, on_action=None):
+    """Muestra un snackbar con un mensaje (y opcionalmente un botón, p. ej. "Deshacer")"""
     page.snack_bar = ft.SnackBar(
         content=ft.Text(message, color="#ffffff"),
         bgcolor=bgcolor,
+        action=action,
+        action_color="#ffffff",
+        on_action=on_action,
     )
     page.snack_bar.open = True
     page.update()
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Herramientas de diagnóstico opcionales (se activan con variables de entorno)
+"""
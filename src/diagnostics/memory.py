@@ -0,0 +1,128 @@
+"""
+Seguimiento de memoria entre navegaciones con tracemalloc.
+
+Con ADORAPP_TRACE_MEMORY=1 cada cambio de ruta registra cuánta memoria
+quedó retenida respecto al anterior (delta por ruta) y, cada
+ADORAPP_TRACE_MEMORY_EVERY cambios (1 por defecto), toma un snapshot que se
+compara con el primero para listar las líneas de código que más crecen.
+"""
+import os
+import threading
+import tracemalloc
+
+ENABLED = os.getenv("ADORAPP_TRACE_MEMORY") == "1"
+SNAPSHOT_EVERY = int(os.getenv("ADORAPP_TRACE_MEMORY_EVERY", "1"))
+FRAMES = 10  # profundidad de pila guardada por asignación
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class RouteStats:
+    """Memoria retenida tras navegar a una ruta"""
+
+    def __init__(self):
+        self.visits = 0
+        self.total_delta = 0
+        self.max_delta = 0
+
+    def add(self, delta):
+        self.visits += 1
+        self.total_delta += delta
+        self.max_delta = max(self.max_delta, delta)
+
+
+_lock = threading.Lock()
+_routes = {}
+_changes = 0
+_last_size = None
+_baseline = None
+_latest = None
+
+
+def start(snapshot_every=None, frames=FRAMES):
+    """Activa el seguimiento (también desde scripts, sin variable de entorno)"""
+    global ENABLED, SNAPSHOT_EVERY
+    ENABLED = True
+    if snapshot_every is not None:
+        SNAPSHOT_EVERY = snapshot_every
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def on_route_change(route):
+    """Se llama al terminar cada cambio de ruta"""
+    global _changes, _last_size, _baseline, _latest
+    if not ENABLED:
+        return
+    with _lock:
+        size = tracemalloc.get_traced_memory()[0]
+        if _last_size is not None:
+            stats = _routes.get(route)
+            if stats is None:
+                stats = _routes[route] = RouteStats()
+            stats.add(size - _last_size)
+        _last_size = size
+        _changes += 1
+        if _baseline is None:
+            _baseline = take_snapshot()
+        elif _changes % SNAPSHOT_EVERY == 0:
+            _latest = take_snapshot()
+
+
+def top_growth(limit=15):
+    """Líneas de código con más memoria nueva desde el primer snapshot"""
+    with _lock:
+        if _baseline is None or _latest is None:
+            return []
+        diffs = _latest.compare_to(_baseline, "lineno")
+    return [d for d in diffs if d.size_diff > 0][:limit]
+
+
+def route_stats():
+    with _lock:
+        return {route: stats for route, stats in _routes.items()}
+
+
+def report(limit=15):
+    """Resumen en texto: memoria actual, deltas por ruta y sitios que más crecen"""
+    if not ENABLED:
+        return "Seguimiento de memoria desactivado (ADORAPP_TRACE_MEMORY=1)"
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"Memoria trazada: {current / 1024:.0f} KB (pico {peak / 1024:.0f} KB)", ""]
+    lines.append(f"{'ruta':<24} {'visitas':>8} {'delta total KB':>15} {'media KB':>9} {'máx KB':>8}")
+    for route, s in sorted(route_stats().items(), key=lambda r: r[1].total_delta, reverse=True):
+        lines.append(
+            f"{route:<24} {s.visits:>8} {s.total_delta / 1024:>15.1f} "
+            f"{s.total_delta / s.visits / 1024:>9.2f} {s.max_delta / 1024:>8.1f}"
+        )
+    growth = top_growth(limit)
+    if growth:
+        lines += ["", "Sitios que más crecen desde el primer snapshot"]
+        for d in growth:
+            frame = d.traceback[0]
+            lines.append(f"  {d.size_diff / 1024:>9.1f} KB {d.count_diff:>+7}  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+def reset():
+    global _changes, _last_size, _baseline, _latest
+    with _lock:
+        _routes.clear()
+        _changes = 0
+        _last_size = None
+        _baseline = None
+        _latest = None
+
+
+if ENABLED:
+    start()
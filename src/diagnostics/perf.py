@@ -0,0 +1,108 @@
+"""
+Medición de tiempos de los caminos críticos (carga, guardado, búsqueda, vistas).
+
+Se activa con la variable de entorno ADORAPP_PERF=1. Desactivado, `timed`
+devuelve la función original y `span` un contexto vacío: no hay ningún coste.
+Los tiempos se guardan en histogramas acotados y se consultan en /debug/perf.
+"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+ENABLED = os.getenv("ADORAPP_PERF") == "1"
+MAX_SAMPLES = 512  # últimas muestras conservadas por span
+
+_NULL_SPAN = nullcontext()
+
+
+class Histogram:
+    """Últimas MAX_SAMPLES duraciones (ms) de un span, más totales históricos"""
+
+    def __init__(self):
+        self.samples = deque(maxlen=MAX_SAMPLES)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def record(name, ms):
+    """Agrega una duración en milisegundos al histograma `name`"""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(ms)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, (time.perf_counter() - self.start) * 1000)
+
+
+def span(name):
+    """Context manager que mide el bloque: `with perf.span("nombre"): ...`"""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def timed(name):
+    """Decorador que mide cada llamada a la función (no la envuelve si está desactivado)"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Lista de dicts {name, count, p50, p95, max} ordenada por nombre"""
+    with _lock:
+        return [
+            {
+                "name": name,
+                "count": h.count,
+                "p50": h.percentile(50),
+                "p95": h.percentile(95),
+                "max": h.max,
+            }
+            for name, h in sorted(_histograms.items())
+        ]
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
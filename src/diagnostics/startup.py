@@ -0,0 +1,156 @@
+"""
+Perfil del arranque en frío (ADORAPP_PROFILE_STARTUP=1).
+
+Mide el tiempo de importación de los paquetes principales y perfila con
+cProfile main() y la carga de la biblioteca hasta que se pinta la primera
+lista. Al terminar escribe en el directorio de datos:
+    startup_report.txt  línea de tiempo, importaciones y funciones más costosas
+    startup.prof        volcado de pstats (snakeviz, python -m pstats)
+"""
+import cProfile
+import functools
+import importlib
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+ENABLED = os.getenv("ADORAPP_PROFILE_STARTUP") == "1"
+REPORT_FILE = "startup_report.txt"
+PROFILE_FILE = "startup.prof"
+# Desde 3.12 cProfile usa sys.monitoring: un único perfilador activo ve todos los hilos
+SHARED_PROFILER = sys.version_info >= (3, 12)
+
+_t0 = time.perf_counter()
+_lock = threading.Lock()
+_imports = []     # (módulo, ms)
+_marks = []       # (evento, ms desde el inicio)
+_profiles = []
+_shared = None
+_active = 0
+_data_dir = None
+_written = False
+
+
+def mark(event):
+    """Registra un evento en la línea de tiempo del arranque"""
+    if ENABLED:
+        with _lock:
+            _marks.append((event, (time.perf_counter() - _t0) * 1000))
+
+
+def measure_imports(modules):
+    """Importa los módulos en orden midiendo cada uno (lo ya importado no cuenta dos veces)"""
+    if not ENABLED:
+        return
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        _imports.append((name, (time.perf_counter() - start) * 1000))
+    mark("importaciones")
+
+
+def profiled(func):
+    """Perfila las llamadas a `func` hechas antes de pintar la primera lista"""
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _start_profile()
+        if profile is None:
+            return func(*args, **kwargs)
+        mark(f"{func.__qualname__} inicio")
+        try:
+            if SHARED_PROFILER:
+                return func(*args, **kwargs)
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            mark(f"{func.__qualname__} fin")
+            _stop_profile(profile)
+            _write_if_ready()
+    return wrapper
+
+
+def _start_profile():
+    """Perfil para una llamada, o None si ya se pintó la lista u otro perfilador está activo"""
+    global _active, _shared
+    with _lock:
+        if _data_dir is not None:
+            return None
+        if not SHARED_PROFILER:
+            _active += 1
+            return cProfile.Profile()
+        if _shared is None:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                return None
+            _shared = profile
+        _active += 1
+        return _shared
+
+
+def _stop_profile(profile):
+    global _active, _shared
+    with _lock:
+        _active -= 1
+        if not SHARED_PROFILER:
+            _profiles.append(profile)
+        elif _active == 0:
+            _shared.disable()
+            _profiles.append(_shared)
+            _shared = None
+
+
+def first_render(data_dir):
+    """Marca la primera lista pintada; el informe se escribe al terminar lo perfilado"""
+    global _data_dir
+    if not ENABLED:
+        return
+    with _lock:
+        if _data_dir is not None:
+            return
+        _data_dir = data_dir
+    mark("primera lista")
+    _write_if_ready()
+
+
+def _write_if_ready():
+    global _written
+    with _lock:
+        if _written or _data_dir is None or _active:
+            return
+        _written = True
+    try:
+        write_report(_data_dir)
+    except Exception as e:
+        print(f"Error al escribir el perfil de arranque: {e}")
+
+
+def write_report(data_dir):
+    """Escribe el informe ordenado y el volcado de cProfile en `data_dir`"""
+    out = io.StringIO()
+    out.write("Línea de tiempo (ms desde la importación de main)\n")
+    for event, ms in sorted(_marks, key=lambda m: m[1]):
+        out.write(f"  {ms:10.1f}  {event}\n")
+
+    out.write("\nImportaciones (ms, de mayor a menor)\n")
+    for name, ms in sorted(_imports, key=lambda i: i[1], reverse=True):
+        out.write(f"  {ms:10.1f}  {name}\n")
+
+    if _profiles:
+        stats = pstats.Stats(*_profiles, stream=out)
+        stats.dump_stats(os.path.join(data_dir, PROFILE_FILE))
+        out.write("\nFunciones por tiempo acumulado\n")
+        stats.sort_stats("cumulative").print_stats(40)
+        out.write("\nFunciones por tiempo propio\n")
+        stats.sort_stats("tottime").print_stats(25)
+
+    path = os.path.join(data_dir, REPORT_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    print(f"✅ Perfil de arranque guardado en {path}")
@@ -0,0 +1,144 @@
+"""
+Medidor de page.update(): controles y bytes enviados por punto de llamada.
+
+Se activa con ADORAPP_UPDATE_METER=1 (main() llama a `install(page)`).
+Cada actualización se atribuye a la primera línea del código de la app en
+la pila (fuera de flet) y se marca como redundante si no envía ningún
+cambio y llega justo después de otra actualización.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import flet
+from flet.core.protocol import CommandEncoder
+
+ENABLED = os.getenv("ADORAPP_UPDATE_METER") == "1"
+REDUNDANT_WINDOW = 0.25  # segundos entre dos updates para considerarlos seguidos
+
+_FLET_DIR = os.path.dirname(flet.__file__)
+
+
+class CallSiteStats:
+    """Totales de las actualizaciones lanzadas desde una línea de código"""
+
+    def __init__(self):
+        self.calls = 0
+        self.controls = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.redundant = 0
+
+    def as_dict(self, site):
+        return {
+            "site": site,
+            "calls": self.calls,
+            "controls": self.controls,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "redundant": self.redundant,
+        }
+
+
+_sites = {}
+_lock = threading.Lock()
+_local = threading.local()
+_last_update = [0.0]
+
+
+def _call_site():
+    """Primer frame de la pila que no pertenece a flet ni a este módulo"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_FLET_DIR) and filename != __file__:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _count_controls(commands):
+    """Controles afectados por un lote: agregados, modificados y eliminados"""
+    total = 0
+    for command in commands:
+        if command.name == "add":
+            total += len(command.commands)
+        elif command.name == "remove":
+            total += len(command.values)
+        elif command.name in ("set", "clean"):
+            total += 1
+    return total
+
+
+def _record(site, commands, size):
+    now = time.perf_counter()
+    controls = _count_controls(commands)
+    with _lock:
+        stats = _sites.get(site)
+        if stats is None:
+            stats = _sites[site] = CallSiteStats()
+        stats.calls += 1
+        stats.controls += controls
+        stats.bytes += size
+        stats.max_bytes = max(stats.max_bytes, size)
+        if controls == 0 and now - _last_update[0] < REDUNDANT_WINDOW:
+            stats.redundant += 1
+        _last_update[0] = now
+
+
+def install(page):
+    """Envuelve page.update y la conexión de la página (sin efecto si está desactivado)"""
+    if not ENABLED or getattr(page, "_update_meter_installed", False):
+        return
+    page._update_meter_installed = True
+    original_update = page.update
+    connection = page._Page__conn  # la conexión es privada en Page
+    original_send = connection.send_commands
+
+    def update(*controls):
+        outer = getattr(_local, "site", None)
+        if outer is None:
+            _local.site = _call_site()
+        try:
+            return original_update(*controls)
+        finally:
+            if outer is None:
+                _local.site = None
+
+    def send_commands(session_id, commands):
+        site = getattr(_local, "site", None)
+        if site is not None:
+            # Tamaño aproximado del mensaje (comandos serializados en JSON)
+            size = len(json.dumps(commands, cls=CommandEncoder, separators=(",", ":")))
+            _record(site, commands, size)
+        return original_send(session_id, commands)
+
+    page.update = update
+    # Los envíos sin punto de llamada (fuera de page.update) no se cuentan
+    if not getattr(connection, "_update_meter_installed", False):
+        connection._update_meter_installed = True
+        connection.send_commands = send_commands
+
+
+def stats():
+    """Lista de dicts por punto de llamada, de mayor a menor volumen enviado"""
+    with _lock:
+        rows = [s.as_dict(site) for site, s in _sites.items()]
+    return sorted(rows, key=lambda r: r["bytes"], reverse=True)
+
+
+def report():
+    """Resumen en texto para la consola"""
+    lines = [f"{'punto de llamada':<60} {'llamadas':>8} {'controles':>9} {'bytes':>10} {'máx':>8} {'redund.':>7}"]
+    for r in stats():
+        lines.append(
+            f"{r['site']:<60} {r['calls']:>8} {r['controls']:>9} {r['bytes']:>10} {r['max_bytes']:>8} {r['redundant']:>7}"
+        )
+    return "\n".join(lines)
+
+
+def reset():
+    with _lock:
+        _sites.clear()
@@ -1,8 +1,13 @@
+from diagnostics import memory, startup  # memory arranca tracemalloc si está activado
+startup.measure_imports(["flet", "models", "components", "views"])  # solo con ADORAPP_PROFILE_STARTUP=1
+
 import flet as ft
+from diagnostics import perf, update_meter
 from models import SongApp
-from views import CharacterSettingsView, SettingsView, SongFormView, EditView, MainView
+from views import BackupView, CharacterSettingsView, SettingsView, SongFormView, EditView, MainView, PerfView
 
 
+@startup.profiled
 def main(page: ft.Page):
     """Función principal de la aplicación"""
     # Configuración de la página
@@ -10,9 +15,10 @@ def main(page: ft.Page):
     page.theme_mode = ft.ThemeMode.DARK
     page.bgcolor = "#0a0e27"
     page.padding = 0
+    update_meter.install(page)  # solo con ADORAPP_UPDATE_METER=1
 
-    # Inicializar modelo de datos
-    app = SongApp()
+    # Inicializar modelo de datos (la biblioteca se carga en segundo plano)
+    app = SongApp(defer_load=True)
 
     # Inicializar vistas
     main_view = MainView(page, app)
@@ -22,47 +28,61 @@ def main(page: ft.Page):
     edit_view = EditView(page, app)
     settings_view = SettingsView(page, app)
     character_settings_view = CharacterSettingsView(page, app)
+    backup_view = BackupView(page, app)
+    perf_view = PerfView(page, app)
 
     def apply_theme():
         mode = page.session.get("theme_mode") or "dark"
         page.theme_mode = ft.ThemeMode.LIGHT if mode == "light" else ft.ThemeMode.DARK
         page.bgcolor = "#f5f6fa" if mode == "light" else "#0a0e27"
 
+    @perf.timed("route_change")
     def route_change(e):
         """Maneja los cambios de ruta"""
-        apply_theme()
-        page.views.clear()
-
-        if page.route == "/":
-            page.views.append(main_view.build())
-
-        elif page.route == "/add":
-            add_view.clear_form()
-            add_view.refresh_character_options()
-            page.views.append(add_view.build(main_view))
-
-        elif page.route == "/edit":
-            editing_song = page.session.get("editing_song")
-            if editing_song:
-                edit_view.load_song_data(editing_song)
-                edit_view.refresh_character_options()
-            page.views.append(edit_view.build(main_view))
-
-        elif page.route == "/settings":
-            page.views.append(settings_view.build(main_view))
-        elif page.route == "/settings/characters":
-            character_settings_view.refresh_characters_list()
-            page.views.append(character_settings_view.build(main_view))
-
-        page.update()
+        # ✅ La carga en segundo plano también repinta MainView: no mezclar ambos
+        with main_view.render_lock:
+            apply_theme()
+            page.views.clear()
+
+            if page.route == "/":
+                page.views.append(main_view.build())
+
+            elif page.route == "/add":
+                add_view.clear_form()
+                page.views.append(add_view.build(main_view))
+
+            elif page.route == "/edit":
+                page.views.append(edit_view.build(main_view))
+
+            elif page.route == "/settings":
+                page.views.append(settings_view.build(main_view))
+            elif page.route == "/settings/characters":
+                page.views.append(character_settings_view.build(main_view))
+            elif page.route == "/settings/backups":
+                page.views.append(backup_view.build(main_view))
+            elif page.route == "/debug/perf" and (perf.ENABLED or update_meter.ENABLED or memory.ENABLED):
+                # ✅ Ruta oculta de diagnóstico (ADORAPP_PERF / ADORAPP_UPDATE_METER / ADORAPP_TRACE_MEMORY)
+                page.views.append(perf_view.build(main_view))
+
+            page.update()
+        memory.on_route_change(page.route)
+
+    def on_close(e):
+        """Al cerrar la sesión, dejar de escuchar el almacén compartido"""
+        app.close()
+        if update_meter.ENABLED:
+            print(update_meter.report())
+        if memory.ENABLED:
+            print(memory.report())
 
     # Asignar manejadores de eventos
     page.on_route_change = route_change
+    page.on_close = on_close
     # ✅ REMOVIDO: page.on_view_pop ya que no lo usas
 
-    # Iniciar en vista principal
+    # Iniciar en vista principal y cargar la biblioteca de forma progresiva
     page.go("/")
-    main_view.search_handler(None)
+    main_view.start_loading()
 
 
 if __name__ == "__main__":
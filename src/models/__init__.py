@@ -1,3 +1,23 @@
-from .models import MUSICAL_KEYS, SongApp
+from .constants import MUSICAL_KEYS
+from .models import SongApp
+from .projection import SongSummary
+from .events import (
+    CharacterAdded, CharacterRemoved, CharacterRenamed, LibraryReloaded, PresetDeleted, PresetSaved,
+    SongAdded, SongDeleted, SongsChanged, SongUpdated,
+)
 
-__all__ = ["MUSICAL_KEYS", "SongApp"]
\ No newline at end of file
+__all__ = [
+    "MUSICAL_KEYS",
+    "SongApp",
+    "SongSummary",
+    "SongAdded",
+    "SongUpdated",
+    "SongDeleted",
+    "SongsChanged",
+    "CharacterAdded",
+    "CharacterRemoved",
+    "CharacterRenamed",
+    "PresetSaved",
+    "PresetDeleted",
+    "LibraryReloaded",
+]
\ No newline at end of file
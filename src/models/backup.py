@@ -0,0 +1,184 @@
+"""
+Copias de seguridad incrementales con contenido direccionado.
+
+Las canciones se serializan una por línea y se agrupan en bloques cuyos
+cortes dependen del contenido de cada canción, así que agregar, editar o
+quitar una canción solo cambia el bloque donde está. Cada bloque se guarda
+comprimido con su hash como nombre y cada copia es un manifiesto con la
+lista de bloques: una copia nueva solo escribe los bloques que no existían.
+
+    backups/objects/ab/ab12...            bloques (zlib)
+    backups/manifests/20260101-120000-000001.json
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+
+from .constants import BACKUP_KEEP
+from .filelock import FileLock
+
+# Un corte cada ~64 canciones de media (según el CRC de la línea) y nunca más de 256
+_BOUNDARY_MASK = 63
+_MAX_CHUNK_SONGS = 256
+
+
+def serialize_songs(songs):
+    """Una línea JSON por canción (llamar con el lock de lectura tomado)"""
+    return [json.dumps(song, ensure_ascii=False).encode("utf-8") for song in songs]
+
+
+def chunk_lines(lines):
+    """
+    Agrupa las líneas en bloques con cortes definidos por el contenido: una
+    línea cierra bloque si su CRC cae en la máscara, así una inserción o
+    borrado solo altera el bloque afectado y no desplaza los siguientes.
+    """
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if (zlib.crc32(line) & _BOUNDARY_MASK) == 0 or len(chunk) >= _MAX_CHUNK_SONGS:
+            yield b"\n".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk)
+
+
+class BackupStore:
+    """Repositorio de copias en un directorio: bloques deduplicados y manifiestos con rotación"""
+
+    def __init__(self, root, keep=BACKUP_KEEP):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._file_lock = None  # se crea junto con el directorio
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def create(self, lines, meta, label=""):
+        """
+        Guarda una copia de las canciones serializadas (`serialize_songs`) y de
+        `meta` (versión, caracteres, presets). Solo escribe los bloques nuevos.
+        Retorna el manifiesto.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        if self._file_lock is None:
+            # ✅ Otros procesos pueden estar copiando o rotando a la vez
+            self._file_lock = FileLock(os.path.join(self.root, ".lock"))
+        with self._lock, self._file_lock:
+            chunks, new_chunks, new_bytes = [], 0, 0
+            for data in chunk_lines(lines):
+                digest = hashlib.sha1(data).hexdigest()
+                chunks.append(digest)
+                path = self._object_path(digest)
+                if not os.path.exists(path):
+                    compressed = zlib.compress(data, 6)
+                    self._write_atomic(path, compressed)
+                    new_chunks += 1
+                    new_bytes += len(compressed)
+            now = datetime.now()
+            manifest = dict(meta)
+            manifest.update({
+                "id": now.strftime("%Y%m%d-%H%M%S-%f"),
+                "created": now.timestamp(),
+                "label": label,
+                "songs": len(lines),
+                "chunks": chunks,
+                "new_chunks": new_chunks,
+                "new_bytes": new_bytes,
+            })
+            content = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+            self._write_atomic(os.path.join(self.manifests_dir, manifest["id"] + ".json"), content)
+            self._rotate()
+            return manifest
+
+    def list(self):
+        """Copias disponibles, de la más reciente a la más antigua (sin la lista de bloques)"""
+        backups = []
+        for manifest in self._manifests():
+            backups.append({k: v for k, v in manifest.items() if k != "chunks"})
+        return backups
+
+    def latest_time(self):
+        """Momento (timestamp) de la última copia, o None si no hay"""
+        try:
+            names = sorted(n for n in os.listdir(self.manifests_dir) if n.endswith(".json"))
+        except OSError:
+            return None
+        if not names:
+            return None
+        return datetime.strptime(names[-1][:-5], "%Y%m%d-%H%M%S-%f").timestamp()
+
+    def load(self, backup_id):
+        """Datos de una copia: {"songs", "characters", "presets", "version"}"""
+        with open(os.path.join(self.manifests_dir, backup_id + ".json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        songs = []
+        for digest in manifest["chunks"]:
+            with open(self._object_path(digest), "rb") as f:
+                data = zlib.decompress(f.read())
+            songs.extend(json.loads(line) for line in data.split(b"\n"))
+        return {
+            "version": manifest.get("version", 0),
+            "songs": songs,
+            "characters": manifest.get("characters", []),
+            "presets": manifest.get("presets", []),
+        }
+
+    def _manifests(self):
+        try:
+            names = sorted((n for n in os.listdir(self.manifests_dir) if n.endswith(".json")), reverse=True)
+        except OSError:
+            return []
+        manifests = []
+        for name in names:
+            try:
+                with open(os.path.join(self.manifests_dir, name), "r", encoding="utf-8") as f:
+                    manifests.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Error leyendo copia {name}: {e}")
+        return manifests
+
+    def rotate(self):
+        """Aplica la rotación ahora (normalmente se hace al crear cada copia)"""
+        if not os.path.isdir(self.manifests_dir):
+            return
+        if self._file_lock is None:
+            self._file_lock = FileLock(os.path.join(self.root, ".lock"))
+        with self._lock, self._file_lock:
+            self._rotate()
+
+    def _rotate(self):
+        """Conserva las `keep` copias más recientes y borra los bloques que ya nadie usa"""
+        if self.keep is None or len(os.listdir(self.manifests_dir)) <= self.keep:
+            return
+        manifests = self._manifests()
+        for manifest in manifests[self.keep:]:
+            try:
+                os.remove(os.path.join(self.manifests_dir, manifest["id"] + ".json"))
+            except OSError:
+                pass
+        referenced = {digest for manifest in manifests[:self.keep] for digest in manifest["chunks"]}
+        if not os.path.isdir(self.objects_dir):
+            return
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            for digest in os.listdir(directory):
+                if digest not in referenced:
+                    try:
+                        os.remove(os.path.join(directory, digest))
+                    except OSError:
+                        pass
@@ -0,0 +1,76 @@
+"""
+Letras y cifrados de las canciones, fuera de user_data.json.
+
+El cuerpo de cada canción (letra y acordes) va en su propio archivo
+`bodies/<uid>.json` y solo se lee al abrir la canción, así que cargar la
+biblioteca y pintar la lista cuestan lo mismo tengan o no letra. Se usa el
+uid (ver models/sync.py) y no el id local para que el cuerpo siga a la
+canción al deshacer un borrado, restaurar una copia o sincronizar.
+"""
+import json
+import os
+import threading
+
+from .filelock import FileLock
+
+EMPTY_BODY = {"lyrics": "", "chords": ""}
+
+
+class BodyStore:
+    """Un archivo JSON por canción con su letra y sus acordes"""
+
+    def __init__(self, root):
+        self.root = root
+        self._file_lock = None  # se crea junto con el directorio
+
+    @property
+    def file_lock(self):
+        """Lock entre procesos para escribir cuerpos y el índice de letras"""
+        if self._file_lock is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._file_lock = FileLock(os.path.join(self.root, ".lock"))
+        return self._file_lock
+
+    def _path(self, uid):
+        return os.path.join(self.root, uid + ".json")
+
+    def get(self, uid):
+        """Cuerpo de la canción ({"lyrics", "chords"}); vacío si no tiene"""
+        try:
+            with open(self._path(uid), "r", encoding="utf-8") as f:
+                body = json.load(f)
+        except FileNotFoundError:
+            return dict(EMPTY_BODY)
+        except (OSError, ValueError) as e:
+            print(f"Error leyendo la letra de {uid}: {e}")
+            return dict(EMPTY_BODY)
+        return {field: body.get(field, "") for field in EMPTY_BODY}
+
+    def put(self, uid, body):
+        """Guarda el cuerpo de forma atómica (uno vacío borra el archivo). Llamar con `file_lock`"""
+        path = self._path(uid)
+        if not any(body.values()):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(body, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def uids(self):
+        """uids de las canciones que tienen cuerpo guardado"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return [name[:-5] for name in names if name.endswith(".json")]
+
+    def remove(self, uid):
+        try:
+            os.remove(self._path(uid))
+        except OSError:
+            pass
@@ -0,0 +1,31 @@
+"""
+Constantes del modelo de datos
+"""
+
+# Constantes
+MUSICAL_KEYS = [
+    "Do", "Do Menor",
+    "Do#", "Do# Menor",
+    "Re", "Re Menor",
+    "Re#", "Re# Menor",
+    "Mi", "Mi Menor",
+    "Fa", "Fa Menor",
+    "Fa#", "Fa# Menor",
+    "Sol", "Sol Menor",
+    "Sol#", "Sol# Menor",
+    "La", "La Menor",
+    "La#", "La# Menor",
+    "Si", "Si Menor"
+]
+TEMPOS = ["Lenta", "Rápida"]
+DEFAULT_CHARACTERS = ["Misionero", "Oración", "Evangelístico", "Alabanza", "Adoración"]
+
+# Segundos de espera antes de reescribir el snapshot tras un guardado
+SNAPSHOT_DELAY = 2.0
+
+# Tamaño máximo (bytes de JSON) del historial de deshacer/rehacer
+HISTORY_BUDGET = 256 * 1024
+
+# Copias de seguridad: cuántas conservar y cada cuánto hacer una automática (segundos)
+BACKUP_KEEP = 20
+BACKUP_INTERVAL = 24 * 60 * 60
@@ -0,0 +1,150 @@
+"""
+Detección de títulos casi duplicados con MinHash y LSH.
+
+"Cuan Grande es El", "Cuán grande es Él" y "Cuan grande es el (en vivo)"
+tienen la misma clave de título (sin tildes, mayúsculas ni paréntesis).
+Para lo que no es idéntico ("Cuan grande es el Señor") cada clave se parte
+en trigramas de letras y se resume en una firma MinHash; las firmas se
+agrupan por bandas (LSH), así que los candidatos de un título son los que
+comparten alguna banda con él, sin compararlo con toda la biblioteca.
+Cada candidato se confirma con la similitud de Jaccard real.
+"""
+import random
+import re
+import zlib
+
+from .fulltext import normalize
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS   # con similitud 0.7 se comparte alguna banda el 89 % de las veces
+# Jaccard mínimo (sobre trigramas) para considerar dos títulos duplicados
+SIMILARITY = 0.7
+
+_PRIME = 4294967311  # primo > 2**32
+_rng = random.Random(1729)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM)]
+_PARENS_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_WORD_RE = re.compile(r"\w+")
+
+
+def title_key(title):
+    """Título comparable: sin tildes, mayúsculas, signos ni aclaraciones entre paréntesis"""
+    text = normalize(str(title or ""))
+    words = _WORD_RE.findall(_PARENS_RE.sub(" ", text)) or _WORD_RE.findall(text)
+    return " ".join(words)
+
+
+def shingles(key):
+    """Trigramas de letras de una clave (con un espacio a cada lado)"""
+    padded = f" {key} "
+    if len(padded) <= 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def jaccard(a, b):
+    common = len(a & b)
+    return common / (len(a) + len(b) - common) if a or b else 1.0
+
+
+class TitleLSH:
+    """
+    Índice LSH sobre las claves de título distintas de la biblioteca.
+    Las canciones con la misma clave comparten una entrada, así que una
+    biblioteca llena de "(en vivo)" no agranda los grupos de LSH.
+    """
+
+    def __init__(self, songs=()):
+        self.keys = {}       # id -> clave de título
+        self.members = {}    # clave -> set de ids
+        self.buckets = {}    # hash de banda -> set de claves
+        self._signatures = {}  # trigrama -> firma (caché: el vocabulario es pequeño)
+        for song in songs:
+            self.add(song)
+
+    def _bands(self, key):
+        """Hash de cada banda de la firma MinHash de la clave"""
+        signatures = self._signatures
+        rows = []
+        for shingle in shingles(key):
+            signature = signatures.get(shingle)
+            if signature is None:
+                value = zlib.crc32(shingle.encode("utf-8"))
+                signature = signatures[shingle] = tuple((a * value + b) % _PRIME for a, b in _PERMS)
+            rows.append(signature)
+        minimum = list(map(min, zip(*rows)))
+        return [hash((band, *minimum[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+    def add(self, song):
+        song_id = song["id"]
+        key = title_key(song.get("title", ""))
+        self.keys[song_id] = key
+        members = self.members.get(key)
+        if members is None:
+            self.members[key] = members = set()
+            for band in self._bands(key):
+                self.buckets.setdefault(band, set()).add(key)
+        members.add(song_id)
+
+    def remove(self, song_id):
+        key = self.keys.pop(song_id, None)
+        if key is None:
+            return
+        members = self.members[key]
+        members.discard(song_id)
+        if members:
+            return
+        del self.members[key]
+        for band in self._bands(key):
+            bucket = self.buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band]
+
+    def similar(self, title, exclude=None):
+        """
+        Canciones con un título parecido: [(id, similitud)] de la más a la
+        menos parecida, sin `exclude` (el id de la propia canción).
+        """
+        key = title_key(title)
+        candidates = {key} if key in self.members else set()
+        for band in self._bands(key):
+            candidates.update(self.buckets.get(band, ()))
+        own = shingles(key)
+        matches = []
+        for candidate in candidates:
+            score = 1.0 if candidate == key else jaccard(own, shingles(candidate))
+            if score >= SIMILARITY:
+                matches.extend((song_id, score) for song_id in self.members[candidate] if song_id != exclude)
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def clusters(self):
+        """
+        Todos los grupos de duplicados (listas de ids, de al menos dos), sin
+        comparar todos contra todos. Cada grupo se arma alrededor de un título
+        (el más repetido primero) con los candidatos de sus bandas que se le
+        parecen: no se encadenan parecidos ("A" ~ "B" ~ "C" no junta A y C).
+        """
+        members = self.members
+        leaders = sorted(members, key=lambda key: (-len(members[key]), key))
+        assigned = set()
+        groups = []
+        for key in leaders:
+            if key in assigned:
+                continue
+            assigned.add(key)
+            own = shingles(key)
+            candidates = set()
+            for band in self._bands(key):
+                candidates.update(self.buckets.get(band, ()))
+            ids = list(members[key])
+            for candidate in candidates - assigned:
+                if jaccard(own, shingles(candidate)) >= SIMILARITY:
+                    assigned.add(candidate)
+                    ids.extend(members[candidate])
+            if len(ids) > 1:
+                groups.append(sorted(ids))
+        return groups
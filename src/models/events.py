@@ -0,0 +1,60 @@
+"""
+Eventos de cambio publicados por el almacén de canciones.
+
+Las vistas se suscriben con `SongApp.subscribe(listener)` y reciben estos
+eventos después de cada cambio guardado, tanto de su propia sesión como de
+otras, para actualizar solo lo afectado en lugar de refrescar todo.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SongAdded:
+    song_id: int
+
+
+@dataclass(frozen=True)
+class SongUpdated:
+    song_id: int
+
+
+@dataclass(frozen=True)
+class SongDeleted:
+    song_id: int
+
+
+@dataclass(frozen=True)
+class SongsChanged:
+    """Cambio en lote (varias canciones): refrescar la lista una sola vez"""
+    song_ids: tuple
+
+
+@dataclass(frozen=True)
+class CharacterAdded:
+    name: str
+
+
+@dataclass(frozen=True)
+class CharacterRemoved:
+    name: str
+
+
+@dataclass(frozen=True)
+class CharacterRenamed:
+    old: str
+    new: str
+
+
+@dataclass(frozen=True)
+class PresetSaved:
+    name: str
+
+
+@dataclass(frozen=True)
+class PresetDeleted:
+    name: str
+
+
+@dataclass(frozen=True)
+class LibraryReloaded:
+    """Los datos se recargaron desde disco (cambios de otro proceso): refrescar todo"""
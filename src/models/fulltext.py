@@ -0,0 +1,185 @@
+"""
+Índice invertido de letras con ranking BM25, guardado en disco.
+
+Buscar en las letras no lee ningún cuerpo: el índice guarda, por término,
+en qué canciones aparece y cuántas veces, y por canción su longitud.
+Se guarda con `marshal` en `bodies/lyrics.index`, se carga la primera vez
+que se busca y se relee solo si otro proceso lo cambió.
+
+La búsqueda ignora mayúsculas y tildes ("jesus" encuentra "Jesús") y la
+última palabra vale como prefijo mientras se escribe ("san" → "santo").
+"""
+import marshal
+import math
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+INDEX_FORMAT = 1
+K1 = 1.2
+B = 0.75
+# Máximo de términos en que se expande el prefijo de la última palabra
+MAX_PREFIX_TERMS = 50
+
+_WORD_RE = re.compile(r"\w+")
+_CHORD_RE = re.compile(r"\[[^\]]*\]")
+
+
+def normalize(text):
+    """Minúsculas y sin tildes"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _WORD_RE.findall(normalize(text))
+
+
+def body_terms(body):
+    """Términos de un cuerpo: la letra y el cifrado sin los acordes entre corchetes"""
+    return tokenize(body.get("lyrics", "")) + tokenize(_CHORD_RE.sub(" ", body.get("chords", "")))
+
+
+class LyricsIndex:
+    """
+    Índice invertido término -> {uid: frecuencia} con longitudes por canción.
+    `docs` guarda también el id local de cada canción para devolverla sin
+    recorrer la biblioteca.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.docs = {}       # uid -> [longitud, id local]
+        self.postings = {}   # término -> {uid: frecuencia}
+        self.total_length = 0
+        self._terms = None   # términos ordenados (para prefijos), se calcula al buscar
+        self._signature = None
+        self._lock = threading.RLock()
+
+    def sync(self):
+        """Carga o relee el índice si el archivo cambió"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    data = marshal.loads(f.read())
+                if data.get("format") != INDEX_FORMAT:
+                    raise ValueError("formato desconocido")
+            except (OSError, ValueError, EOFError, TypeError) as e:
+                print(f"Índice de letras inválido, se vaciará: {e}")
+                data = {}
+            self.docs = data.get("docs", {})
+            self.postings = data.get("postings", {})
+            self.total_length = sum(length for length, _ in self.docs.values())
+            self._terms = None
+            self._signature = signature
+
+    def save(self):
+        with self._lock:
+            data = {"format": INDEX_FORMAT, "docs": self.docs, "postings": self.postings}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(marshal.dumps(data))
+                os.replace(tmp_path, self.path)
+                stat = os.stat(self.path)
+                self._signature = (stat.st_size, stat.st_mtime_ns)
+            except OSError as e:
+                print(f"Error guardando el índice de letras: {e}")
+
+    def update(self, uid, song_id, terms, old_terms=None):
+        """
+        Reemplaza los términos de una canción (sin términos la quita del
+        índice). Con `old_terms` solo se tocan las listas de esos términos.
+        """
+        with self._lock:
+            self.remove(uid, old_terms)
+            if not terms:
+                return
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    self.postings[term] = postings = {}
+                    self._terms = None
+                postings[uid] = count
+            self.docs[uid] = [len(terms), song_id]
+            self.total_length += len(terms)
+
+    def remove(self, uid, terms=None):
+        """Quita una canción; sin `terms` hay que revisar todo el vocabulario"""
+        with self._lock:
+            doc = self.docs.pop(uid, None)
+            if doc is None:
+                return
+            self.total_length -= doc[0]
+            for term in (set(terms) if terms is not None else list(self.postings)):
+                postings = self.postings.get(term)
+                if postings is not None and postings.pop(uid, None) is not None and not postings:
+                    del self.postings[term]
+                    self._terms = None
+
+    def clear(self):
+        with self._lock:
+            self.docs, self.postings, self.total_length, self._terms = {}, {}, 0, None
+
+    def _expand(self, query):
+        """Términos de la consulta; la última palabra (si no acaba en espacio) también como prefijo"""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or not query[-1:].isalnum():
+            return [[w] for w in words]
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        prefix = words[-1]
+        start = bisect_left(self._terms, prefix)
+        matches = []
+        for term in self._terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return [[w] for w in words[:-1]] + [matches or [prefix]]
+
+    def search(self, query):
+        """
+        Canciones que contienen todas las palabras (la última como prefijo),
+        ordenadas por BM25: [(uid, id local, puntuación)]
+        """
+        with self._lock:
+            groups = self._expand(query)
+            if not groups or not self.docs:
+                return []
+            n = len(self.docs)
+            average = self.total_length / n
+            scores = None
+            for terms in groups:
+                group_scores = {}
+                for term in terms:
+                    postings = self.postings.get(term, {})
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for uid, tf in postings.items():
+                        length = self.docs[uid][0]
+                        score = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+                        group_scores[uid] = max(group_scores.get(uid, 0), score)
+                if scores is None:
+                    scores = group_scores
+                else:
+                    scores = {uid: s + group_scores[uid] for uid, s in scores.items() if uid in group_scores}
+                if not scores:
+                    return []
+            ranked = sorted(scores.items(), key=lambda item: -item[1])
+            return [(uid, self.docs[uid][1], score) for uid, score in ranked]
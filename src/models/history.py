@@ -0,0 +1,160 @@
+"""
+Historial de deshacer/rehacer basado en deltas.
+
+Cada entrada guarda solo lo que cambió en una operación (la canción
+agregada o eliminada, o los campos antes/después de una edición), nunca
+copias de la biblioteca, así que deshacer cuesta lo mismo que el cambio.
+El historial se guarda en `history.json` junto a user_data.json y se
+limita por tamaño: al superar el presupuesto se olvidan las entradas
+más antiguas. Cada entrada tiene un id para poder deshacer exactamente
+esa operación (el "Deshacer" de un aviso) aunque después otra sesión
+haya registrado otras.
+
+Formato de los cambios:
+    {"op": "add", "song": {...}}
+    {"op": "delete", "song": {...}}
+    {"op": "update", "id": 3, "before": {"key": "Re"}, "after": {"key": "Mi"}}
+    {"op": "add_character", "name": "..."}
+    {"op": "remove_character", "name": "...", "position": 2}
+    {"op": "rename_character", "old": "...", "new": "...", "songs": True}
+        (con "songs" el renombrado incluye las canciones; sin él, sus
+        ediciones van como deltas "update" aparte)
+"""
+import json
+import os
+import threading
+import uuid
+
+from .constants import HISTORY_BUDGET
+
+
+def entry_size(entry):
+    """Tamaño aproximado de una entrada (bytes de su JSON)"""
+    return len(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+
+class History:
+    """Pilas de deshacer y rehacer con presupuesto de memoria, persistidas en disco"""
+
+    def __init__(self, path, budget=HISTORY_BUDGET):
+        self.path = path
+        self.budget = budget
+        self.undo_stack = []  # entradas {"id", "label", "changes", "size"}; la última es la más reciente
+        self.redo_stack = []
+        self.size = 0
+        self._signature = None
+        self._lock = threading.RLock()
+
+    def sync(self):
+        """Relee el archivo si cambió (otro proceso guardó); llamar con el lock de archivo tomado"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error cargando historial: {e}")
+                data = {}
+            self.undo_stack = [self._sized(entry) for entry in data.get("undo", [])]
+            self.redo_stack = [self._sized(entry) for entry in data.get("redo", [])]
+            self.size = sum(entry["size"] for entry in self.undo_stack + self.redo_stack)
+            self._signature = signature
+            self._trim()
+
+    @staticmethod
+    def _sized(entry):
+        if "size" not in entry:
+            entry["size"] = entry_size(entry)
+        return entry
+
+    def save(self):
+        """Escribe el historial de forma atómica"""
+        with self._lock:
+            data = {"undo": self.undo_stack, "redo": self.redo_stack}
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                stat = os.stat(self.path)
+                self._signature = (stat.st_size, stat.st_mtime_ns)
+            except OSError as e:
+                print(f"Error guardando historial: {e}")
+
+    def record(self, label, changes):
+        """Agrega una operación nueva (descarta lo que se podía rehacer). Retorna el id de la entrada"""
+        if not changes:
+            return None
+        with self._lock:
+            self.size -= sum(entry["size"] for entry in self.redo_stack)
+            self.redo_stack.clear()
+            entry_id = uuid.uuid4().hex[:12]
+            self.push("undo", {"id": entry_id, "label": label, "changes": changes})
+            return entry_id
+
+    def push(self, kind, entry):
+        """
+        Apila una entrada en "undo" o "redo" respetando el presupuesto.
+        Una entrada que por sí sola lo supera no se guarda (no se podrá
+        deshacer), pero tampoco se pierden las anteriores.
+        """
+        with self._lock:
+            self._sized(entry)
+            if entry["size"] > self.budget:
+                print(f"Historial: «{entry['label']}» es demasiado grande para poder deshacerse")
+                return
+            self._stack(kind).append(entry)
+            self.size += entry["size"]
+            self._trim()
+
+    def pop(self, kind):
+        """Desapila la entrada más reciente de "undo" o "redo" (None si está vacía)"""
+        with self._lock:
+            stack = self._stack(kind)
+            if not stack:
+                return None
+            entry = stack.pop()
+            self.size -= entry["size"]
+            return entry
+
+    def take(self, kind, entry_id):
+        """Saca de "undo" o "redo" la entrada con ese id (None si ya no está)"""
+        with self._lock:
+            stack = self._stack(kind)
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i].get("id") == entry_id:
+                    entry = stack.pop(i)
+                    self.size -= entry["size"]
+                    return entry
+            return None
+
+    def peek_label(self, kind):
+        with self._lock:
+            stack = self._stack(kind)
+            return stack[-1]["label"] if stack else None
+
+    def entries(self):
+        """Todas las entradas guardadas (deshacer y rehacer)"""
+        with self._lock:
+            return self.undo_stack + self.redo_stack
+
+    def clear(self):
+        with self._lock:
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.size = 0
+
+    def _stack(self, kind):
+        return self.undo_stack if kind == "undo" else self.redo_stack
+
+    def _trim(self):
+        """Olvida las entradas más antiguas hasta entrar en el presupuesto"""
+        while self.size > self.budget and (self.undo_stack or self.redo_stack):
+            stack = self.undo_stack if self.undo_stack else self.redo_stack
+            self.size -= stack.pop(0)["size"]
@@ -0,0 +1,500 @@
+"""
+Índices en memoria sobre la biblioteca de canciones
+"""
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+
+from .constants import MUSICAL_KEYS, TEMPOS
+from .duplicates import TitleLSH
+
+SORT_FIELDS = ("added", "title", "key", "tempo")
+FILTER_DIMENSIONS = ("key", "character", "tempo")
+
+_KEY_RANK = {key: i for i, key in enumerate(MUSICAL_KEYS)}
+_TEMPO_RANK = {tempo: i for i, tempo in enumerate(TEMPOS)}
+
+
+def split_characters(value):
+    """Convierte el string de caracteres separado por comas en una lista"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(c).strip() for c in value if str(c).strip()]
+    return [c.strip() for c in str(value).split(",") if c.strip()]
+
+
+def collation_key(text):
+    """
+    Clave de ordenación para títulos en español: ignora mayúsculas, tildes
+    y signos iniciales (¡, ¿, comillas) y ordena la ñ después de la n.
+    """
+    text = str(text or "").casefold().replace("ñ", "n\uffff")
+    decomposed = unicodedata.normalize("NFKD", text)
+    base = "".join(c for c in decomposed if not unicodedata.combining(c))
+    start = 0
+    while start < len(base) and not base[start].isalnum():
+        start += 1
+    return base[start:]
+
+
+def _sort_key(field, song):
+    """Clave completa de una canción para el campo dado (el id desempata)"""
+    title = collation_key(song.get("title", ""))
+    if field == "title":
+        return (title, song["id"])
+    if field == "key":
+        key = song.get("key") or ""
+        return (_KEY_RANK.get(key, len(_KEY_RANK)), key, title, song["id"])
+    tempo = song.get("tempo") or ""
+    return (_TEMPO_RANK.get(tempo, len(_TEMPO_RANK)), tempo, title, song["id"])
+
+
+class SortOrder:
+    """
+    Lista de canciones ordenada por un campo, mantenida con bisect en cada
+    alta o baja para no reordenar la biblioteca en cada consulta.
+    """
+
+    def __init__(self, field, songs):
+        self.field = field
+        self.keys = {song["id"]: _sort_key(field, song) for song in songs}  # id -> clave
+        self.entries = sorted(self.keys.values())
+
+    def add(self, song):
+        key = _sort_key(self.field, song)
+        self.keys[song["id"]] = key
+        bisect.insort(self.entries, key)
+
+    def remove(self, song_id):
+        key = self.keys.pop(song_id, None)
+        if key is not None:
+            i = bisect.bisect_left(self.entries, key)
+            if i < len(self.entries) and self.entries[i] == key:
+                del self.entries[i]
+
+    def ids(self, descending=False):
+        """Ids en orden (el id es el último elemento de cada clave)"""
+        entries = reversed(self.entries) if descending else self.entries
+        return (entry[-1] for entry in entries)
+
+
+def filter_values(value):
+    """Normaliza un filtro: "" o None -> (), "Re" -> ("Re",), ["Re", "Sol"] -> ("Re", "Sol")"""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(v for v in value if v)
+
+
+def popcount(bits):
+    """Número de bits a 1 (int.bit_count existe desde Python 3.10)"""
+    return bits.bit_count() if hasattr(bits, "bit_count") else bin(bits).count("1")
+
+
+def song_matches(song, query="", key="", character="", tempo="", modes=None):
+    """Indica si una canción cumple los filtros (misma semántica que la búsqueda)"""
+    if query and query.lower() not in str(song.get("title", "")).lower():
+        return False
+    modes = modes or {}
+    for dimension, values in zip(FILTER_DIMENSIONS, (key, character, tempo)):
+        values = filter_values(values)
+        if not values:
+            continue
+        if dimension == "character":
+            song_values = set(split_characters(song.get("character", "")))
+        else:
+            song_values = {song.get(dimension)}
+        if modes.get(dimension) == "and":
+            if not song_values.issuperset(values):
+                return False
+        elif song_values.isdisjoint(values):
+            return False
+    return True
+
+
+def preset_filters(preset):
+    """Argumentos de búsqueda (query, key, character, tempo, modes) de un preset"""
+    return (
+        preset.get("query", ""),
+        preset.get("key", []),
+        preset.get("character", []),
+        preset.get("tempo", []),
+        preset.get("modes") or {},
+    )
+
+
+def bits_from_slots(slots):
+    """Construye un bitset a partir de posiciones en O(n) (sin OR repetidos sobre el entero)"""
+    slots = list(slots)
+    if not slots:
+        return 0
+    buffer = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        buffer[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class SongIndex:
+    """
+    Índices por id, tono, carácter y tempo para evitar recorrer
+    toda la lista de canciones en cada búsqueda.
+
+    Cada canción ocupa una posición (slot) según su orden de inserción y
+    cada valor de tono, carácter o tempo guarda un bitset (entero de Python)
+    con las posiciones de sus canciones: combinar filtros es un AND/OR de
+    enteros y contar resultados un popcount.
+    """
+
+    def __init__(self):
+        self.by_id = {}          # id -> canción
+        self.order = {}          # id -> posición de inserción (monótona, también es su bit)
+        self.slot_ids = []       # posición -> id (None si se eliminó)
+        self._titles = {}        # id -> título en minúsculas (None: se calcula al primer uso)
+        self.key_bits = {}       # tono -> bitset de posiciones
+        self.character_bits = {} # carácter -> bitset de posiciones
+        self.tempo_bits = {}     # tempo -> bitset de posiciones
+        self.max_id = 0
+        self.presets = {}        # nombre -> [filtros del preset, bitset de resultados]
+        self._sort_orders = {}   # campo -> SortOrder (se crean al primer uso)
+        self._title_lsh = None   # TitleLSH de títulos parecidos (al primer uso)
+        self._sort_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, songs):
+        """Construye los índices a partir de la lista de canciones"""
+        index = cls()
+        index.add_many(songs)
+        return index
+
+    def to_state(self, songs):
+        """
+        Estado compacto de los índices para el snapshot binario.
+        Solo contiene tipos básicos (listas, dicts, strings, ints).
+        """
+        index = self
+        if len(self.slot_ids) != len(songs):
+            # Hay posiciones libres por eliminaciones: compactar para el snapshot
+            index = SongIndex.build(songs)
+        return {
+            "ids": list(index.slot_ids),
+            "key_bits": dict(index.key_bits),
+            "character_bits": dict(index.character_bits),
+            "tempo_bits": dict(index.tempo_bits),
+            "max_id": index.max_id,
+        }
+
+    @classmethod
+    def from_state(cls, songs, state):
+        """Reconstruye los índices desde el estado guardado sin recorrer canciones una a una"""
+        index = cls()
+        ids = state["ids"]
+        index.by_id = dict(zip(ids, songs))
+        index.order = dict(zip(ids, range(len(ids))))
+        index.slot_ids = list(ids)
+        # Los títulos en minúsculas no van en el snapshot: se calculan en la primera búsqueda de texto
+        index._titles = None
+        index.key_bits = dict(state["key_bits"])
+        index.character_bits = dict(state["character_bits"])
+        index.tempo_bits = dict(state["tempo_bits"])
+        index.max_id = state["max_id"]
+        return index
+
+    def __len__(self):
+        return len(self.by_id)
+
+    @property
+    def titles(self):
+        """id -> título en minúsculas (tras cargar el snapshot se construye al primer uso)"""
+        titles = self._titles
+        if titles is None:
+            # Varias lecturas simultáneas pueden pedirlo a la vez
+            with self._sort_lock:
+                if self._titles is None:
+                    self._titles = {song_id: str(song.get("title", "")).lower() for song_id, song in self.by_id.items()}
+                titles = self._titles
+        return titles
+
+    def add(self, song):
+        """Indexa una canción"""
+        self.add_many([song])
+
+    def add_many(self, songs):
+        """
+        Indexa un lote de canciones. Los bits de todo el lote se agregan con
+        un único OR por valor (un OR por canción sería cuadrático).
+        """
+        pending = (
+            (self.key_bits, defaultdict(list)),
+            (self.character_bits, defaultdict(list)),
+            (self.tempo_bits, defaultdict(list)),
+        )
+        key_slots, character_slots, tempo_slots = (slots for _, slots in pending)
+        slot_ids, by_id, order, titles = self.slot_ids, self.by_id, self.order, self._titles
+        slot = len(slot_ids)
+        max_id = self.max_id
+        preset_slots = [(state[0], state, []) for state in self.presets.values()]
+        for song in songs:
+            song_id = song["id"]
+            slot_ids.append(song_id)
+            by_id[song_id] = song
+            order[song_id] = slot
+            if titles is not None:
+                titles[song_id] = str(song.get("title", "")).lower()
+            key = song.get("key")
+            if key:
+                key_slots[key].append(slot)
+            tempo = song.get("tempo")
+            if tempo:
+                tempo_slots[tempo].append(slot)
+            characters = song.get("character")
+            if characters:
+                for char in split_characters(characters):
+                    character_slots[char].append(slot)
+            if isinstance(song_id, int) and song_id > max_id:
+                max_id = song_id
+            for sort_order in self._sort_orders.values():
+                sort_order.add(song)
+            if self._title_lsh is not None:
+                self._title_lsh.add(song)
+            for entry in preset_slots:
+                if song_matches(song, *preset_filters(entry[0])):
+                    entry[2].append(slot)
+            slot += 1
+        self.max_id = max_id
+        for mapping, slots_by_value in pending:
+            for value, slots in slots_by_value.items():
+                mapping[value] = mapping.get(value, 0) | bits_from_slots(slots)
+        for preset, state, slots in preset_slots:
+            state[1] |= bits_from_slots(slots)
+
+    def remove(self, song):
+        """Quita una canción de los índices"""
+        self.remove_many([song])
+
+    def remove_many(self, songs):
+        """Quita un lote de canciones con un único AND por valor afectado"""
+        removed = []
+        for song in songs:
+            song_id = song["id"]
+            self.by_id.pop(song_id, None)
+            if self._titles is not None:
+                self._titles.pop(song_id, None)
+            slot = self.order.pop(song_id, None)
+            if slot is not None:
+                self.slot_ids[slot] = None
+                removed.append((song, slot))
+            for sort_order in self._sort_orders.values():
+                sort_order.remove(song_id)
+            if self._title_lsh is not None:
+                self._title_lsh.remove(song_id)
+        self._clear_slots(removed)
+        mask = ~bits_from_slots(slot for _, slot in removed)
+        for state in self.presets.values():
+            state[1] &= mask
+
+    def reindex(self, song, previous):
+        """Actualiza los índices de una canción modificada en su lugar"""
+        self.reindex_many([(song, previous)])
+
+    def reindex_many(self, changes):
+        """
+        Actualiza en su lugar un lote de canciones modificadas
+        [(canción, versión anterior)], con un AND y un OR por valor afectado.
+        by_id, order y titles se reasignan sin sacar la clave, así el orden
+        de los dicts sigue siendo el de inserción.
+        """
+        updated = []
+        for song, previous in changes:
+            song_id = song["id"]
+            slot = self.order[song_id]
+            self.by_id[song_id] = song
+            if self._titles is not None:
+                self._titles[song_id] = str(song.get("title", "")).lower()
+            updated.append((song, previous, slot))
+            for sort_order in self._sort_orders.values():
+                sort_order.remove(song_id)
+                sort_order.add(song)
+            if self._title_lsh is not None and song.get("title") != previous.get("title"):
+                self._title_lsh.remove(song_id)
+                self._title_lsh.add(song)
+        self._clear_slots((previous, slot) for _, previous, slot in updated)
+        for mapping, slots_by_value in self._slots_by_value((song, slot) for song, _, slot in updated):
+            for value, slots in slots_by_value.items():
+                mapping[value] = mapping.get(value, 0) | bits_from_slots(slots)
+        mask = bits_from_slots(slot for _, _, slot in updated)
+        for state in self.presets.values():
+            filters = preset_filters(state[0])
+            matched = bits_from_slots(slot for song, _, slot in updated if song_matches(song, *filters))
+            state[1] = (state[1] & ~mask) | matched
+
+    def _slots_by_value(self, songs_and_slots):
+        """Agrupa las posiciones por dimensión y valor: [(bitsets, {valor: [posiciones]})]"""
+        pending = (
+            (self.key_bits, defaultdict(list)),
+            (self.character_bits, defaultdict(list)),
+            (self.tempo_bits, defaultdict(list)),
+        )
+        key_slots, character_slots, tempo_slots = (slots for _, slots in pending)
+        for song, slot in songs_and_slots:
+            key = song.get("key")
+            if key:
+                key_slots[key].append(slot)
+            tempo = song.get("tempo")
+            if tempo:
+                tempo_slots[tempo].append(slot)
+            for char in split_characters(song.get("character", "")):
+                character_slots[char].append(slot)
+        return pending
+
+    def _clear_slots(self, songs_and_slots):
+        """Apaga los bits de las posiciones dadas según los valores de cada canción"""
+        for mapping, slots_by_value in self._slots_by_value(songs_and_slots):
+            for value, slots in slots_by_value.items():
+                bits = mapping.get(value)
+                if bits is None:
+                    continue
+                bits &= ~bits_from_slots(slots)
+                if bits:
+                    mapping[value] = bits
+                else:
+                    del mapping[value]
+
+    def _bits_by_dimension(self, dimension):
+        return {"key": self.key_bits, "character": self.character_bits, "tempo": self.tempo_bits}[dimension]
+
+    def dimension_bits(self, dimension, values, mode="or"):
+        """
+        Bitset de las canciones con alguno ("or") o todos ("and") los valores,
+        o None si no hay valores (sin filtro en esa dimensión).
+        """
+        values = filter_values(values)
+        if not values:
+            return None
+        mapping = self._bits_by_dimension(dimension)
+        result = mapping.get(values[0], 0)
+        for value in values[1:]:
+            if mode == "and":
+                result &= mapping.get(value, 0)
+            else:
+                result |= mapping.get(value, 0)
+        return result
+
+    def filter_bits(self, key="", character="", tempo="", modes=None):
+        """
+        Bitset de las canciones que cumplen todos los filtros exactos
+        (AND entre dimensiones), o None si no hay ninguno activo.
+        `modes` indica "and"/"or" por dimensión ("or" por defecto).
+        """
+        modes = modes or {}
+        result = None
+        for dimension, values in zip(FILTER_DIMENSIONS, (key, character, tempo)):
+            bits = self.dimension_bits(dimension, values, modes.get(dimension, "or"))
+            if bits is not None:
+                result = bits if result is None else result & bits
+        return result
+
+    def title_bits(self, query_lower):
+        """Bitset de las canciones cuyo título contiene el texto (ya en minúsculas)"""
+        order = self.order
+        return bits_from_slots(order[song_id] for song_id, title in self.titles.items() if query_lower in title)
+
+    def ids_from_bits(self, bits):
+        """Ids de los bits a 1, en orden de inserción"""
+        slot_ids = self.slot_ids
+        binary = bin(bits)[:1:-1]  # bit 0 primero
+        ids = []
+        i = binary.find("1")
+        while i != -1:
+            ids.append(slot_ids[i])
+            i = binary.find("1", i + 1)
+        return ids
+
+    def matching_bits(self, query="", key="", character="", tempo="", modes=None):
+        """Bitset de todas las canciones que cumplen los filtros y el texto"""
+        bits = self.filter_bits(key, character, tempo, modes)
+        if query:
+            title_bits = self.title_bits(query.lower())
+            bits = title_bits if bits is None else bits & title_bits
+        if bits is None:
+            bits = bits_from_slots(self.order.values())
+        return bits
+
+    def set_presets(self, presets):
+        """Materializa los resultados de todos los presets (al cargar la biblioteca)"""
+        self.presets = {}
+        for preset in presets:
+            self.set_preset(preset)
+
+    def set_preset(self, preset):
+        """Crea o reemplaza un preset; desde aquí se mantiene en add/remove/reindex"""
+        self.presets[preset["name"]] = [preset, self.matching_bits(*preset_filters(preset))]
+
+    def drop_preset(self, name):
+        self.presets.pop(name, None)
+
+    def preset_ids(self, name):
+        """Ids del preset en orden de inserción, o None si no existe"""
+        state = self.presets.get(name)
+        return None if state is None else self.ids_from_bits(state[1])
+
+    def facet_counts(self, key="", character="", tempo="", title_bits=None, modes=None):
+        """
+        Para cada dimensión (tono, carácter, tempo), cuántas canciones daría
+        cada valor manteniendo fijos los demás filtros y el texto buscado.
+        Cada conteo es un AND y un popcount sobre bitsets.
+        """
+        modes = modes or {}
+        active = {
+            dimension: self.dimension_bits(dimension, values, modes.get(dimension, "or"))
+            for dimension, values in zip(FILTER_DIMENSIONS, (key, character, tempo))
+        }
+        facets = {}
+        for dimension in FILTER_DIMENSIONS:
+            base = title_bits
+            for name, bits in active.items():
+                if name != dimension and bits is not None:
+                    base = bits if base is None else base & bits
+            mapping = self._bits_by_dimension(dimension)
+            if base is None:
+                facets[dimension] = {value: popcount(bits) for value, bits in mapping.items()}
+            else:
+                facets[dimension] = {value: popcount(bits & base) for value, bits in mapping.items()}
+        return facets
+
+    def sort_order(self, field):
+        """
+        Orden mantenido para `field` ("title", "key" o "tempo"). Se construye
+        la primera vez que se pide y desde entonces se actualiza en add/remove.
+        """
+        sort_order = self._sort_orders.get(field)
+        if sort_order is None:
+            # Varias lecturas simultáneas pueden pedirlo a la vez
+            with self._sort_lock:
+                sort_order = self._sort_orders.get(field)
+                if sort_order is None:
+                    sort_order = SortOrder(field, self.by_id.values())
+                    self._sort_orders[field] = sort_order
+        return sort_order
+
+    def title_lsh(self):
+        """TitleLSH de la biblioteca: se construye al primer uso y se mantiene en add/remove"""
+        if self._title_lsh is None:
+            with self._sort_lock:
+                if self._title_lsh is None:
+                    self._title_lsh = TitleLSH(self.by_id.values())
+        return self._title_lsh
+
+    def sort_key(self, field):
+        """Función clave para ordenar un subconjunto de ids por `field`"""
+        if field == "added":
+            return self.order.__getitem__
+        return self.sort_order(field).keys.__getitem__
+
+    def ordered_ids(self, field, descending=False):
+        """Todos los ids en el orden de `field`, sin ordenar la biblioteca"""
+        if field == "added":
+            return reversed(self.order) if descending else iter(self.order)
+        return self.sort_order(field).ids(descending)
@@ -0,0 +1,92 @@
+"""
+Lock de lectores/escritor para el almacén compartido
+"""
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Permite varios lectores simultáneos o un único escritor.
+
+    - El escritor es reentrante y puede leer mientras escribe.
+    - Un hilo que ya está leyendo puede volver a leer aunque haya
+      escritores esperando (evita bloqueos por lecturas anidadas).
+    - Los escritores en espera tienen prioridad sobre lectores nuevos.
+    - No se puede pasar de lectura a escritura (upgrade).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self):
+        return getattr(self._local, "depth", 0)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if self._read_depth() == 0:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+            self._local.depth = self._read_depth() + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth -= 1
+                return
+            self._local.depth = self._read_depth() - 1
+            if self._local.depth == 0:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if self._read_depth():
+                raise RuntimeError("No se puede escribir mientras se mantiene una lectura")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
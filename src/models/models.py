@@ -1,40 +1,44 @@
-import json
 import os
-import shutil
-
-# Constantes
-MUSICAL_KEYS = [
-    "Do", "Do Menor",
-    "Do#", "Do# Menor",
-    "Re", "Re Menor",
-    "Re#", "Re# Menor",
-    "Mi", "Mi Menor",
-    "Fa", "Fa Menor",
-    "Fa#", "Fa# Menor",
-    "Sol", "Sol Menor",
-    "Sol#", "Sol# Menor",
-    "La", "La Menor",
-    "La#", "La# Menor",
-    "Si", "Si Menor"
-]
-DEFAULT_CHARACTERS = ["Misionero", "Oración", "Evangelístico", "Alabanza", "Adoración"]
+
+from .projection import SongSummary, summarize
+from .store import get_shared_store
 
 
 class SongApp:
-    """Gestiona la lógica de negocio de canciones y caracteres"""
+    """
+    Gestiona la lógica de negocio de canciones y caracteres.
+
+    Es una fachada ligera por sesión sobre el SongStore compartido del
+    proceso: todas las sesiones ven los mismos datos y se enteran de los
+    cambios guardados por las demás.
+    """
     
-    def __init__(self):
+    def __init__(self, defer_load=False, data_dir=None):
+        """
+        Con `defer_load=True` no se cargan los datos en el constructor:
+        hay que llamar a `load_in_background()` (arranque progresivo).
+        `data_dir` permite usar otro directorio de datos (scripts y pruebas).
+        """
         # ✅ Obtener el directorio de datos de la aplicación (escribible)
-        self.data_dir = self._get_data_directory()
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            self.data_dir = data_dir
+        else:
+            self.data_dir = self._get_data_directory()
         self.data_file = os.path.join(self.data_dir, "user_data.json")
         
         # ✅ Archivo inicial (solo lectura, en assets)
         self.initial_data_file = "./storage/data/user_data.json"
         
-        # ✅ Asegurar que existe el archivo de datos
-        self._ensure_data_file()
-        
-        self.user_data = self.load_user_data()
+        # ✅ Almacén compartido por todas las sesiones del proceso
+        self.store = get_shared_store(self.data_file, self.initial_data_file)
+        self.snapshot_file = self.store.snapshot_file
+
+        self._listeners = []
+        self.store.subscribe(self._on_store_change)
+
+        if not defer_load:
+            self.store.ensure_loaded()
 
     def _get_data_directory(self):
         """
@@ -62,162 +66,327 @@ class SongApp:
             os.makedirs(data_dir, exist_ok=True)
             return data_dir
 
-    def _ensure_data_file(self):
+    @property
+    def user_data(self):
+        return self.store.user_data
+
+    @property
+    def index(self):
+        return self.store.index
+
+    def close(self):
+        """Desconecta la sesión del almacén compartido"""
+        self.store.unsubscribe(self._on_store_change)
+        self._listeners.clear()
+
+    # ===== CARGA Y PERSISTENCIA =====
+
+    @property
+    def is_loading(self):
+        """True mientras la carga en segundo plano no ha terminado"""
+        return self.store.is_loading
+
+    def wait_until_loaded(self, timeout=None):
+        """Bloquea hasta que la biblioteca esté completa"""
+        return self.store.wait_until_loaded(timeout)
+
+    def load_in_background(self, on_progress=None, on_complete=None):
         """
-        Asegura que exista el archivo de datos en el directorio escribible.
-        Si no existe, copia el archivo inicial desde assets.
+        Carga la biblioteca en un hilo aparte.
+        `on_progress(cargadas, total)` se llama tras cada lote (el primero es
+        pequeño para poder pintar la primera pantalla) y `on_complete()` al final.
         """
-        if not os.path.exists(self.data_file):
-            # ✅ Si existe el archivo inicial, copiarlo
-            if os.path.exists(self.initial_data_file):
-                try:
-                    # Crear directorio si no existe
-                    os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-                    # Copiar archivo inicial
-                    shutil.copy2(self.initial_data_file, self.data_file)
-                    print(f"✅ Archivo inicial copiado a: {self.data_file}")
-                except Exception as e:
-                    print(f"Error copiando archivo inicial: {e}")
-                    self._create_default_data_file()
-            else:
-                # ✅ Si no existe archivo inicial, crear uno por defecto
-                self._create_default_data_file()
-
-    def _create_default_data_file(self):
-        """Crea un archivo de datos por defecto"""
-        default_data = {
-            "songs": [],
-            "characters": DEFAULT_CHARACTERS.copy()
-        }
-        try:
-            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(default_data, f, ensure_ascii=False, indent=2)
-            print(f"✅ Archivo de datos creado: {self.data_file}")
-        except Exception as e:
-            print(f"Error creando archivo de datos: {e}")
+        return self.store.load_in_background(on_progress, on_complete)
 
     def load_user_data(self):
         """Carga datos del usuario desde el archivo JSON"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if "characters" not in data:
-                        data["characters"] = DEFAULT_CHARACTERS.copy()
-                    if "songs" not in data:
-                        data["songs"] = []
-                    return data
-        except Exception as e:
-            print(f"Error cargando datos: {e}")
-        
-        # Fallback a datos por defecto
-        return {"songs": [], "characters": DEFAULT_CHARACTERS.copy()}
+        return self.store.load_user_data()
 
     def save_user_data(self):
-        """Guarda datos del usuario en el archivo JSON"""
-        try:
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.user_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error guardando datos: {e}")
+        """Guarda datos del usuario en el archivo JSON (False si había una versión más reciente)"""
+        return self.store.save_user_data()
+
+    def flush_snapshot(self):
+        """Escribe el snapshot binario ahora"""
+        return self.store.flush_snapshot()
+
+    def reindex(self):
+        """Reconstruye índices, snapshot e índice de letras desde los archivos"""
+        return self.store.reindex()
+
+    def compact(self):
+        """Borra letras huérfanas y rota las copias de seguridad"""
+        return self.store.compact()
+
+    def stats(self):
+        """Conteos de la biblioteca y tamaños en disco"""
+        return self.store.stats()
+
+    # ===== COPIAS DE SEGURIDAD =====
+
+    def list_backups(self):
+        """Copias disponibles (más reciente primero): {"id", "created", "label", "songs", ...}"""
+        return self.store.list_backups()
+
+    def backup_in_background(self, label="", on_complete=None):
+        """Hace una copia fuera del hilo de la interfaz; `on_complete(manifiesto o None)` al terminar"""
+        return self.store.backup_in_background(label, on_complete)
+
+    def restore_backup(self, backup_id):
+        """Restaura una copia (antes se copia el estado actual)"""
+        return self.store.restore_backup(backup_id, source=self)
+
+    # ===== SINCRONIZACIÓN ENTRE DISPOSITIVOS =====
+
+    def sync_status(self):
+        """Id del dispositivo, reloj de sellos y sello de la última exportación"""
+        return self.store.sync_status()
+
+    def export_changes(self, path, since=None):
+        """
+        Exporta a `path` los cambios posteriores al sello `since` (por defecto,
+        los que no se han exportado aún). Retorna {"songs", "deleted", "since", "clock"}
+        """
+        return self.store.export_changes(path, since, source=self)
+
+    def import_changes(self, path):
+        """Fusiona un archivo de cambios de otro dispositivo (gana el cambio más reciente)"""
+        return self.store.import_changes(path, source=self)
+
+    # ===== EVENTOS DE CAMBIO =====
+
+    def subscribe(self, listener):
+        """
+        Registra `listener(event)` para los eventos de cambio (models/events.py)
+        de esta sesión y de las demás.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _on_store_change(self, source, events):
+        for event in events:
+            for listener in list(self._listeners):
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"Error procesando evento {event}: {e}")
 
     # ===== GESTIÓN DE CARACTERES =====
     
+    @property
+    def version(self):
+        """Sello de versión de los datos"""
+        return self.store.version
+
+    @property
+    def generation(self):
+        """Sello de los datos y de las letras (para ETags y cachés)"""
+        return self.store.generation
+
     def get_characters(self):
         """Obtiene la lista de caracteres disponibles"""
-        self.user_data = self.load_user_data()
-        return self.user_data.get("characters", DEFAULT_CHARACTERS.copy())
+        return self.store.get_characters()
 
     def add_character(self, character):
         """Agrega un nuevo carácter"""
-        if character and character not in self.user_data["characters"]:
-            self.user_data["characters"].append(character)
-            self.save_user_data()
-            self.user_data = self.load_user_data()
-            return True
-        return False
+        return self.store.add_character(character, source=self)
 
     def remove_character(self, character):
-        """Elimina un carácter"""
-        if character in self.user_data["characters"]:
-            self.user_data["characters"].remove(character)
-            self.save_user_data()
-            self.user_data = self.load_user_data()
-            return True
-        return False
+        """Elimina un carácter y lo quita de todas sus canciones"""
+        return self.store.remove_character(character, source=self)
+
+    def rename_character(self, old, new):
+        """Renombra un carácter en todas sus canciones (si `new` ya existe, los fusiona)"""
+        return self.store.rename_character(old, new, source=self)
+
+    def merge_character(self, character, into):
+        """Pasa las canciones de `character` a `into` y elimina `character`"""
+        return self.store.merge_character(character, into, source=self)
+
+    def character_usage(self, character):
+        """Número de canciones con el carácter"""
+        return self.store.character_usage(character)
+
+    # ===== PRESETS DE FILTROS =====
+
+    def get_presets(self):
+        """Presets guardados: [{"name", "query", "key", "character", "tempo", "modes"}]"""
+        return self.store.get_presets()
+
+    def save_preset(self, name, query="", key=(), character=(), tempo=(), modes=None, lyrics=""):
+        """Guarda (o reemplaza) un preset con los filtros dados (`lyrics`: búsqueda en las letras)"""
+        return self.store.save_preset(name, query, key, character, tempo, modes, lyrics, source=self)
+
+    def delete_preset(self, name):
+        return self.store.delete_preset(name, source=self)
+
+    def preset_songs(self, name):
+        """Canciones del preset (conjunto materializado) o None si no existe"""
+        return self.store.preset_songs(name)
+
+    # ===== LETRAS Y ACORDES =====
+
+    def get_body(self, song_id):
+        """Letra y acordes de una canción (se leen de su archivo al pedirlos)"""
+        return self.store.get_body(song_id)
+
+    def save_body(self, song_id, lyrics="", chords=""):
+        """Guarda la letra y los acordes de una canción"""
+        return self.store.save_body(song_id, lyrics, chords)
+
+    def search_lyrics(self, query, key="", character="", tempo="", modes=None):
+        """Busca en las letras; resultados ordenados por relevancia"""
+        return self.store.search_lyrics(query, key, character, tempo, modes)
+
+    # ===== PROYECCIÓN PARA LISTAS =====
+
+    def _summarize(self, songs):
+        with self.store.lock.read():
+            return summarize(songs)
+
+    def list_songs(self, query="", key="", character="", tempo="", modes=None):
+        """
+        Como search_with_facets, pero "songs" trae SongSummary (id, título y
+        tono, de solo lectura): lo justo para pintar la lista.
+        """
+        result = self.store.search_with_facets(query, key, character, tempo, modes)
+        return {"songs": self._summarize(result["songs"]), "facets": result["facets"]}
+
+    def list_preset(self, name):
+        """SongSummary de las canciones de un preset, o None si no existe"""
+        songs = self.store.preset_songs(name)
+        return None if songs is None else self._summarize(songs)
+
+    def list_lyrics(self, query, key="", character="", tempo="", modes=None):
+        """SongSummary de la búsqueda en letras, por relevancia"""
+        return self._summarize(self.store.search_lyrics(query, key, character, tempo, modes))
+
+    def get_summary(self, song_id):
+        """SongSummary de una canción (o None si no existe)"""
+        with self.store.lock.read():
+            song = self.store.index.by_id.get(song_id)
+            return SongSummary.of(song) if song is not None else None
+
+    def get_song_detail(self, song_id):
+        """
+        Registro completo para editar: una copia de la canción con su letra y
+        acordes (None si no existe). Modificarla no cambia los datos guardados.
+        """
+        with self.store.lock.read():
+            song = self.store.index.by_id.get(song_id)
+            detail = dict(song) if song is not None else None
+        if detail is not None:
+            detail.update(self.store.get_body(song_id) or {})
+        return detail
+
+    # ===== TÍTULOS DUPLICADOS =====
+
+    def find_duplicates(self, title, exclude_id=None):
+        """
+        SongSummary de las canciones con un título casi igual (sin tildes,
+        mayúsculas ni paréntesis, MinHash/LSH). `exclude_id` deja fuera a la
+        propia canción: para avisar tras agregarla o importarla.
+        """
+        return self._summarize(self.store.find_duplicates(title, exclude_id))
+
+    def duplicate_clusters(self):
+        """Informe de duplicados: grupos de SongSummary con títulos casi iguales"""
+        with self.store.lock.read():
+            return [summarize(songs) for songs in self.store.duplicate_clusters()]
+
+    # ===== DESHACER / REHACER =====
+
+    def history_labels(self):
+        """Qué se puede deshacer y rehacer: {"undo": descripción o None, "redo": ...}"""
+        return self.store.history_labels()
+
+    def last_change_id(self):
+        """
+        Id en el historial de la operación que acaba de hacer este hilo: se
+        pasa a undo()/redo() para que el "Deshacer" de un aviso revierta esa
+        operación y no la última de cualquier sesión.
+        """
+        return self.store.last_entry_id()
+
+    def undo(self, entry_id=None):
+        """
+        Deshace la última operación o, con `entry_id`, exactamente esa.
+        Retorna su descripción o None si no había nada o ya no se puede
+        """
+        return self.store.undo(source=self, entry_id=entry_id)
+
+    def redo(self, entry_id=None):
+        """Rehace la última operación deshecha (o exactamente la de `entry_id`)"""
+        return self.store.redo(source=self, entry_id=entry_id)
 
     # ===== GESTIÓN DE CANCIONES =====
     
     def get_all_songs(self):
         """Obtiene todas las canciones"""
-        return self.user_data.get("songs", [])
+        return self.store.get_all_songs()
+
+    def get_song(self, song_id):
+        """Obtiene una canción por id (o None si no existe)"""
+        return self.store.get_song(song_id)
 
     def add_song(self, title, key, character, tempo):
         """Agrega una nueva canción"""
-        new_id = max([s["id"] for s in self.user_data["songs"]], default=0) + 1
-        new_song = {
-            "id": new_id,
-            "title": title,
-            "key": key,
-            "character": character,  # String con comas: "Adoración,Alabanza"
-            "tempo": tempo
-        }
-        self.user_data["songs"].append(new_song)
-        self.save_user_data()
-        return new_song
+        return self.store.add_song(title, key, character, tempo, source=self)
+
+    def add_songs(self, songs):
+        """Agrega varias canciones en un solo guardado (importación). Retorna las creadas"""
+        return self.store.add_songs(songs, source=self)
 
     def update_song(self, song_id, title=None, key=None, character=None, tempo=None):
         """Actualiza una canción existente"""
-        for song in self.user_data["songs"]:
-            if song["id"] == song_id:
-                if title is not None:
-                    song["title"] = title
-                if key is not None:
-                    song["key"] = key
-                if character is not None:
-                    song["character"] = character
-                if tempo is not None:
-                    song["tempo"] = tempo
-                self.save_user_data()
-                return True
-        return False
+        return self.store.update_song(song_id, title, key, character, tempo, source=self)
 
     def delete_song(self, song_id):
         """Elimina una canción"""
-        self.user_data["songs"] = [s for s in self.user_data["songs"] if s["id"] != song_id]
-        self.save_user_data()
+        self.store.delete_song(song_id, source=self)
 
-    def search_songs(self, query="", key="", character="", tempo=""):
+    def bulk_update(self, song_ids, key=None, tempo=None, add_characters=(), remove_characters=()):
+        """
+        Edita varias canciones en un solo guardado: fija tono y/o ritmo y
+        agrega o quita caracteres. Retorna los ids que cambiaron.
+        """
+        return self.store.bulk_update(song_ids, key, tempo, add_characters, remove_characters, source=self)
+
+    def bulk_delete(self, song_ids):
+        """Elimina varias canciones en un solo guardado. Retorna los ids eliminados"""
+        return self.store.bulk_delete(song_ids, source=self)
+
+    def song_matches(self, song, query="", key="", character="", tempo="", modes=None):
+        """Indica si una canción cumple los filtros de búsqueda"""
+        return self.store.song_matches(song, query, key, character, tempo, modes)
+
+    def search_songs(self, query="", key="", character="", tempo="", modes=None):
         """
         Busca canciones con filtros.
         ✅ Soporta múltiples caracteres por canción.
+        ✅ key, character y tempo aceptan un valor o una lista; `modes` elige
+           "or" (alguno, por defecto) o "and" (todos) por dimensión,
+           p. ej. {"character": "and"}.
+        """
+        return self.store.search_songs(query, key, character, tempo, modes)
+
+    def search_with_facets(self, query="", key="", character="", tempo="", modes=None):
+        """
+        Búsqueda con conteos por tono, carácter y tempo.
+        Retorna {"songs": [...], "facets": {"key": {...}, "character": {...}, "tempo": {...}}}.
+        """
+        return self.store.search_with_facets(query, key, character, tempo, modes)
+
+    def facet_counts(self, query="", key="", character="", tempo="", modes=None):
+        return self.store.facet_counts(query, key, character, tempo, modes)
+
+    def query_songs(self, query="", key="", character="", tempo="", modes=None,
+                    sort="added", descending=False, offset=0, limit=None):
+        """
+        Búsqueda ordenada ("added", "title", "key", "tempo") y paginada.
+        Retorna {"songs": página, "total": coincidencias, "offset", "limit"}.
         """
-        songs = self.get_all_songs()
-
-        # Filtro de texto (búsqueda por título)
-        if query:
-            query_lower = query.lower()
-            songs = [s for s in songs if query_lower in s["title"].lower()]
-
-        # Filtro de tono
-        if key:
-            songs = [s for s in songs if s.get("key") == key]
-
-        # ✅ Filtro de carácter (verifica si el carácter está en la lista)
-        if character:
-            filtered_songs = []
-            for song in songs:
-                song_characters = song.get("character", "")
-                # Convertir string separado por comas en lista
-                char_list = [c.strip() for c in song_characters.split(",") if c.strip()]
-                # Si el carácter buscado está en la lista, incluir la canción
-                if character in char_list:
-                    filtered_songs.append(song)
-            songs = filtered_songs
-
-        # Filtro de tempo
-        if tempo:
-            songs = [s for s in songs if s.get("tempo") == tempo]
-
-        return songs
\ No newline at end of file
+        return self.store.query_songs(query, key, character, tempo, modes, sort, descending, offset, limit)
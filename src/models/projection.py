@@ -0,0 +1,24 @@
+"""
+Proyecciones de solo lectura para pintar listas.
+
+Una tarjeta de MainView solo necesita id, título y tono. Pasarle la
+canción completa ataría el coste de la lista a todo lo que se agregue al
+registro y dejaría a la interfaz con el diccionario vivo del almacén en
+la mano. La lista recibe SongSummary (inmutable) y el registro completo
+se pide al abrir la edición, como copia (SongApp.get_song_detail).
+"""
+from collections import namedtuple
+
+
+class SongSummary(namedtuple("SongSummary", ["id", "title", "key"])):
+    """Lo que muestra una tarjeta de la lista"""
+
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, song):
+        return cls(song["id"], song.get("title", ""), song.get("key") or "")
+
+
+def summarize(songs):
+    return [SongSummary.of(song) for song in songs]
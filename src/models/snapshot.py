@@ -0,0 +1,94 @@
+"""
+Caché binaria (snapshot) de user_data.json para un arranque rápido.
+
+El snapshot guarda los datos ya parseados junto con los índices
+construidos, y se valida contra el tamaño, mtime y hash del JSON.
+Se serializa con `marshal`, que es específico de la versión de Python,
+por lo que la versión forma parte de la cabecera.
+"""
+import hashlib
+import marshal
+import os
+import struct
+import sys
+
+SNAPSHOT_MAGIC = b"ADORSNAP"
+SNAPSHOT_FORMAT = 3
+_PYTHON_TAG = "%d.%d" % sys.version_info[:2]
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def file_signature(path, content=None):
+    """
+    Calcula la firma (tamaño, mtime, hash) de un archivo.
+    Si se pasa `content`, se usa en lugar de volver a leer el archivo.
+    """
+    stat = os.stat(path)
+    if content is None:
+        with open(path, "rb") as f:
+            content = f.read()
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": hashlib.sha1(content).hexdigest(),
+    }
+
+
+def read_snapshot(snapshot_path, data_file):
+    """
+    Lee el snapshot si sigue siendo válido para `data_file`.
+    Retorna el payload guardado o None si está desactualizado o corrupto.
+    """
+    try:
+        with open(snapshot_path, "rb") as f:
+            blob = f.read()
+        if not blob.startswith(SNAPSHOT_MAGIC):
+            return None
+        start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack_from(blob, len(SNAPSHOT_MAGIC))
+        header = marshal.loads(blob[start:start + header_length])
+        if header.get("format") != SNAPSHOT_FORMAT or header.get("python") != _PYTHON_TAG:
+            return None
+
+        # ✅ Primero la validación barata (stat), luego el hash del contenido
+        stat = os.stat(data_file)
+        if header.get("size") != stat.st_size or header.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        with open(data_file, "rb") as data_f:
+            digest = hashlib.sha1(data_f.read()).hexdigest()
+        if header.get("sha1") != digest:
+            return None
+
+        # ✅ marshal.loads sobre bytes es mucho más rápido que marshal.load sobre el archivo
+        payload = marshal.loads(memoryview(blob)[start + header_length:])
+        payload["signature"] = {k: header[k] for k in ("size", "mtime_ns", "sha1")}
+        return payload
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Snapshot inválido, se usará el JSON: {e}")
+        return None
+
+
+def dump_snapshot(signature, payload):
+    """Serializa el snapshot completo a bytes"""
+    header = dict(signature, format=SNAPSHOT_FORMAT, python=_PYTHON_TAG)
+    header_blob = marshal.dumps(header)
+    return SNAPSHOT_MAGIC + _HEADER_LENGTH.pack(len(header_blob)) + header_blob + marshal.dumps(payload)
+
+
+def write_snapshot(snapshot_path, blob):
+    """Escribe el snapshot de forma atómica"""
+    tmp_path = snapshot_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, snapshot_path)
+        return True
+    except Exception as e:
+        print(f"Error guardando snapshot: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,1559 @@
+"""
+Almacén de canciones compartido por todo el proceso.
+
+En modo web (`flet run --web`) `main()` se ejecuta una vez por sesión del
+navegador. Todas las sesiones comparten un único SongStore por archivo de
+datos, protegido por un lock de lectores/escritor, y cada sesión usa una
+fachada ligera (SongApp) encima de él.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from itertools import islice
+
+from diagnostics import perf, startup
+
+from .backup import BackupStore, serialize_songs
+from .bodies import BodyStore
+from .constants import BACKUP_INTERVAL, DEFAULT_CHARACTERS, SNAPSHOT_DELAY
+from .events import (
+    CharacterAdded, CharacterRemoved, CharacterRenamed, LibraryReloaded, PresetDeleted, PresetSaved,
+    SongAdded, SongDeleted, SongsChanged, SongUpdated,
+)
+from .filelock import FileLock
+from .fulltext import LyricsIndex, body_terms
+from .history import History
+from .indexes import (
+    SORT_FIELDS, SongIndex, filter_values, popcount, preset_filters, song_matches, split_characters,
+)
+from .locks import ReadWriteLock
+from .snapshot import dump_snapshot, file_signature, read_snapshot, write_snapshot
+from .streaming import estimate_song_count, iter_user_data
+from .sync import (
+    SYNC_FIELDS, acknowledge, build_changeset, incoming_record, new_uid, prune_tombstones, read_changeset,
+    read_device_id, song_stamp, song_uid, write_changeset,
+)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# El número de versión se escribe al principio del archivo para poder leerlo sin parsear todo
+_VERSION_RE = re.compile(rb'^\s*\{\s*"version"\s*:\s*(\d+)')
+
+
+def read_file_version(path):
+    """
+    Lee el sello de versión del principio de user_data.json, o None si no
+    empieza por él (bibliotecas aún no guardadas con el sello). Nunca parsea
+    el archivo entero: se usa para saber si hay que recargar.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64)
+    except OSError:
+        return None
+    match = _VERSION_RE.match(head)
+    return int(match.group(1)) if match else None
+
+
+def update_change(previous, song):
+    """Delta de una edición: solo los campos que cambiaron, antes y después"""
+    fields = [field for field, value in song.items() if previous.get(field) != value]
+    return {
+        "op": "update",
+        "id": song["id"],
+        "before": {field: previous.get(field) for field in fields},
+        "after": {field: song[field] for field in fields},
+    }
+
+
+def get_shared_store(data_file, initial_data_file=None):
+    """Devuelve el SongStore del proceso para `data_file`, creándolo si no existe"""
+    key = os.path.abspath(data_file)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SongStore(data_file, initial_data_file)
+            _stores[key] = store
+        return store
+
+
+class SongStore:
+    """Datos, índices y persistencia de la biblioteca de canciones"""
+
+    def __init__(self, data_file, initial_data_file=None):
+        self.data_file = data_file
+        self.data_dir = os.path.dirname(data_file) or "."
+        self.snapshot_file = os.path.join(self.data_dir, "user_data.snapshot")
+        self.initial_data_file = initial_data_file
+
+        # ✅ Lock entre procesos (varios workers de Flet sobre el mismo archivo)
+        self.file_lock = FileLock(data_file + ".lock")
+
+        with self.file_lock:
+            self._ensure_data_file()
+
+        # ✅ Identidad de este dispositivo para los sellos de sincronización
+        self.device_id = read_device_id(self.data_dir)
+
+        self.lock = ReadWriteLock()
+        self.user_data = {"songs": [], "characters": DEFAULT_CHARACTERS.copy()}
+        self.index = SongIndex()
+
+        # ✅ Historial de deshacer/rehacer (deltas por operación, en history.json)
+        self.history = History(os.path.join(self.data_dir, "history.json"))
+        self._recorded = threading.local()  # id de la última entrada registrada por cada hilo
+
+        # ✅ Copias de seguridad incrementales (backup_interval=None desactiva las automáticas)
+        self.backups = BackupStore(os.path.join(self.data_dir, "backups"))
+        self.backup_interval = BACKUP_INTERVAL
+        self._backup_lock = threading.Lock()
+        self._last_backup = None
+
+        # ✅ Letras y acordes fuera de user_data.json, con su índice de búsqueda en disco
+        self.bodies = BodyStore(os.path.join(self.data_dir, "bodies"))
+        self.lyrics_index = LyricsIndex(os.path.join(self.data_dir, "bodies", "lyrics.index"))
+
+        # ✅ Estado de la caché binaria (snapshot_delay=None desactiva la reescritura automática)
+        self.snapshot_delay = SNAPSHOT_DELAY
+        self._json_signature = None
+        self._snapshot_timer = None
+        self._timer_lock = threading.Lock()
+
+        # ✅ Estado de la carga (compartida por todas las sesiones)
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._load_callbacks = []
+
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+
+    # ===== ARCHIVO DE DATOS =====
+
+    def _ensure_data_file(self):
+        """
+        Asegura que exista el archivo de datos en el directorio escribible.
+        Si no existe, copia el archivo inicial desde assets.
+        """
+        if not os.path.exists(self.data_file):
+            # ✅ Si existe el archivo inicial, copiarlo
+            if self.initial_data_file and os.path.exists(self.initial_data_file):
+                try:
+                    # Crear directorio si no existe
+                    os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+                    # Copiar archivo inicial
+                    shutil.copy2(self.initial_data_file, self.data_file)
+                    print(f"✅ Archivo inicial copiado a: {self.data_file}")
+                except Exception as e:
+                    print(f"Error copiando archivo inicial: {e}")
+                    self._create_default_data_file()
+            else:
+                # ✅ Si no existe archivo inicial, crear uno por defecto
+                self._create_default_data_file()
+
+    def _create_default_data_file(self):
+        """Crea un archivo de datos por defecto"""
+        default_data = {
+            "songs": [],
+            "characters": DEFAULT_CHARACTERS.copy()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
+            with open(self.data_file, "w", encoding="utf-8") as f:
+                json.dump(default_data, f, ensure_ascii=False, indent=2)
+            print(f"✅ Archivo de datos creado: {self.data_file}")
+        except Exception as e:
+            print(f"Error creando archivo de datos: {e}")
+
+    # ===== CARGA =====
+
+    @perf.timed("load")
+    def _load(self):
+        """
+        Carga los datos usando el snapshot binario si es válido.
+        Si está desactualizado o corrupto, parsea el JSON y programa
+        la reescritura del snapshot.
+        """
+        with self.lock.write():
+            payload = read_snapshot(self.snapshot_file, self.data_file)
+            if payload is not None:
+                self._apply_snapshot(payload)
+                return
+
+            self.user_data = self.load_user_data()
+            self.index = SongIndex.build(self.user_data["songs"])
+            self.index.set_presets(self.user_data.get("presets", []))
+            try:
+                self._json_signature = file_signature(self.data_file)
+            except OSError:
+                self._json_signature = None
+            self._schedule_snapshot()
+
+    def _apply_snapshot(self, payload):
+        self.user_data = payload["user_data"]
+        self.index = SongIndex.from_state(self.user_data["songs"], payload["index"])
+        self.index.set_presets(self.user_data.get("presets", []))
+        self._json_signature = payload["signature"]
+
+    @property
+    def is_loading(self):
+        """True mientras la carga no ha terminado"""
+        return not self._loaded.is_set()
+
+    def wait_until_loaded(self, timeout=None):
+        """Bloquea hasta que la biblioteca esté completa"""
+        return self._loaded.wait(timeout)
+
+    def ensure_loaded(self):
+        """Carga la biblioteca en este hilo si nadie la ha cargado todavía"""
+        with self._load_lock:
+            if self._loaded.is_set():
+                return
+            start = not self._loading
+            self._loading = True
+        if start:
+            try:
+                self._load()
+            finally:
+                self._finish_loading()
+        else:
+            self._loaded.wait()
+
+    def load_in_background(self, on_progress=None, on_complete=None):
+        """
+        Carga la biblioteca en un hilo aparte (una sola vez por proceso).
+        `on_progress(cargadas, total)` se llama tras cada lote (el primero es
+        pequeño para poder pintar la primera pantalla) y `on_complete()` al final.
+        Si la biblioteca ya está cargada, se llaman de inmediato.
+        """
+        with self._load_lock:
+            done = self._loaded.is_set()
+            if not done:
+                self._load_callbacks.append((on_progress, on_complete))
+                start = not self._loading
+                self._loading = True
+        if done:
+            total = len(self.index)
+            if on_progress:
+                on_progress(total, total)
+            if on_complete:
+                on_complete()
+            return None
+        if not start:
+            return None
+        thread = threading.Thread(target=self._load_progressively, daemon=True)
+        thread.start()
+        return thread
+
+    @startup.profiled
+    @perf.timed("load_progressive")
+    def _load_progressively(self):
+        try:
+            with self.lock.write():
+                payload = read_snapshot(self.snapshot_file, self.data_file)
+                if payload is not None:
+                    self._apply_snapshot(payload)
+            if payload is None:
+                self._stream_json()
+        finally:
+            callbacks = self._finish_loading()
+
+        total = len(self.index)
+        for on_progress, on_complete in callbacks:
+            self._run_callback(on_progress, total, total)
+            self._run_callback(on_complete)
+
+        # Índice de títulos parecidos listo antes de que se agregue la primera canción
+        with self.lock.read():
+            self.index.title_lsh()
+
+    def _finish_loading(self):
+        with self._load_lock:
+            self._loaded.set()
+            self._loading = False
+            callbacks, self._load_callbacks = self._load_callbacks, []
+        self._schedule_backup()
+        return callbacks
+
+    def _report_progress(self, loaded, total):
+        with self._load_lock:
+            callbacks = list(self._load_callbacks)
+        for on_progress, _ in callbacks:
+            self._run_callback(on_progress, loaded, total)
+
+    @staticmethod
+    def _run_callback(callback, *args):
+        """Los errores de una sesión no deben interrumpir la carga de las demás"""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Error en callback de carga: {e!r}")
+
+    def _stream_json(self):
+        """Parsea el JSON por lotes, publicando cada lote en los datos e índices"""
+        try:
+            with open(self.data_file, "rb") as f:
+                content = f.read()
+            text = content.decode("utf-8")
+            total = estimate_song_count(text)
+
+            with self.lock.write():
+                self.user_data = {"songs": [], "characters": DEFAULT_CHARACTERS.copy()}
+                self.index = SongIndex()
+
+            for kind, value in iter_user_data(text):
+                with self.lock.write():
+                    if kind == "songs":
+                        self.user_data["songs"].extend(value)
+                        self.index.add_many(value)
+                        loaded = len(self.user_data["songs"])
+                    else:
+                        self.user_data.update(value)
+                if kind == "songs":
+                    self._report_progress(loaded, max(total, loaded))
+
+            with self.lock.write():
+                # Los presets llegan con el resto del objeto raíz, al final
+                self.index.set_presets(self.user_data.get("presets", []))
+            self._json_signature = file_signature(self.data_file, content)
+            self._schedule_snapshot()
+        except FileNotFoundError:
+            with self.lock.write():
+                self.user_data = self.load_user_data()
+                self.index = SongIndex.build(self.user_data["songs"])
+                self.index.set_presets(self.user_data.get("presets", []))
+        except Exception as e:
+            print(f"Error en la carga progresiva, se cargará completo: {e}")
+            self._load()
+
+    def reload_if_changed(self):
+        """Recarga los datos solo si el archivo cambió fuera de la app"""
+        if self.is_loading or not self._disk_changed():
+            return
+        self._load()
+        self._publish(None, [LibraryReloaded()])
+
+    @perf.timed("load_user_data")
+    def load_user_data(self):
+        """Carga datos del usuario desde el archivo JSON"""
+        try:
+            if os.path.exists(self.data_file):
+                with open(self.data_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    if "characters" not in data:
+                        data["characters"] = DEFAULT_CHARACTERS.copy()
+                    if "songs" not in data:
+                        data["songs"] = []
+                    return data
+        except Exception as e:
+            print(f"Error cargando datos: {e}")
+
+        # Fallback a datos por defecto
+        return {"songs": [], "characters": DEFAULT_CHARACTERS.copy()}
+
+    @property
+    def version(self):
+        """Sello de versión de los datos en memoria"""
+        return self.user_data.get("version", 0)
+
+    @property
+    def generation(self):
+        """
+        Sello de todo lo que se puede leer: la versión de los datos más la del
+        índice de letras, que se reescribe cada vez que se guarda una letra.
+        """
+        try:
+            lyrics = os.stat(self.lyrics_index.path).st_mtime_ns
+        except OSError:
+            lyrics = 0
+        return f"{self.version}.{lyrics}"
+
+    def _disk_changed(self):
+        """
+        Indica si el archivo cambió desde la última carga o guardado de este
+        proceso. Tamaño y mtime no bastan: dos guardados del mismo tamaño en
+        el mismo tick del reloj de archivos dejan la misma firma, así que
+        también se compara el sello de versión (los primeros bytes). Si el
+        archivo no empieza por el sello, nadie lo guardó con él desde que se
+        registró la firma: con la firma igual, no cambió.
+        """
+        try:
+            stat = os.stat(self.data_file)
+        except OSError:
+            return False
+        signature = self._json_signature
+        if not signature or (signature["size"], signature["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return True
+        stamp = read_file_version(self.data_file)
+        return stamp is not None and stamp != self.version
+
+    def _sync_with_disk(self):
+        """
+        Debe llamarse con el lock de archivo tomado. Si otro proceso guardó
+        desde nuestra última lectura, recarga los datos para aplicar el cambio
+        sobre la versión más reciente. Retorna True si hubo que recargar.
+        """
+        self.history.sync()
+        if not self._disk_changed():
+            return False
+        self._load()
+        return True
+
+    @perf.timed("save")
+    def _commit(self):
+        """
+        Debe llamarse con el lock de escritura y el de archivo tomados.
+        Incrementa la versión y escribe el JSON de forma atómica.
+        """
+        version = self.version + 1
+        data = {"version": version}
+        data.update((k, v) for k, v in self.user_data.items() if k != "version")
+        self.user_data = data
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        tmp_path = self.data_file + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.data_file)
+        self._json_signature = file_signature(self.data_file, content)
+        self._schedule_snapshot()
+        self._schedule_backup()
+
+    def save_user_data(self):
+        """
+        Guarda datos del usuario en el archivo JSON.
+        Se rechaza (retorna False) si otro proceso guardó una versión más
+        reciente que la que tenemos en memoria.
+        """
+        with self.lock.write(), self.file_lock:
+            try:
+                if self._disk_changed() and read_file_version(self.data_file) != self.version:
+                    print("Guardado rechazado: los datos en disco son más recientes")
+                    return False
+                self._commit()
+                return True
+            except Exception as e:
+                print(f"Error guardando datos: {e}")
+                return False
+
+    # ===== SNAPSHOT BINARIO =====
+
+    def _schedule_snapshot(self):
+        """Programa la reescritura diferida del snapshot (agrupa guardados seguidos)"""
+        if self.snapshot_delay is None:
+            return
+        with self._timer_lock:
+            if self._snapshot_timer is not None:
+                self._snapshot_timer.cancel()
+            self._snapshot_timer = threading.Timer(self.snapshot_delay, self.flush_snapshot)
+            self._snapshot_timer.daemon = True
+            self._snapshot_timer.start()
+
+    def flush_snapshot(self):
+        """Escribe el snapshot ahora si el JSON no cambió desde el último guardado"""
+        with self._timer_lock:
+            self._snapshot_timer = None
+        with self.lock.read():
+            signature = self._json_signature
+            if signature is None:
+                return False
+            try:
+                stat = os.stat(self.data_file)
+            except OSError:
+                return False
+            if (signature["size"], signature["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                return False
+            blob = dump_snapshot(signature, {
+                "user_data": self.user_data,
+                "index": self.index.to_state(self.user_data["songs"]),
+            })
+            return write_snapshot(self.snapshot_file, blob)
+
+    # ===== COPIAS DE SEGURIDAD =====
+
+    def _schedule_backup(self):
+        """Lanza una copia automática en segundo plano si ya toca (cada `backup_interval`)"""
+        if self.backup_interval is None:
+            return
+        if self._last_backup is None:
+            self._last_backup = self.backups.latest_time() or 0
+        if time.time() - self._last_backup >= self.backup_interval:
+            self._last_backup = time.time()
+            self.backup_in_background("Automática")
+
+    def list_backups(self):
+        """Copias disponibles, de la más reciente a la más antigua"""
+        return self.backups.list()
+
+    @perf.timed("backup")
+    def backup_now(self, label="", wait=False):
+        """
+        Hace una copia ahora. Con el lock de lectura solo se serializan las
+        canciones; los bloques se comprimen y escriben fuera del lock.
+        Retorna el manifiesto, o None si falló o ya había otra copia en curso
+        (con `wait` se espera a que termine y se hace igual).
+        """
+        if not self._backup_lock.acquire(blocking=wait):
+            return None
+        try:
+            self._loaded.wait()
+            with self.lock.read():
+                lines = serialize_songs(self.user_data["songs"])
+                meta = json.loads(json.dumps({
+                    "version": self.version,
+                    "characters": self.user_data.get("characters", []),
+                    "presets": self.user_data.get("presets", []),
+                }))
+            manifest = self.backups.create(lines, meta, label)
+            self._last_backup = manifest["created"]
+            return manifest
+        except Exception as e:
+            print(f"Error creando copia de seguridad: {e}")
+            return None
+        finally:
+            self._backup_lock.release()
+
+    def backup_in_background(self, label="", on_complete=None):
+        """Hace la copia en un hilo aparte; `on_complete(manifiesto o None)` al terminar"""
+        def run():
+            self._run_callback(on_complete, self.backup_now(label))
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    @perf.timed("restore")
+    def restore_backup(self, backup_id, source=None):
+        """
+        Reemplaza la biblioteca por la de una copia. Antes se hace una copia
+        del estado actual, así que restaurar también se puede revertir; si esa
+        copia no se puede hacer, no se restaura.
+        """
+        self._loaded.wait()
+        try:
+            data = self.backups.load(backup_id)
+        except (OSError, ValueError, KeyError, zlib.error) as e:
+            print(f"Error leyendo la copia {backup_id}: {e}")
+            return False
+        # Si hay una copia automática en curso se espera: no se restaura sin copia del estado actual
+        if self.backup_now("Antes de restaurar", wait=True) is None:
+            print(f"No se restauró la copia {backup_id}: no se pudo copiar antes el estado actual")
+            return False
+        with self.lock.write(), self.file_lock:
+            self.user_data = {
+                "version": self.version,
+                "songs": data["songs"],
+                "characters": data["characters"] or DEFAULT_CHARACTERS.copy(),
+                "presets": data["presets"],
+                # El reloj no puede retroceder o los sellos dejarían de ordenarse
+                "sync": self.user_data.get("sync", {}),
+            }
+            self.index = SongIndex.build(self.user_data["songs"])
+            self.index.set_presets(self.user_data["presets"])
+            self._commit()
+            # Los deltas del historial eran sobre la biblioteca anterior
+            self.history.clear()
+            self.history.save()
+        self._publish(source, [LibraryReloaded()])
+        return True
+
+    # ===== NOTIFICACIONES =====
+
+    def subscribe(self, listener):
+        """
+        Registra `listener(source, events)`, que se llama tras cada cambio
+        guardado con la lista de eventos (ver models/events.py). `source` es
+        la sesión que hizo el cambio, o None si vino de fuera.
+        """
+        with self._listeners_lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._listeners_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _publish_after_write(self, source, stale, events):
+        """Publica un cambio propio; si hubo que recargar desde disco, avisa primero de la recarga"""
+        if stale:
+            self._publish(None, [LibraryReloaded()])
+        if events:
+            self._publish(source, events)
+
+    def _publish(self, source, events):
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(source, events)
+            except Exception as e:
+                print(f"Error publicando cambios: {e}")
+
+    # ===== GESTIÓN DE CARACTERES =====
+
+    def get_characters(self):
+        """Obtiene la lista de caracteres disponibles"""
+        self.reload_if_changed()
+        with self.lock.read():
+            return list(self.user_data.get("characters", DEFAULT_CHARACTERS))
+
+    def add_character(self, character, source=None):
+        """Agrega un nuevo carácter"""
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            added = bool(character) and character not in self.user_data["characters"]
+            if added:
+                self.user_data["characters"].append(character)
+                self._commit()
+                self._record(f"Agregar carácter «{character}»", [{"op": "add_character", "name": character}])
+        self._publish_after_write(source, stale, [CharacterAdded(character)] if added else [])
+        return added
+
+    def character_usage(self, character):
+        """Número de canciones que tienen el carácter"""
+        with self.lock.read():
+            return popcount(self.index.character_bits.get(character, 0))
+
+    def remove_character(self, character, source=None):
+        """Elimina un carácter y lo quita de todas las canciones que lo tienen"""
+        return self._drop_character(character, None, source)
+
+    def merge_character(self, character, into, source=None):
+        """Fusiona `character` en `into`: sus canciones pasan a tener `into` y el carácter desaparece"""
+        if character == into:
+            return False
+        return self._drop_character(character, into, source)
+
+    def rename_character(self, old, new, source=None):
+        """
+        Renombra un carácter en la lista y en todas sus canciones.
+        Si `new` ya existe, equivale a fusionar `old` en `new`.
+        """
+        new = (new or "").strip()
+        if not new or new == old:
+            return False
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            characters = self.user_data["characters"]
+            renamed = old in characters and new not in characters
+            if renamed:
+                # Si ninguna canción tenía ya `new`, el renombrado se deshace renombrando
+                # al revés y basta un delta; si no, se guardan las ediciones de cada canción
+                exact = not self.index.character_bits.get(new)
+                characters[characters.index(old)] = new
+                changes = self._replace_character(old, new)
+                self._commit()
+                rename = {"op": "rename_character", "old": old, "new": new}
+                self._record(f"Renombrar carácter «{old}»", [dict(rename, songs=True)] if exact else [rename] + changes)
+        if not renamed:
+            # `new` ya existe (fusión) u `old` no existe
+            self._publish_after_write(source, stale, [])
+            return self.merge_character(old, new, source)
+        events = [CharacterRenamed(old, new)]
+        if changes:
+            events.append(SongsChanged(tuple(c["id"] for c in changes)))
+        self._publish_after_write(source, stale, events)
+        return True
+
+    def _drop_character(self, character, into, source):
+        """Quita el carácter de la lista y de sus canciones (reemplazándolo por `into` si se da)"""
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            characters = self.user_data["characters"]
+            removed = character in characters and (into is None or into in characters)
+            if removed:
+                position = characters.index(character)
+                characters.remove(character)
+                changes = self._replace_character(character, into)
+                self._commit()
+                label = f"Fusionar «{character}» en «{into}»" if into else f"Eliminar carácter «{character}»"
+                self._record(label, [{"op": "remove_character", "name": character, "position": position}] + changes)
+        events = []
+        if removed:
+            events.append(CharacterRemoved(character))
+            if changes:
+                events.append(SongsChanged(tuple(c["id"] for c in changes)))
+        self._publish_after_write(source, stale, events)
+        return removed
+
+    def _replace_character(self, old, new):
+        """
+        Reemplaza (o quita, si `new` es None) un carácter en las canciones que
+        lo tienen. Las canciones salen del índice carácter -> canciones, así
+        que solo se tocan las afectadas. Retorna los deltas de edición.
+        """
+        bits = self.index.character_bits.get(old, 0)
+        changes, reindexed = [], []
+        for song_id in self.index.ids_from_bits(bits):
+            song = self.index.by_id[song_id]
+            previous = dict(song)
+            updated = []
+            for char in split_characters(song.get("character", "")):
+                char = new if char == old else char
+                if char and char not in updated:
+                    updated.append(char)
+            song["character"] = ",".join(updated)
+            reindexed.append((song, previous))
+            changes.append(update_change(previous, song))
+            self._touch(song)
+        self.index.reindex_many(reindexed)
+        return changes
+
+    # ===== PRESETS DE FILTROS =====
+
+    def get_presets(self):
+        """Presets guardados: [{"name", "query", "key", "character", "tempo", "modes"}]"""
+        self.reload_if_changed()
+        with self.lock.read():
+            return [dict(p) for p in self.user_data.get("presets", [])]
+
+    def save_preset(self, name, query="", key=(), character=(), tempo=(), modes=None, lyrics="", source=None):
+        """Guarda (o reemplaza) un preset con los filtros dados; `lyrics` busca además en las letras"""
+        self._loaded.wait()
+        preset = {
+            "name": name,
+            "query": query or "",
+            "lyrics": lyrics or "",
+            "key": list(filter_values(key)),
+            "character": list(filter_values(character)),
+            "tempo": list(filter_values(tempo)),
+            "modes": dict(modes or {}),
+        }
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            presets = [p for p in self.user_data.get("presets", []) if p["name"] != name]
+            presets.append(preset)
+            self.user_data["presets"] = presets
+            self.index.set_preset(preset)
+            self._commit()
+        self._publish_after_write(source, stale, [PresetSaved(name)])
+        return preset
+
+    def delete_preset(self, name, source=None):
+        """Elimina un preset"""
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            presets = self.user_data.get("presets", [])
+            removed = any(p["name"] == name for p in presets)
+            if removed:
+                self.user_data["presets"] = [p for p in presets if p["name"] != name]
+                self.index.drop_preset(name)
+                self._commit()
+        self._publish_after_write(source, stale, [PresetDeleted(name)] if removed else [])
+        return removed
+
+    def preset_songs(self, name):
+        """
+        Canciones de un preset, desde su conjunto materializado
+        (no recorre la biblioteca). Retorna None si el preset no existe.
+        Si el preset busca en las letras, el resultado es el de search_lyrics
+        (por relevancia) con sus filtros.
+        """
+        with self.lock.read():
+            ids = self.index.preset_ids(name)
+            if ids is None:
+                return None
+            preset = self.index.presets[name][0]
+            if not preset.get("lyrics"):
+                return [self.index.by_id[i] for i in ids]
+        _, key, character, tempo, modes = preset_filters(preset)
+        return self.search_lyrics(preset["lyrics"], key, character, tempo, modes)
+
+    # ===== GESTIÓN DE CANCIONES =====
+
+    def get_all_songs(self):
+        """Obtiene todas las canciones"""
+        return self.user_data.get("songs", [])
+
+    def get_song(self, song_id):
+        """Obtiene una canción por id (o None si no existe)"""
+        with self.lock.read():
+            return self.index.by_id.get(song_id)
+
+    def add_song(self, title, key, character, tempo, source=None):
+        """Agrega una nueva canción"""
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            new_id = self.index.max_id + 1
+            new_song = {
+                "id": new_id,
+                "title": title,
+                "key": key,
+                "character": character,  # String con comas: "Adoración,Alabanza"
+                "tempo": tempo,
+                # La letra se guarda por uid: si el id local se reutiliza (se borró la última
+                # canción), un uid derivado del id heredaría la letra y la lápida de la anterior
+                "uid": new_uid(),
+            }
+            self._touch(new_song)
+            self.user_data["songs"].append(new_song)
+            self.index.add(new_song)
+            self._commit()
+            self._record(f"Agregar «{title}»", [{"op": "add", "song": dict(new_song)}])
+        self._publish_after_write(source, stale, [SongAdded(new_id)])
+        return new_song
+
+    def add_songs(self, songs, source=None):
+        """
+        Agrega varias canciones (importación) con un solo guardado y una sola
+        entrada del historial. Cada elemento es un dict con "title" y
+        opcionalmente "key", "character" (texto con comas o lista) y "tempo".
+        Retorna las canciones creadas.
+        """
+        self._loaded.wait()
+        created = []
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            next_id = self.index.max_id + 1
+            for data in songs:
+                character = data.get("character") or ""
+                if not isinstance(character, str):
+                    character = ",".join(filter_values(character))
+                song = {
+                    "id": next_id,
+                    "title": str(data.get("title") or "").strip(),
+                    "key": data.get("key") or "",
+                    "character": character,
+                    "tempo": data.get("tempo") or "",
+                    "uid": new_uid(),
+                }
+                if not song["title"]:
+                    continue
+                self._touch(song)
+                created.append(song)
+                next_id += 1
+            if created:
+                self.user_data["songs"].extend(created)
+                self.index.add_many(created)
+                self._commit()
+                self._record(f"Importar {len(created)} canciones", [{"op": "add", "song": dict(s)} for s in created])
+        self._publish_after_write(source, stale, [SongsChanged(tuple(s["id"] for s in created))] if created else [])
+        return created
+
+    def update_song(self, song_id, title=None, key=None, character=None, tempo=None, source=None):
+        """
+        Actualiza una canción existente.
+        Retorna False si no existe (por ejemplo, si otro proceso la eliminó).
+        """
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            song = self.index.by_id.get(song_id)
+            if song is not None:
+                previous = dict(song)
+                if title is not None:
+                    song["title"] = title
+                if key is not None:
+                    song["key"] = key
+                if character is not None:
+                    song["character"] = character
+                if tempo is not None:
+                    song["tempo"] = tempo
+                self.index.reindex(song, previous)
+                change = update_change(previous, song)
+                if change["after"]:
+                    self._touch(song)
+                self._commit()
+                self._record(f"Editar «{previous.get('title', '')}»", [change])
+        self._publish_after_write(source, stale, [SongUpdated(song_id)] if song is not None else [])
+        return song is not None
+
+    def delete_song(self, song_id, source=None):
+        """Elimina una canción"""
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            song = self.index.by_id.get(song_id)
+            if song is not None:
+                self._tombstone(song)
+                self.index.remove(song)
+                self.user_data["songs"] = [s for s in self.user_data["songs"] if s["id"] != song_id]
+                self._commit()
+                self._record(f"Eliminar «{song.get('title', '')}»", [{"op": "delete", "song": dict(song)}])
+        self._publish_after_write(source, stale, [SongDeleted(song_id)] if song is not None else [])
+
+    def bulk_update(self, song_ids, key=None, tempo=None, add_characters=(), remove_characters=(), source=None):
+        """
+        Edita varias canciones a la vez: fija tono y/o ritmo y agrega o quita
+        caracteres. Se aplica en memoria, se actualizan los índices y se
+        guarda una sola vez. Retorna los ids modificados.
+        """
+        self._loaded.wait()
+        add_characters = filter_values(add_characters)
+        remove_characters = set(filter_values(remove_characters))
+        changed = []
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            changes, reindexed = [], []
+            for song_id in dict.fromkeys(song_ids):
+                song = self.index.by_id.get(song_id)
+                if song is None:
+                    continue
+                previous = dict(song)
+                if key is not None:
+                    song["key"] = key
+                if tempo is not None:
+                    song["tempo"] = tempo
+                if add_characters or remove_characters:
+                    characters = [c for c in split_characters(song.get("character", "")) if c not in remove_characters]
+                    characters += [c for c in add_characters if c not in characters]
+                    song["character"] = ",".join(characters)
+                change = update_change(previous, song)
+                if change["after"]:
+                    self._touch(song)
+                    reindexed.append((song, previous))
+                    changes.append(change)
+                    changed.append(song_id)
+            if changes:
+                self.index.reindex_many(reindexed)
+                self._commit()
+                self._record(f"Editar {len(changes)} canciones", changes)
+        self._publish_after_write(source, stale, [SongsChanged(tuple(changed))] if changed else [])
+        return changed
+
+    def bulk_delete(self, song_ids, source=None):
+        """Elimina varias canciones con una sola pasada sobre la lista y un solo guardado"""
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            wanted = set(song_ids)
+            # En el orden de la lista (no en el de selección): así se registran en el historial
+            songs = [s for s in self.user_data["songs"] if s["id"] in wanted]
+            if songs:
+                for song in songs:
+                    self._tombstone(song)
+                self.index.remove_many(songs)
+                deleted = {song["id"] for song in songs}
+                self.user_data["songs"] = [s for s in self.user_data["songs"] if s["id"] not in deleted]
+                self._commit()
+                self._record(f"Eliminar {len(songs)} canciones", [{"op": "delete", "song": dict(s)} for s in songs])
+        deleted_ids = tuple(song["id"] for song in songs)
+        self._publish_after_write(source, stale, [SongsChanged(deleted_ids)] if songs else [])
+        return list(deleted_ids)
+
+    # ===== LETRAS Y ACORDES =====
+
+    def _song_uid(self, song_id):
+        with self.lock.read():
+            song = self.index.by_id.get(song_id)
+            return song_uid(song) if song is not None else None
+
+    def get_body(self, song_id):
+        """Letra y acordes de una canción ({"lyrics", "chords"}), o None si no existe"""
+        uid = self._song_uid(song_id)
+        return self.bodies.get(uid) if uid else None
+
+    @perf.timed("save_body")
+    def save_body(self, song_id, lyrics="", chords=""):
+        """Guarda la letra y los acordes y actualiza el índice de letras. False si la canción no existe"""
+        uid = self._song_uid(song_id)
+        if uid is None:
+            return False
+        body = {"lyrics": lyrics or "", "chords": chords or ""}
+        with self.bodies.file_lock:
+            previous = self.bodies.get(uid)
+            if previous == body:
+                return True
+            self.bodies.put(uid, body)
+            self.lyrics_index.sync()
+            self.lyrics_index.update(uid, song_id, body_terms(body), body_terms(previous))
+            self.lyrics_index.save()
+        return True
+
+    @perf.timed("rebuild_lyrics_index")
+    def rebuild_lyrics_index(self):
+        """Reconstruye el índice de letras leyendo todos los cuerpos. Retorna cuántos indexó"""
+        with self.lock.read():
+            ids_by_uid = {song_uid(song): song["id"] for song in self.user_data["songs"]}
+        with self.bodies.file_lock:
+            self.lyrics_index.clear()
+            for uid in self.bodies.uids():
+                if uid in ids_by_uid:
+                    self.lyrics_index.update(uid, ids_by_uid[uid], body_terms(self.bodies.get(uid)))
+            self.lyrics_index.save()
+            return len(self.lyrics_index.docs)
+
+    @perf.timed("search_lyrics")
+    def search_lyrics(self, query, key="", character="", tempo="", modes=None):
+        """
+        Canciones cuya letra contiene las palabras de `query`, de la más a la
+        menos relevante (BM25), con los mismos filtros que search_songs.
+        No lee ningún cuerpo: solo el índice.
+        """
+        self.lyrics_index.sync()
+        hits = self.lyrics_index.search(query)
+        with self.lock.read():
+            index = self.index
+            bits = index.filter_bits(key, character, tempo, modes)
+            allowed = None if bits is None else set(index.ids_from_bits(bits))
+            by_uid = None
+            songs = []
+            for uid, song_id, _ in hits:
+                song = index.by_id.get(song_id)
+                if song is None or song_uid(song) != uid:
+                    # El id local cambió (importación) o la canción se eliminó
+                    if by_uid is None:
+                        by_uid = {song_uid(s): s for s in self.user_data["songs"]}
+                    song = by_uid.get(uid)
+                if song is not None and (allowed is None or song["id"] in allowed):
+                    songs.append(song)
+            return songs
+
+    # ===== TÍTULOS DUPLICADOS =====
+
+    def find_duplicates(self, title, exclude_id=None):
+        """Canciones con un título casi igual a `title`, de la más a la menos parecida"""
+        with self.lock.read():
+            index = self.index
+            return [index.by_id[song_id] for song_id, _ in index.title_lsh().similar(title, exclude_id)]
+
+    @perf.timed("duplicate_clusters")
+    def duplicate_clusters(self):
+        """Grupos de canciones con títulos casi iguales, los más grandes primero"""
+        with self.lock.read():
+            index = self.index
+            clusters = index.title_lsh().clusters()
+            clusters.sort(key=lambda ids: (-len(ids), ids[0]))
+            return [[index.by_id[song_id] for song_id in ids] for ids in clusters]
+
+    # ===== DESHACER / REHACER =====
+
+    def _record(self, label, changes):
+        """Guarda en el historial los deltas de una operación (con los locks tomados)"""
+        changes = [c for c in changes if c["op"] != "update" or c["after"]]
+        self._recorded.entry_id = None
+        if changes:
+            self._recorded.entry_id = self.history.record(label, changes)
+            self.history.save()
+
+    def last_entry_id(self):
+        """
+        Id de la entrada del historial que registró (o deshizo/rehízo) la
+        última operación de este hilo, o None si no registró ninguna
+        """
+        return getattr(self._recorded, "entry_id", None)
+
+    def history_labels(self):
+        """Descripción de lo que se puede deshacer y rehacer: {"undo": str|None, "redo": str|None}"""
+        self.history.sync()
+        return {"undo": self.history.peek_label("undo"), "redo": self.history.peek_label("redo")}
+
+    def undo(self, source=None, entry_id=None):
+        """
+        Revierte la última operación o, con `entry_id`, exactamente esa
+        (aunque después haya otras). Retorna su descripción o None si no se pudo
+        """
+        return self._replay("undo", "redo", source, entry_id)
+
+    def redo(self, source=None, entry_id=None):
+        """Vuelve a aplicar la última operación deshecha (o la de `entry_id`)"""
+        return self._replay("redo", "undo", source, entry_id)
+
+    def _replay(self, kind, opposite, source, entry_id=None):
+        """
+        Aplica la entrada más reciente de `kind` (o la de `entry_id`) y la pasa
+        a `opposite`. Solo se tocan las canciones del delta, así que el coste es
+        el del cambio. Si los datos ya no coinciden con el delta (otro cambio
+        posterior), la entrada se descarta sin aplicar nada. Una entrada que ya
+        no está (deshecha, rehecha u olvidada) no se sustituye por otra.
+        """
+        self._loaded.wait()
+        events = []
+        self._recorded.entry_id = None
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            entry = self.history.pop(kind) if entry_id is None else self.history.take(kind, entry_id)
+            if entry is None and entry_id is not None:
+                print(f"No se puede {'deshacer' if kind == 'undo' else 'rehacer'}: la operación ya no está en el historial")
+            if entry is not None:
+                changes = entry["changes"]
+                if kind == "undo":
+                    changes = [self._inverse(change) for change in reversed(changes)]
+                if all(self._can_apply(change) for change in changes):
+                    events = self._apply_changes(changes)
+                    self._commit()
+                    self.history.push(opposite, entry)
+                    self._recorded.entry_id = entry.get("id")
+                else:
+                    print(f"No se puede {'deshacer' if kind == 'undo' else 'rehacer'}: los datos cambiaron")
+                    entry = None
+                self.history.save()
+        self._publish_after_write(source, stale, events)
+        return entry["label"] if entry else None
+
+    @staticmethod
+    def _inverse(change):
+        op = change["op"]
+        if op == "update":
+            return {"op": "update", "id": change["id"], "before": change["after"], "after": change["before"]}
+        if op == "rename_character":
+            return dict(change, old=change["new"], new=change["old"])
+        inverse_op = {
+            "add": "delete", "delete": "add",
+            "add_character": "remove_character", "remove_character": "add_character",
+        }[op]
+        return dict(change, op=inverse_op)
+
+    def _can_apply(self, change):
+        """Comprueba que el estado actual es el que el delta espera"""
+        op = change["op"]
+        if op == "add":
+            return change["song"]["id"] not in self.index.by_id
+        if op == "delete":
+            return change["song"]["id"] in self.index.by_id
+        if op == "update":
+            song = self.index.by_id.get(change["id"])
+            # Los sellos no cuentan: deshacer vuelve a sellar con el reloj actual
+            return song is not None and all(
+                song.get(f) == v for f, v in change["before"].items() if f not in SYNC_FIELDS
+            )
+        characters = self.user_data["characters"]
+        if op == "rename_character":
+            return (
+                change["old"] in characters and change["new"] not in characters
+                and not (change.get("songs") and self.index.character_bits.get(change["new"]))
+            )
+        if op == "add_character":
+            return change["name"] not in characters
+        return change["name"] in characters
+
+    def _apply_changes(self, changes):
+        """
+        Aplica una lista de deltas. Las altas y bajas de varias canciones se
+        hacen en bloque y se publica un único SongsChanged en lugar de un
+        evento por canción.
+        """
+        song_ops = ("add", "delete", "update")
+        if sum(1 for c in changes if c["op"] in song_ops) <= 1:
+            return [self._apply_change(change) for change in changes]
+        song_ids = []
+        deleted = {c["song"]["id"] for c in changes if c["op"] == "delete"}
+        if deleted:
+            songs = [self.index.by_id[i] for i in deleted]
+            for song in songs:
+                self._tombstone(song)
+            self.index.remove_many(songs)
+            self.user_data["songs"] = [s for s in self.user_data["songs"] if s["id"] not in deleted]
+            song_ids.extend(deleted)
+        # El historial se deshace al revés: las recuperadas vuelven en orden de id, que es
+        # el de alta (y el que tenían en la lista), no en el inverso
+        added = sorted((dict(c["song"]) for c in changes if c["op"] == "add"), key=lambda song: song["id"])
+        for song in added:
+            self._touch(song)
+        if added:
+            self.user_data["songs"].extend(added)
+            self.index.add_many(added)
+            song_ids.extend(song["id"] for song in added)
+        reindexed = []
+        for change in changes:
+            if change["op"] == "update":
+                song = self.index.by_id[change["id"]]
+                previous = dict(song)
+                song.update(change["after"])
+                self._touch(song)
+                reindexed.append((song, previous))
+                song_ids.append(song["id"])
+        self.index.reindex_many(reindexed)
+        events = [self._apply_change(change) for change in changes if change["op"] not in song_ops]
+        return events + [SongsChanged(tuple(song_ids))]
+
+    def _apply_change(self, change):
+        """Aplica un delta sobre los datos y los índices. Retorna el evento correspondiente"""
+        op = change["op"]
+        if op == "add":
+            # ✅ La canción recuperada conserva su id y va al final (como un alta)
+            song = dict(change["song"])
+            self._touch(song)
+            self.user_data["songs"].append(song)
+            self.index.add(song)
+            return SongAdded(song["id"])
+        if op == "delete":
+            song = self.index.by_id[change["song"]["id"]]
+            self._tombstone(song)
+            self.index.remove(song)
+            self.user_data["songs"].remove(song)
+            return SongDeleted(song["id"])
+        if op == "update":
+            song = self.index.by_id[change["id"]]
+            previous = dict(song)
+            song.update(change["after"])
+            self._touch(song)
+            self.index.reindex(song, previous)
+            return SongUpdated(song["id"])
+        characters = self.user_data["characters"]
+        if op == "rename_character":
+            characters[characters.index(change["old"])] = change["new"]
+            if change.get("songs"):
+                self._replace_character(change["old"], change["new"])
+            return CharacterRenamed(change["old"], change["new"])
+        if op == "add_character":
+            characters.insert(change.get("position", len(characters)), change["name"])
+            return CharacterAdded(change["name"])
+        characters.remove(change["name"])
+        return CharacterRemoved(change["name"])
+
+    # ===== SINCRONIZACIÓN ENTRE DISPOSITIVOS =====
+
+    def _sync_meta(self):
+        meta = self.user_data.setdefault("sync", {})
+        meta.setdefault("clock", 0)
+        meta.setdefault("deleted", {})
+        return meta
+
+    def _touch(self, song):
+        """Sella una canción cambiada en este dispositivo (con los locks tomados)"""
+        meta = self._sync_meta()
+        meta["clock"] += 1
+        song["uid"] = song_uid(song)
+        song["stamp"] = song["seq"] = meta["clock"]
+        song["device"] = self.device_id
+        # Si la canción vuelve (deshacer un borrado), su lápida ya no aplica
+        meta["deleted"].pop(song["uid"], None)
+
+    def _tombstone(self, song):
+        """Deja constancia del borrado para que viaje en el próximo archivo de cambios"""
+        meta = self._sync_meta()
+        meta["clock"] += 1
+        meta["deleted"][song_uid(song)] = [meta["clock"], self.device_id, meta["clock"]]
+
+    def sync_status(self):
+        """{"device", "clock", "last_export", "tombstones"} de este dispositivo"""
+        with self.lock.read():
+            meta = self.user_data.get("sync", {})
+            return {
+                "device": self.device_id,
+                "clock": meta.get("clock", 0),
+                "last_export": meta.get("last_export", 0),
+                "tombstones": len(meta.get("deleted", {})),
+            }
+
+    @perf.timed("export_changes")
+    def export_changes(self, path, since=None, source=None):
+        """
+        Escribe en `path` los cambios con sello mayor que `since` (por
+        defecto, desde la última exportación; -1 exporta toda la biblioteca).
+        Retorna {"songs", "deleted", "since", "clock"}.
+        """
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            meta = self._sync_meta()
+            if since is None:
+                since = meta.get("last_export", 0)
+            changeset = build_changeset(
+                self.user_data["songs"], meta, self.user_data["characters"], since, self.device_id
+            )
+            write_changeset(path, changeset)
+            if meta.get("last_export") != meta["clock"]:
+                meta["last_export"] = meta["clock"]
+                self._commit()
+        self._publish_after_write(source, stale, [])
+        return {
+            "songs": len(changeset["songs"]),
+            "deleted": len(changeset["deleted"]),
+            "since": since,
+            "clock": changeset["clock"],
+        }
+
+    @perf.timed("import_changes")
+    def import_changes(self, path, source=None):
+        """
+        Fusiona un archivo de cambios de otro dispositivo. Por canción gana
+        el sello mayor (una edición posterior a un borrado lo revierte y al
+        revés), así que el resultado no depende del orden de importación.
+        Se guarda una vez y queda como una sola entrada del historial.
+        Retorna {"added", "updated", "deleted", "skipped", "pruned"} o None si el
+        archivo no se pudo leer.
+        """
+        try:
+            changeset = read_changeset(path)
+        except (OSError, ValueError) as e:
+            print(f"Error leyendo archivo de cambios: {e}")
+            return None
+        self._loaded.wait()
+        result = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0, "pruned": 0}
+        with self.lock.write(), self.file_lock:
+            stale = self._sync_with_disk()
+            meta = self._sync_meta()
+            tombs = meta["deleted"]
+            by_uid = {song_uid(song): song for song in self.user_data["songs"]}
+            changes, removed, added, reindexed = [], [], [], []
+            dirty = False
+            # Lo que se escribe aquí lleva un orden local nuevo: así se reenvía en la
+            # próxima exportación aunque su sello sea anterior a ella
+            seq = max(meta["clock"], changeset.get("clock", 0)) + 1
+
+            for uid, tomb in changeset.get("deleted", {}).items():
+                if not isinstance(tomb, list) or len(tomb) < 2:
+                    result["skipped"] += 1
+                    continue
+                tomb = tuple(tomb[:2])
+                local = by_uid.get(uid)
+                if local is not None:
+                    if song_stamp(local) >= tomb:
+                        result["skipped"] += 1
+                        continue
+                    removed.append(local)
+                    del by_uid[uid]
+                    changes.append({"op": "delete", "song": dict(local)})
+                if uid not in tombs or tuple(tombs[uid][:2]) < tomb:
+                    tombs[uid] = [*tomb, seq]
+                    dirty = True
+
+            next_id = self.index.max_id + 1
+            for record in changeset.get("songs", []):
+                record = incoming_record(record)
+                if record is None:
+                    result["skipped"] += 1
+                    continue
+                uid = record["uid"]
+                stamp = song_stamp(record)
+                local = by_uid.get(uid)
+                if local is None:
+                    if uid in tombs and tuple(tombs[uid][:2]) >= stamp:
+                        result["skipped"] += 1
+                        continue
+                    tombs.pop(uid, None)
+                    song = {"id": next_id, **record, "seq": seq}
+                    next_id += 1
+                    by_uid[uid] = song
+                    added.append(song)
+                    changes.append({"op": "add", "song": dict(song)})
+                elif song_stamp(local) < stamp:
+                    previous = dict(local)
+                    local.update(record)
+                    local["seq"] = seq
+                    reindexed.append((local, previous))
+                    changes.append(update_change(previous, local))
+                else:
+                    result["skipped"] += 1
+
+            characters = self.user_data["characters"]
+            new_characters = [c for c in dict.fromkeys(changeset.get("characters", [])) if c not in characters]
+            characters.extend(new_characters)
+            changes.extend({"op": "add_character", "name": c} for c in new_characters)
+
+            if removed:
+                self.index.remove_many(removed)
+                gone = {song["id"] for song in removed}
+                self.user_data["songs"] = [s for s in self.user_data["songs"] if s["id"] not in gone]
+            if added:
+                self.user_data["songs"].extend(added)
+                self.index.add_many(added)
+            if reindexed:
+                self.index.reindex_many(reindexed)
+
+            # Acuses: las lápidas que ya vieron todos los dispositivos conocidos se podan
+            if acknowledge(meta, changeset, self.device_id):
+                dirty = True
+                result["pruned"] = prune_tombstones(meta)
+
+            # ✅ Reloj de Lamport: los próximos cambios locales quedan después de los importados
+            clock = seq if changes or dirty else max(meta["clock"], changeset.get("clock", 0))
+            dirty = dirty or clock != meta["clock"]
+            meta["clock"] = clock
+            if changes or dirty:
+                self._commit()
+            self._record(f"Importar cambios de {changeset.get('device', '?')}", changes)
+
+        result.update(deleted=len(removed), added=len(added), updated=len(reindexed))
+        events = [CharacterAdded(c) for c in new_characters]
+        song_ids = tuple(s["id"] for s in removed + added + [song for song, _ in reindexed])
+        if song_ids:
+            events.append(SongsChanged(song_ids))
+        self._publish_after_write(source, stale, events)
+        return result
+
+    # ===== MANTENIMIENTO =====
+
+    @perf.timed("reindex")
+    def reindex(self):
+        """
+        Reconstruye desde user_data.json los índices en memoria, el snapshot
+        binario y el índice de letras. Retorna {"songs", "lyrics"}.
+        """
+        self._loaded.wait()
+        with self.lock.write(), self.file_lock:
+            self.user_data = self.load_user_data()
+            self.index = SongIndex.build(self.user_data["songs"])
+            self.index.set_presets(self.user_data.get("presets", []))
+            try:
+                self._json_signature = file_signature(self.data_file)
+            except OSError:
+                self._json_signature = None
+        self.flush_snapshot()
+        lyrics = self.rebuild_lyrics_index()
+        self._publish(None, [LibraryReloaded()])
+        return {"songs": len(self.index), "lyrics": lyrics}
+
+    @perf.timed("compact")
+    def compact(self):
+        """
+        Libera espacio: borra las letras de canciones que ya no existen (salvo
+        las que el historial aún puede restaurar), las quita del índice de
+        letras y rota las copias de seguridad. Retorna lo que se borró.
+        """
+        self._loaded.wait()
+        with self.lock.read():
+            live = {song_uid(song) for song in self.user_data["songs"]}
+        # Lo que deshacer o rehacer puede volver a traer conserva su letra
+        self.history.sync()
+        for entry in self.history.entries():
+            for change in entry["changes"]:
+                if "song" in change:
+                    live.add(song_uid(change["song"]))
+        removed = 0
+        with self.bodies.file_lock:
+            self.lyrics_index.sync()
+            for uid in self.bodies.uids():
+                if uid not in live:
+                    self.lyrics_index.remove(uid, body_terms(self.bodies.get(uid)))
+                    self.bodies.remove(uid)
+                    removed += 1
+            for uid in [uid for uid in self.lyrics_index.docs if uid not in live]:
+                self.lyrics_index.remove(uid)
+            self.lyrics_index.save()
+        before = len(self.backups.list())
+        self.backups.rotate()
+        return {"bodies": removed, "backups": before - len(self.backups.list())}
+
+    def stats(self):
+        """Resumen de la biblioteca: conteos, valores por dimensión y tamaños en disco"""
+        self._loaded.wait()
+        with self.lock.read():
+            facets = self.index.facet_counts()
+            data = {
+                "songs": len(self.index),
+                "version": self.version,
+                "characters": len(self.user_data.get("characters", [])),
+                "presets": len(self.user_data.get("presets", [])),
+                "by_key": facets["key"],
+                "by_character": facets["character"],
+                "by_tempo": facets["tempo"],
+            }
+        self.lyrics_index.sync()
+        data["lyrics"] = len(self.lyrics_index.docs)
+        data["history"] = self.history_labels()
+        data["backups"] = len(self.backups.list())
+        data["sync"] = self.sync_status()
+        data["files"] = {}
+        for name in ("user_data.json", "user_data.snapshot", "history.json"):
+            try:
+                data["files"][name] = os.path.getsize(os.path.join(self.data_dir, name))
+            except OSError:
+                pass
+        return data
+
+    # ===== BÚSQUEDA =====
+
+    @staticmethod
+    def song_matches(song, query="", key="", character="", tempo="", modes=None):
+        """Indica si una canción cumple los filtros (misma semántica que search_songs)"""
+        return song_matches(song, query, key, character, tempo, modes)
+
+    def _matching_bits(self, query, key, character, tempo, modes):
+        """Bitset de filtros exactos y texto combinados (None = sin filtros), y el bitset del texto"""
+        index = self.index
+        bits = index.filter_bits(key, character, tempo, modes)
+        title_bits = index.title_bits(query.lower()) if query else None
+        if title_bits is not None:
+            bits = title_bits if bits is None else bits & title_bits
+        return bits, title_bits
+
+    @perf.timed("search")
+    def search_songs(self, query="", key="", character="", tempo="", modes=None):
+        """
+        Busca canciones con filtros.
+        ✅ Soporta múltiples caracteres por canción.
+        ✅ key, character y tempo aceptan un valor o una lista de valores;
+           `modes` indica por dimensión si basta uno ("or", por defecto) o todos ("and").
+        ✅ Combina bitsets por valor en lugar de recorrer la lista.
+        """
+        with self.lock.read():
+            index = self.index
+            bits = index.filter_bits(key, character, tempo, modes)
+            query_lower = query.lower() if query else ""
+            titles = index.titles
+
+            if bits is None:
+                songs = list(self.get_all_songs())
+                if query_lower:
+                    songs = [s for s in songs if query_lower in titles[s["id"]]]
+                return songs
+
+            ids = index.ids_from_bits(bits)
+            if query_lower:
+                ids = [i for i in ids if query_lower in titles[i]]
+            return [index.by_id[i] for i in ids]
+
+    @perf.timed("search_facets")
+    def search_with_facets(self, query="", key="", character="", tempo="", modes=None):
+        """
+        Igual que search_songs, pero además retorna los conteos por tono,
+        carácter y tempo para la combinación actual de filtros.
+        Retorna {"songs": [...], "facets": {"key": {...}, "character": {...}, "tempo": {...}}}.
+        """
+        with self.lock.read():
+            index = self.index
+            bits, title_bits = self._matching_bits(query, key, character, tempo, modes)
+            if bits is None:
+                songs = list(self.get_all_songs())
+            else:
+                songs = [index.by_id[i] for i in index.ids_from_bits(bits)]
+            facets = index.facet_counts(key, character, tempo, title_bits, modes)
+        return {"songs": songs, "facets": facets}
+
+    def facet_counts(self, query="", key="", character="", tempo="", modes=None):
+        """Solo los conteos por tono, carácter y tempo (ver search_with_facets)"""
+        with self.lock.read():
+            index = self.index
+            title_bits = index.title_bits(query.lower()) if query else None
+            return index.facet_counts(key, character, tempo, title_bits, modes)
+
+    @perf.timed("query")
+    def query_songs(self, query="", key="", character="", tempo="", modes=None,
+                    sort="added", descending=False, offset=0, limit=None):
+        """
+        Búsqueda ordenada y paginada (mismos filtros que search_songs).
+        `sort` es "added" (orden de inserción), "title", "key" o "tempo".
+        Retorna {"songs": página, "total": coincidencias, "offset", "limit"}.
+        ✅ El orden sale de los índices mantenidos: nunca se ordena toda la biblioteca.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Orden no soportado: {sort}")
+        offset = max(0, offset)
+        end = None if limit is None else offset + max(0, limit)
+
+        with self.lock.read():
+            index = self.index
+            bits, _ = self._matching_bits(query, key, character, tempo, modes)
+
+            if bits is None:
+                total = len(index)
+                ids = list(islice(index.ordered_ids(sort, descending), offset, end))
+            else:
+                total = popcount(bits)
+                matches = index.ids_from_bits(bits)
+                if total * math.log2(total + 1) < len(index):
+                    # Pocas coincidencias: ordenarlas a ellas es más barato que recorrer el orden completo
+                    ids = sorted(matches, key=index.sort_key(sort), reverse=descending)[offset:end]
+                else:
+                    wanted = set(matches)
+                    ids = list(islice((i for i in index.ordered_ids(sort, descending) if i in wanted), offset, end))
+            songs = [index.by_id[i] for i in ids]
+
+        return {"songs": songs, "total": total, "offset": offset, "limit": limit}
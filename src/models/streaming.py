@@ -0,0 +1,87 @@
+"""
+Parseo incremental de user_data.json para el arranque progresivo.
+
+En lugar de json.load() sobre todo el archivo, recorre el objeto raíz
+clave por clave y entrega las canciones por lotes a medida que se parsean.
+"""
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def estimate_song_count(text):
+    """Estimación barata del total de canciones (cuenta las claves "id")"""
+    return text.count('"id":')
+
+
+def _skip_ws(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _expect(text, pos, char):
+    pos = _skip_ws(text, pos)
+    if pos >= len(text) or text[pos] != char:
+        raise ValueError(f"Se esperaba '{char}' en la posición {pos}")
+    return pos + 1
+
+
+def iter_user_data(text, first_batch=50, batch_size=2000):
+    """
+    Genera tuplas ("songs", lote) con las canciones parseadas y, al final,
+    ("data", dict) con el resto de claves del objeto raíz.
+    El primer lote es pequeño para poder pintar la primera pantalla cuanto antes.
+    Lanza ValueError si el JSON no tiene la forma esperada.
+    """
+    rest = {}
+    pos = _expect(text, 0, "{")
+    pos = _skip_ws(text, pos)
+    if pos < len(text) and text[pos] == "}":
+        yield "data", rest
+        return
+
+    size = first_batch
+    while True:
+        pos = _skip_ws(text, pos)
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _expect(text, pos, ":")
+        pos = _skip_ws(text, pos)
+
+        if key == "songs" and text.startswith("[", pos):
+            batch = []
+            pos = _skip_ws(text, pos + 1)
+            if text.startswith("]", pos):
+                pos += 1
+            else:
+                while True:
+                    pos = _skip_ws(text, pos)
+                    song, pos = _decoder.raw_decode(text, pos)
+                    batch.append(song)
+                    if len(batch) >= size:
+                        yield "songs", batch
+                        batch = []
+                        size = batch_size
+                    pos = _skip_ws(text, pos)
+                    if text.startswith(",", pos):
+                        pos += 1
+                    elif text.startswith("]", pos):
+                        pos += 1
+                        break
+                    else:
+                        raise ValueError(f"Lista de canciones mal formada en la posición {pos}")
+            if batch:
+                yield "songs", batch
+        else:
+            value, pos = _decoder.raw_decode(text, pos)
+            rest[key] = value
+
+        pos = _skip_ws(text, pos)
+        if text.startswith(",", pos):
+            pos += 1
+        elif text.startswith("}", pos):
+            break
+        else:
+            raise ValueError(f"Objeto raíz mal formado en la posición {pos}")
+
+    yield "data", rest
@@ -0,0 +1,178 @@
+"""
+Sincronización entre dispositivos con archivos de cambios.
+
+Cada canción lleva un sello de modificación: un reloj lógico (Lamport)
+que avanza con cada cambio local y se adelanta al importar, más el id del
+dispositivo que la escribió. El sello decide qué versión gana; qué se
+exporta lo decide el orden local ("seq"): el valor del reloj propio cuando
+la canción o la lápida se escribió aquí, por un cambio local o importado.
+Un archivo de cambios contiene solo lo escrito después del orden pedido,
+así que sincronizar 10 ediciones mueve unos 10 registros, y lo que llega
+de un tercer dispositivo se reenvía aunque su sello sea antiguo.
+
+Al importar, para cada canción gana el sello mayor (comparando
+(reloj, dispositivo)), también entre una edición y un borrado. Como el
+orden es total, dos dispositivos que se intercambian sus cambios acaban
+con los mismos datos sin importar el orden en que importen.
+
+Las lápidas no se guardan para siempre. Cada archivo de cambios lleva los
+acuses ("acks"): hasta qué reloj de cada dispositivo se importó sin huecos.
+Cuando todos los dispositivos de los que se recibieron cambios confirmaron
+un reloj, las lápidas con sello hasta el menor de esos acuses ya no hacen
+falta y se podan. Un dispositivo que nunca envió cambios no cuenta, así
+que conviene que todos intercambien en los dos sentidos.
+
+    song["uid"]      identidad estable entre dispositivos (el "id" es local)
+    song["stamp"]    reloj lógico del último cambio
+    song["device"]   dispositivo que hizo el último cambio
+    song["seq"]      reloj propio cuando se escribió en este dispositivo (no viaja)
+    user_data["sync"] = {"clock": 12, "last_export": 9, "deleted": {uid: [stamp, device, seq]},
+                         "imported": {dispositivo: reloj suyo importado},
+                         "peers": {dispositivo: reloj propio que confirmó}}
+"""
+import json
+import os
+import uuid
+
+CHANGESET_FORMAT = 1
+# Campos que identifican o fechan la canción en lugar de describirla
+SYNC_FIELDS = ("id", "uid", "stamp", "device", "seq")
+# Campos propios de cada dispositivo: no viajan en los archivos de cambios
+LOCAL_FIELDS = ("id", "seq")
+
+
+def new_uid():
+    return uuid.uuid4().hex[:16]
+
+
+def song_uid(song):
+    """
+    Identidad de la canción entre dispositivos (y nombre de su letra en
+    bodies/). Las canciones nuevas reciben un uid aleatorio al crearse; las
+    anteriores a la sincronización no tienen uid: se deriva del id, que
+    coincide en todas las copias del mismo user_data.json.
+    """
+    return song.get("uid") or f"id{song['id']}"
+
+
+def song_stamp(song):
+    """Sello comparable (reloj, dispositivo); 0 para canciones nunca sincronizadas"""
+    return (song.get("stamp", 0), song.get("device", ""))
+
+
+def read_device_id(data_dir):
+    """
+    Id de este dispositivo, en un archivo aparte de user_data.json para que
+    copiar la biblioteca a otro equipo no copie también la identidad.
+    """
+    path = os.path.join(data_dir, "device_id")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            device = f.read().strip()
+        if device:
+            return device
+    except OSError:
+        pass
+    device = uuid.uuid4().hex[:8]
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(device)
+    except OSError as e:
+        print(f"Error guardando el id del dispositivo: {e}")
+    return device
+
+
+def song_record(song):
+    """La canción tal como viaja en un archivo de cambios (sin el id ni el orden locales)"""
+    record = {k: v for k, v in song.items() if k not in LOCAL_FIELDS}
+    record["uid"] = song_uid(song)
+    record.setdefault("stamp", 0)
+    record.setdefault("device", "")
+    return record
+
+
+def incoming_record(record):
+    """
+    Canción de un archivo de cambios lista para fusionar: sin los campos
+    locales del otro dispositivo (su "id" pisaría el nuestro). None si no
+    es un objeto con un uid de texto.
+    """
+    if not isinstance(record, dict) or not isinstance(record.get("uid"), str) or not record["uid"]:
+        return None
+    return {k: v for k, v in record.items() if k not in LOCAL_FIELDS}
+
+
+def song_seq(song):
+    """Orden local de la canción (las escritas antes de existir "seq" usan su sello)"""
+    return song.get("seq", song.get("stamp", 0))
+
+
+def tomb_seq(tomb):
+    """Orden local de una lápida [sello, dispositivo, orden] (las antiguas no tienen orden)"""
+    return tomb[2] if len(tomb) > 2 else tomb[0]
+
+
+def build_changeset(songs, meta, characters, since, device):
+    """Cambios escritos aquí después de `since`: canciones, bajas y la lista de caracteres"""
+    return {
+        "format": CHANGESET_FORMAT,
+        "device": device,
+        "since": since,
+        "clock": meta.get("clock", 0),
+        "songs": [song_record(song) for song in songs if song_seq(song) > since],
+        "deleted": {uid: tomb[:2] for uid, tomb in meta.get("deleted", {}).items() if tomb_seq(tomb) > since},
+        "characters": list(characters),
+        "acks": dict(meta.get("imported", {})),
+    }
+
+
+def acknowledge(meta, changeset, device):
+    """
+    Anota lo que dice un archivo de cambios importado: hasta dónde se vio al
+    otro dispositivo (solo si no quedó un hueco desde la importación anterior)
+    y hasta dónde confirmó él a `device`. Retorna True si cambió algo.
+    """
+    peer = changeset.get("device")
+    if not peer:
+        return False
+    changed = False
+    imported = meta.setdefault("imported", {})
+    seen = imported.get(peer, 0)
+    if changeset.get("since", 0) <= seen < changeset.get("clock", 0):
+        imported[peer] = changeset["clock"]
+        changed = True
+    ack = changeset.get("acks", {}).get(device, 0)
+    peers = meta.setdefault("peers", {})
+    if ack > peers.get(peer, 0):
+        peers[peer] = ack
+        changed = True
+    return changed
+
+
+def prune_tombstones(meta):
+    """Quita las lápidas que ya confirmaron todos los dispositivos conocidos. Retorna cuántas quitó"""
+    peers = meta.get("peers")
+    if not peers:
+        return 0
+    watermark = min(peers.values())
+    deleted = meta.get("deleted", {})
+    pruned = [uid for uid, tomb in deleted.items() if tomb_seq(tomb) <= watermark]
+    for uid in pruned:
+        del deleted[uid]
+    return len(pruned)
+
+
+def write_changeset(path, changeset):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(changeset, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_changeset(path):
+    """Lee un archivo de cambios. Lanza ValueError si no tiene el formato esperado"""
+    with open(path, "r", encoding="utf-8") as f:
+        changeset = json.load(f)
+    if not isinstance(changeset, dict) or changeset.get("format") != CHANGESET_FORMAT:
+        raise ValueError("Formato de archivo de cambios no soportado")
+    return changeset
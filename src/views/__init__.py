@@ -6,11 +6,15 @@ from .song_form_view import SongFormView
 from .edit_view import EditView
 from .settings_view import SettingsView
 from .character_settings_view import CharacterSettingsView
+from .perf_view import PerfView
+from .backup_view import BackupView
 
 __all__ = [
     'MainView',
     'SongFormView', 
     'EditView',
     'SettingsView',
-    'CharacterSettingsView'
+    'CharacterSettingsView',
+    'PerfView',
+    'BackupView',
 ]
\ No newline at end of file
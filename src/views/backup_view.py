@@ -0,0 +1,151 @@
+"""
+Vista de copias de seguridad: crear una copia y restaurar un punto anterior
+"""
+import threading
+from datetime import datetime
+
+import flet as ft
+from components import create_header, show_confirmation_dialog, show_snackbar
+from .theme_utils import get_theme_colors
+
+
+class BackupView:
+    """Lista de copias (más reciente primero) con botón para restaurar cada una"""
+
+    def __init__(self, page, app):
+        self.page = page
+        self.app = app
+        self.backups_list = ft.Column([], spacing=8, scroll=ft.ScrollMode.AUTO, expand=True)
+        self.busy_text = ft.Text("", size=12)
+        self.busy_indicator = ft.Row(
+            [ft.ProgressRing(width=14, height=14, stroke_width=2, color="#00b894"), self.busy_text],
+            spacing=8,
+            visible=False,
+        )
+
+    def _set_busy(self, message):
+        """Muestra (o con None oculta) el indicador de trabajo en curso"""
+        self.busy_indicator.visible = message is not None
+        self.busy_text.value = message or ""
+        self._update_if_mounted(self.busy_indicator)
+
+    @staticmethod
+    def _update_if_mounted(control):
+        try:
+            control.update()
+        except (AssertionError, AttributeError):
+            pass
+
+    def refresh_backups_list(self):
+        """Vuelve a leer la lista de copias"""
+        colors = get_theme_colors(self.page)
+        self.backups_list.controls = [self._create_item(backup, colors) for backup in self.app.list_backups()]
+        if not self.backups_list.controls:
+            self.backups_list.controls.append(
+                ft.Text("Todavía no hay copias", size=14, color=colors["text_secondary"])
+            )
+        self._update_if_mounted(self.backups_list)
+
+    def _create_item(self, backup, colors):
+        created = datetime.fromtimestamp(backup["created"]).strftime("%d/%m/%Y %H:%M")
+        details = f"{backup['songs']} canciones · +{backup['new_bytes'] / 1024:.1f} KB"
+        if backup.get("label"):
+            details = f"{backup['label']} · {details}"
+        return ft.Container(
+            content=ft.Row([
+                ft.Icon(ft.Icons.HISTORY, color="#00b894", size=20),
+                ft.Column([
+                    ft.Text(created, size=15, color=colors["text_primary"], weight=ft.FontWeight.W_500),
+                    ft.Text(details, size=12, color=colors["text_secondary"]),
+                ], spacing=2, expand=True),
+                ft.IconButton(
+                    icon=ft.Icons.RESTORE,
+                    icon_color="#6c5ce7",
+                    icon_size=20,
+                    on_click=lambda e: self.restore_handler(backup, created),
+                    tooltip="Restaurar",
+                ),
+            ], spacing=12),
+            bgcolor=colors["bg_secondary"],
+            padding=14,
+            border_radius=12,
+            border=ft.border.all(1, colors["border_color"]),
+        )
+
+    def backup_handler(self, e):
+        """Crea una copia en segundo plano"""
+        self._set_busy("Creando copia...")
+
+        def on_complete(manifest):
+            self._set_busy(None)
+            if manifest is None:
+                show_snackbar(self.page, "No se pudo crear la copia", "#ff7675")
+                return
+            self.refresh_backups_list()
+            show_snackbar(self.page, f"Copia creada ({manifest['new_chunks']} bloques nuevos)", "#00b894")
+
+        self.app.backup_in_background("Manual", on_complete)
+
+    def restore_handler(self, backup, created):
+        """Pide confirmación y restaura la copia fuera del hilo de la interfaz"""
+        def restore():
+            self._set_busy("Restaurando...")
+            ok = self.app.restore_backup(backup["id"])
+            self._set_busy(None)
+            self.refresh_backups_list()
+            if ok:
+                show_snackbar(self.page, f"Biblioteca restaurada al {created}", "#00b894")
+            else:
+                show_snackbar(self.page, "No se pudo restaurar la copia", "#ff7675")
+
+        show_confirmation_dialog(
+            self.page,
+            "Restaurar copia",
+            f"La biblioteca volverá a como estaba el {created} ({backup['songs']} canciones). "
+            "Antes se guardará una copia del estado actual.",
+            lambda: threading.Thread(target=restore, daemon=True).start(),
+            confirm_text="Restaurar",
+        )
+
+    def build(self, main_view):
+        """Construye la vista de copias de seguridad"""
+        colors = get_theme_colors(self.page)
+        self.busy_text.color = colors["text_secondary"]
+        self.refresh_backups_list()
+
+        header = create_header(
+            self.page,
+            "Copias de Seguridad",
+            ["#fd79a8", "#fdcb6e"],
+            left_button=ft.IconButton(
+                icon=ft.Icons.ARROW_BACK,
+                icon_color="#ffffff",
+                icon_size=26,
+                on_click=lambda e: self.page.go("/settings"),
+                tooltip="Volver"
+            ),
+            right_buttons=[
+                ft.IconButton(
+                    icon=ft.Icons.BACKUP_OUTLINED,
+                    icon_color="#ffffff",
+                    on_click=self.backup_handler,
+                    tooltip="Crear copia ahora",
+                ),
+            ],
+        )
+
+        content = ft.Container(
+            content=ft.Column([
+                self.busy_indicator,
+                self.backups_list,
+            ], spacing=12, expand=True),
+            padding=16,
+            expand=True,
+        )
+
+        return ft.View(
+            "/settings/backups",
+            [header, content],
+            bgcolor=colors["bg_primary"],
+            padding=0,
+        )
@@ -2,7 +2,8 @@
 Vista para editar caracteres
 """
 import flet as ft
-from components import create_header, create_character_item, show_snackbar
+from models import CharacterAdded, CharacterRemoved, CharacterRenamed, LibraryReloaded
+from components import create_header, create_character_item, open_dialog, show_confirmation_dialog, show_snackbar
 from .theme_utils import get_theme_colors
 
 
@@ -13,7 +14,12 @@ class CharacterSettingsView:
         self.page = page
         self.app = app
         self.characters_list = ft.Column([], spacing=8, scroll=ft.ScrollMode.AUTO, expand=True)
+        self.character_items = {}  # nombre -> item de la lista
         self.new_character_field = self._create_new_character_field()
+        self._theme_mode = None
+
+        # ✅ La lista se parchea con los eventos de cambio del modelo
+        self.app.subscribe(self._on_app_event)
 
     def _create_new_character_field(self):
         colors = get_theme_colors(self.page)
@@ -37,33 +43,104 @@ class CharacterSettingsView:
 
     def refresh_characters_list(self):
         """Actualiza la lista de caracteres"""
+        self._theme_mode = self.page.session.get("theme_mode") or "dark"
         self.characters_list.controls.clear()
+        self.character_items = {}
         for char in self.app.get_characters():
-            self.characters_list.controls.append(
-                create_character_item(self.page, char, self.remove_character_handler)
-            )
+            self.characters_list.controls.append(self._create_item(char))
         self.page.update()
 
+    def _create_item(self, character):
+        item = create_character_item(self.page, character, self.remove_character_handler, self.show_rename_dialog)
+        self.character_items[character] = item
+        return item
+
+    def _on_app_event(self, event):
+        """Agrega o quita solo el item afectado"""
+        if isinstance(event, CharacterAdded):
+            self.characters_list.controls.append(self._create_item(event.name))
+        elif isinstance(event, CharacterRemoved):
+            item = self.character_items.pop(event.name, None)
+            if item is not None:
+                self.characters_list.controls.remove(item)
+        elif isinstance(event, CharacterRenamed):
+            item = self.character_items.pop(event.old, None)
+            if item is not None:
+                position = self.characters_list.controls.index(item)
+                self.characters_list.controls[position] = self._create_item(event.new)
+        elif isinstance(event, LibraryReloaded):
+            self._theme_mode = None  # se reconstruye al volver a la vista
+            return
+        else:
+            return
+        try:
+            self.characters_list.update()
+        except (AssertionError, AttributeError):
+            pass
+
     def add_character_handler(self, main_view):
         """Agrega un nuevo carácter"""
         if self.new_character_field.value and self.new_character_field.value.strip():
             if self.app.add_character(self.new_character_field.value.strip()):
                 self.new_character_field.value = ""
-                self.refresh_characters_list()
-                main_view.refresh_character_options()
                 show_snackbar(self.page, "Carácter agregado exitosamente", "#00b894")
 
     def remove_character_handler(self, character):
-        """Elimina un carácter"""
-        if self.app.remove_character(character):
-            self.refresh_characters_list()
-            show_snackbar(self.page, "Carácter eliminado exitosamente", "#ff7675")
+        """Elimina un carácter (y lo quita de sus canciones, previa confirmación)"""
+        def remove():
+            if self.app.remove_character(character):
+                show_snackbar(self.page, "Carácter eliminado exitosamente", "#ff7675")
+
+        count = self.app.character_usage(character)
+        if not count:
+            remove()
+            return
+        show_confirmation_dialog(
+            self.page,
+            "Eliminar carácter",
+            f"«{character}» se quitará de {count} canciones. ¿Continuar?",
+            remove,
+        )
+
+    def show_rename_dialog(self, character):
+        """Renombra un carácter; si el nombre nuevo ya existe, se fusionan"""
+        name_field = ft.TextField(
+            label="Nuevo nombre",
+            value=character,
+            autofocus=True,
+            helper_text="Si ya existe, las canciones se pasan a ese carácter",
+        )
+
+        def close(e=None):
+            dialog.open = False
+            self.page.update()
+
+        def save(e):
+            new = (name_field.value or "").strip()
+            if not new or new == character:
+                close()
+                return
+            merge = new in self.app.get_characters()
+            close()
+            if self.app.rename_character(character, new):
+                show_snackbar(self.page, f"Fusionado en «{new}»" if merge else "Carácter renombrado", "#00b894")
+
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"Renombrar «{character}»"),
+            content=name_field,
+            actions=[ft.TextButton("Cancelar", on_click=close), ft.TextButton("Guardar", on_click=save)],
+        )
+        open_dialog(self.page, dialog)
 
     def build(self, main_view):
         """Construye la vista de edición de caracteres"""
         colors = get_theme_colors(self.page)
         
         self.refresh_theme()
+
+        # ✅ Reconstruir la lista solo la primera vez o si cambió el tema
+        if self._theme_mode != (self.page.session.get("theme_mode") or "dark"):
+            self.refresh_characters_list()
         
         header = create_header(
             self.page,
@@ -13,36 +13,31 @@ class EditView(SongFormView):
         super().__init__(page, app, "/edit", "Editar Canción", ["#74b9ff", "#a29bfe"])
     
     def delete_from_edit(self, main_view):
-        editing_song = self.page.session.get("editing_song")
-        if not editing_song:
+        song_id = self.page.session.get("editing_song_id")
+        if song_id is None:
             return
 
         def on_confirm():
             try:
-                song_id = editing_song["id"]
-                
                 # ✅ Eliminar la canción
                 self.app.delete_song(song_id)
+                undo = main_view.undo_action()
                 
                 # ✅ Limpiar sesión
-                self.page.session.remove("editing_song")
+                self.page.session.remove("editing_song_id")
                 
                 # ✅ Limpiar formulario
                 self.clear_form()
                 
                 # ✅ CRÍTICO: Navegar de forma segura sin limpiar views
+                # (MainView quita la tarjeta con el evento SongDeleted)
                 self.page.go("/")
                 
-                # ✅ Pequeño delay para asegurar que la navegación se complete
-                import time
-                time.sleep(0.05)
-                
-                # ✅ Refrescar búsqueda después de navegar
-                if main_view:
-                    main_view.search_handler(None)
-                
                 # ✅ Mostrar confirmación
-                show_snackbar(self.page, "Canción eliminada exitosamente", "#ff7675")
+                show_snackbar(
+                    self.page, "Canción eliminada exitosamente", "#ff7675",
+                    "Deshacer", undo,
+                )
                 
                 self.page.update()
 
@@ -59,18 +54,13 @@ class EditView(SongFormView):
     
     def build(self, main_view, extra_buttons=None):
         """Construye la vista de edición con botón de eliminar"""
-        # ✅ Cargar datos de la canción al construir la vista
-        editing_song = self.page.session.get("editing_song")
-        if editing_song:
-            # ✅ CRÍTICO: Crear una COPIA del diccionario para evitar mutación
-            song_copy = {
-                "id": editing_song["id"],
-                "title": editing_song["title"],
-                "key": editing_song.get("key", ""),
-                "character": editing_song.get("character", ""),
-                "tempo": editing_song.get("tempo", "")
-            }
-            self.load_song_data(song_copy)
+        # ✅ Pedir el registro completo al abrir: es una copia (con letra y acordes),
+        # así que el formulario no puede modificar los datos compartidos
+        song_id = self.page.session.get("editing_song_id")
+        detail = self.app.get_song_detail(song_id) if song_id is not None else None
+        if detail:
+            self.load_song_data(detail)
+            self.load_body(detail)
         
         is_light = self.page.session.get("theme_mode") == "light"
         
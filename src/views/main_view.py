@@ -1,9 +1,17 @@
 """
 Vista principal con listado de canciones
 """
+import threading
+
 import flet as ft
-from models import MUSICAL_KEYS
-from components import create_song_card, create_header, create_empty_state
+from diagnostics import perf, startup
+from models import (
+    MUSICAL_KEYS, CharacterAdded, CharacterRemoved, CharacterRenamed, LibraryReloaded, PresetDeleted, PresetSaved,
+    SongAdded, SongDeleted, SongsChanged, SongSummary, SongUpdated,
+)
+from components import (
+    create_song_card, create_header, create_empty_state, open_dialog, show_confirmation_dialog, show_snackbar,
+)
 from .theme_utils import get_theme_colors
 
 
@@ -14,6 +22,9 @@ class MainView:
         self.page = page
         self.app = app
         self.results_column = ft.Column([], spacing=0, scroll=ft.ScrollMode.AUTO, expand=True)
+        self.song_cards = {}  # id de canción -> tarjeta mostrada
+        # ✅ La carga y los eventos llegan desde otros hilos: serializar los repintados
+        self.render_lock = threading.RLock()
         
         # Crear campos de búsqueda y filtros
         self.search_field = self._create_search_field()
@@ -21,6 +32,88 @@ class MainView:
         self.character_filter = self._create_character_filter()
         self.tempo_filter = self._create_tempo_filter()
         self.clear_button = self._create_clear_button()
+
+        # ✅ Búsqueda en letras (índice BM25): el texto busca en la letra en lugar del título
+        self.lyrics_mode = False
+        self.lyrics_button = ft.IconButton(
+            icon=ft.Icons.LYRICS_OUTLINED,
+            icon_color="#6c5ce7",
+            on_click=lambda e: self._toggle_lyrics_mode(),
+            tooltip="Buscar en letras",
+        )
+
+        # ✅ Filtros de selección múltiple: valores elegidos y modo (O / Y) por dimensión
+        self.selected = {"key": [], "character": [], "tempo": []}
+        self.modes = {"key": "or", "character": "or", "tempo": "or"}
+        self.selection_row = ft.Row([], spacing=6, run_spacing=6, wrap=True, visible=False)
+
+        # ✅ Vistas guardadas (presets): sus resultados los mantiene el modelo
+        self.active_preset = None
+        self.preset_filter = self._create_preset_filter()
+        self.save_preset_button = ft.IconButton(
+            icon=ft.Icons.BOOKMARK_ADD_OUTLINED,
+            icon_color="#6c5ce7",
+            on_click=lambda e: self._show_save_preset_dialog(),
+            tooltip="Guardar filtros como vista",
+        )
+        self.delete_preset_button = ft.IconButton(
+            icon=ft.Icons.BOOKMARK_REMOVE_OUTLINED,
+            icon_color="#ff7675",
+            on_click=lambda e: self._delete_active_preset(),
+            tooltip="Eliminar vista",
+            visible=False,
+        )
+
+        # ✅ Modo selección: editar o eliminar varias canciones en un solo guardado
+        self.selection_mode = False
+        self.selected_ids = set()
+        self.select_button = ft.IconButton(
+            icon=ft.Icons.CHECKLIST_ROUNDED,
+            icon_color="#6c5ce7",
+            on_click=lambda e: self._toggle_selection_mode(),
+            tooltip="Seleccionar varias",
+        )
+        self.selection_count = ft.Text("", size=13, weight=ft.FontWeight.BOLD, color="#6c5ce7")
+        self.bulk_bar = ft.Row([
+            self.selection_count,
+            ft.Container(expand=True),
+            ft.TextButton("Todas", on_click=lambda e: self._select_all_visible(), tooltip="Seleccionar las canciones mostradas"),
+            ft.IconButton(
+                icon=ft.Icons.EDIT_ROUNDED,
+                icon_color="#6c5ce7",
+                on_click=lambda e: self._show_bulk_edit_dialog(),
+                tooltip="Editar seleccionadas",
+            ),
+            ft.IconButton(
+                icon=ft.Icons.DELETE_OUTLINE,
+                icon_color="#ff7675",
+                on_click=lambda e: self._confirm_bulk_delete(),
+                tooltip="Eliminar seleccionadas",
+            ),
+            ft.IconButton(
+                icon=ft.Icons.CLOSE_ROUNDED,
+                on_click=lambda e: self._toggle_selection_mode(),
+                tooltip="Salir de la selección",
+            ),
+        ], spacing=4, vertical_alignment=ft.CrossAxisAlignment.CENTER, visible=False)
+
+        # ✅ Deshacer / rehacer: se habilitan según el historial del modelo
+        self.undo_button = self._create_history_button(ft.Icons.UNDO_ROUNDED, self.undo_handler)
+        self.redo_button = self._create_history_button(ft.Icons.REDO_ROUNDED, self.redo_handler)
+        self._refresh_history_buttons()
+
+        # ✅ Indicador de carga progresiva ("Cargando N/M")
+        self.loading_text = ft.Text("", size=12, color=get_theme_colors(self.page)["text_secondary"])
+        self.loading_indicator = ft.Row(
+            [ft.ProgressRing(width=14, height=14, stroke_width=2, color="#6c5ce7"), self.loading_text],
+            spacing=8,
+            visible=False,
+        )
+        self._first_page_shown = False
+        self._theme_mode = None  # tema con el que se pintaron las tarjetas
+
+        # ✅ Actualización incremental con los eventos de cambio del modelo
+        self.app.subscribe(self._on_app_event)
         
     def _create_search_field(self):
         colors = get_theme_colors(self.page)
@@ -31,7 +124,7 @@ class MainView:
             focused_border_color=colors["border_focused"],
             bgcolor=colors["bg_secondary"],
             color=colors["text_primary"],
-            on_change=lambda e: self.search_handler(e),
+            on_change=lambda e: self._filters_changed(),
             text_size=14,
             border_radius=12,
             expand=True,
@@ -47,7 +140,7 @@ class MainView:
             focused_border_color=colors["border_focused"],
             bgcolor=colors["bg_secondary"],
             color=colors["text_primary"],
-            on_change=lambda e: self.search_handler(e),
+            on_change=lambda e: self._toggle_filter_value("key", e.control),
             text_size=13,
             border_radius=12,
             expand=True,
@@ -63,7 +156,7 @@ class MainView:
             focused_border_color=colors["border_focused"],
             bgcolor=colors["bg_secondary"],
             color=colors["text_primary"],
-            on_change=lambda e: self.search_handler(e),
+            on_change=lambda e: self._toggle_filter_value("character", e.control),
             text_size=13,
             border_radius=12,
             expand=True,
@@ -83,13 +176,40 @@ class MainView:
             focused_border_color=colors["border_focused"],
             bgcolor=colors["bg_secondary"],
             color=colors["text_primary"],
-            on_change=lambda e: self.search_handler(e),
+            on_change=lambda e: self._toggle_filter_value("tempo", e.control),
             text_size=13,
             border_radius=12,
             expand=True,
             content_padding=ft.padding.symmetric(horizontal=12, vertical=8),
         )
     
+    def _create_preset_filter(self):
+        colors = get_theme_colors(self.page)
+        return ft.Dropdown(
+            hint_text="Vistas guardadas",
+            options=[ft.dropdown.Option(p["name"]) for p in self.app.get_presets()],
+            border_color=colors["border_color"],
+            focused_border_color=colors["border_focused"],
+            bgcolor=colors["bg_secondary"],
+            color=colors["text_primary"],
+            on_change=lambda e: self._open_preset(e.control.value),
+            text_size=13,
+            border_radius=12,
+            expand=True,
+            content_padding=ft.padding.symmetric(horizontal=12, vertical=8),
+        )
+
+    @staticmethod
+    def _create_history_button(icon, on_click):
+        return ft.IconButton(
+            icon=icon,
+            icon_color="#ffffff",
+            disabled_color=ft.Colors.with_opacity(0.35, "#ffffff"),
+            icon_size=22,
+            on_click=on_click,
+            disabled=True,
+        )
+
     def _create_clear_button(self):
         colors = get_theme_colors(self.page)
         return ft.Container(
@@ -109,39 +229,479 @@ class MainView:
             alignment=ft.alignment.center,
         )
     
+    @perf.timed("MainView.update_results")
     def update_results(self, songs):
-        """Actualiza los resultados mostrados"""
-        self.results_column.controls.clear()
-        if not songs:
-            self.results_column.controls.append(create_empty_state(self.page, "No hay canciones"))
+        """Actualiza los resultados mostrados (`songs` son SongSummary)"""
+        with self.render_lock:
+            self.results_column.controls.clear()
+            self.song_cards = {}
+            if not songs:
+                self.results_column.controls.append(create_empty_state(self.page, "No hay canciones"))
+            else:
+                for song in songs:
+                    card = self._create_card(song)
+                    self.results_column.controls.append(card)
+            self.page.update()
+        if songs or not self.app.is_loading:
+            startup.first_render(self.app.data_dir)
+
+    def _create_card(self, song):
+        card = create_song_card(self.page, song, self._on_card_click)
+        card.data = song.id
+        if song.id in self.selected_ids:
+            self._style_card(card, True)
+        self.song_cards[song.id] = card
+        return card
+
+    def _style_card(self, card, selected):
+        """Marca (o desmarca) una tarjeta seleccionada"""
+        colors = get_theme_colors(self.page)
+        card.border = ft.border.all(2, "#6c5ce7") if selected else ft.border.all(1, colors["border_color"])
+
+    def _on_card_click(self, song):
+        """En modo selección la tarjeta se marca; si no, se abre la edición"""
+        if not self.selection_mode:
+            self.go_to_edit(song)
+            return
+        song_id = song.id
+        if song_id in self.selected_ids:
+            self.selected_ids.discard(song_id)
         else:
-            for song in songs:
-                self.results_column.controls.append(
-                    create_song_card(self.page, song, self.go_to_edit)
-                )
+            self.selected_ids.add(song_id)
+        card = self.song_cards.get(song_id)
+        if card is not None:
+            self._style_card(card, song_id in self.selected_ids)
+            self._update_if_mounted(card)
+        self._refresh_bulk_bar()
+
+    # ===== SELECCIÓN Y EDICIÓN EN LOTE =====
+
+    def _toggle_selection_mode(self):
+        self.selection_mode = not self.selection_mode
+        if not self.selection_mode:
+            self._set_selection(set())
+        self.bulk_bar.visible = self.selection_mode
+        self._refresh_bulk_bar()
         self.page.update()
-    
+
+    def _select_all_visible(self):
+        self._set_selection(set(self.song_cards))
+        self._refresh_bulk_bar()
+        self.page.update()
+
+    def _set_selection(self, song_ids):
+        """Cambia la selección repintando solo las tarjetas que cambian de estado"""
+        with self.render_lock:
+            for song_id in self.selected_ids ^ song_ids:
+                card = self.song_cards.get(song_id)
+                if card is not None:
+                    self._style_card(card, song_id in song_ids)
+            self.selected_ids = song_ids
+
+    def _refresh_bulk_bar(self):
+        count = len(self.selected_ids)
+        self.selection_count.value = f"{count} seleccionada" + ("" if count == 1 else "s")
+        self._update_if_mounted(self.bulk_bar)
+
+    def _show_bulk_edit_dialog(self):
+        """Tono, ritmo y caracteres a aplicar a todas las seleccionadas"""
+        if not self.selected_ids:
+            return
+        characters = self.app.get_characters()
+        unchanged = "Sin cambios"
+
+        def dropdown(label, values):
+            return ft.Dropdown(
+                label=label,
+                value=unchanged,
+                options=[ft.dropdown.Option(unchanged)] + [ft.dropdown.Option(v) for v in values],
+            )
+
+        key_field = dropdown("Tono", MUSICAL_KEYS)
+        tempo_field = dropdown("Ritmo", ["Lenta", "Rápida"])
+        add_field = dropdown("Agregar carácter", characters)
+        remove_field = dropdown("Quitar carácter", characters)
+
+        def value(field):
+            return None if field.value in (None, unchanged) else field.value
+
+        def close(e=None):
+            dialog.open = False
+            self.page.update()
+
+        def apply(e):
+            close()
+            add, remove = value(add_field), value(remove_field)
+            changed = self.app.bulk_update(
+                list(self.selected_ids),
+                key=value(key_field),
+                tempo=value(tempo_field),
+                add_characters=[add] if add else (),
+                remove_characters=[remove] if remove else (),
+            )
+            show_snackbar(self.page, f"{len(changed)} canciones actualizadas", "#00b894", "Deshacer", self.undo_action())
+
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"Editar {len(self.selected_ids)} canciones"),
+            content=ft.Column([key_field, tempo_field, add_field, remove_field], tight=True, spacing=12),
+            actions=[ft.TextButton("Cancelar", on_click=close), ft.TextButton("Aplicar", on_click=apply)],
+        )
+        open_dialog(self.page, dialog)
+
+    def _confirm_bulk_delete(self):
+        if not self.selected_ids:
+            return
+        count = len(self.selected_ids)
+
+        def on_confirm():
+            deleted = self.app.bulk_delete(list(self.selected_ids))
+            show_snackbar(self.page, f"{len(deleted)} canciones eliminadas", "#ff7675", "Deshacer", self.undo_action())
+
+        show_confirmation_dialog(
+            self.page,
+            "Confirmar eliminación",
+            f"¿Eliminar las {count} canciones seleccionadas?",
+            on_confirm,
+        )
+
+    def _insert_position(self, song_id):
+        """Posición de una tarjeta nueva respetando el orden de los resultados"""
+        order = self.app.index.order
+        position = order.get(song_id, 0)
+        for i, control in enumerate(self.results_column.controls):
+            if control.data is not None and order.get(control.data, -1) > position:
+                return i
+        return len(self.results_column.controls)
+
+    def _patch_card(self, song_id):
+        """Actualiza solo la tarjeta de una canción (agregar, reemplazar o quitar)"""
+        with self.render_lock:
+            controls = self.results_column.controls
+            song = self.app.get_song(song_id)
+            matches = song is not None and self.app.song_matches(song, *self._current_filters())
+            if matches and self.lyrics_mode and self._search_text():
+                # La coincidencia en la letra no se sabe desde la canción: se mantiene si ya se mostraba
+                matches = song_id in self.song_cards
+            card = self.song_cards.pop(song_id, None)
+            if card is not None:
+                position = controls.index(card)
+                if matches:
+                    controls[position] = self._create_card(SongSummary.of(song))
+                else:
+                    controls.pop(position)
+            elif matches:
+                if not self.song_cards:
+                    controls.clear()  # quitar el estado vacío
+                controls.insert(self._insert_position(song_id), self._create_card(SongSummary.of(song)))
+            if not controls:
+                controls.append(create_empty_state(self.page, "No hay canciones"))
+            try:
+                self.results_column.update()
+            except (AssertionError, AttributeError):
+                # La vista principal no está en pantalla: se enviará al volver
+                pass
+
+    def _on_app_event(self, event):
+        """Aplica un evento de cambio del modelo (de esta sesión o de otra)"""
+        self._refresh_history_buttons()
+        if isinstance(event, (SongAdded, SongUpdated, SongDeleted)):
+            self._patch_card(event.song_id)
+            with self.render_lock:
+                self._apply_facets(self.app.facet_counts(*self._current_filters()))
+                for control in (self.key_filter, self.character_filter, self.tempo_filter):
+                    self._update_if_mounted(control)
+        elif isinstance(event, SongsChanged):
+            # ✅ Cambio en lote: una sola búsqueda y un solo repintado
+            with self.render_lock:
+                self.selected_ids = {i for i in self.selected_ids if self.app.get_song(i) is not None}
+            self._refresh_bulk_bar()
+            self._rerun_search()
+        elif isinstance(event, CharacterAdded):
+            self.character_filter.options.append(ft.dropdown.Option(event.name))
+            self._update_if_mounted(self.character_filter)
+        elif isinstance(event, CharacterRemoved):
+            self.character_filter.options = [
+                o for o in self.character_filter.options if o.key != event.name
+            ]
+            self._update_if_mounted(self.character_filter)
+            if event.name in self.selected["character"]:
+                self.selected["character"].remove(event.name)
+                self._refresh_selection_row()
+                self._filters_changed()
+        elif isinstance(event, CharacterRenamed):
+            for option in self.character_filter.options:
+                if option.key == event.old:
+                    option.key = event.new
+            values = self.selected["character"]
+            if event.old in values:
+                values[values.index(event.old)] = event.new
+                self._refresh_selection_row()
+                self._update_if_mounted(self.selection_row)
+            with self.render_lock:
+                self._apply_facets(self.app.facet_counts(*self._current_filters()))
+                self._update_if_mounted(self.character_filter)
+        elif isinstance(event, (PresetSaved, PresetDeleted)):
+            self._refresh_preset_options()
+            if isinstance(event, PresetDeleted) and event.name == self.active_preset:
+                self._filters_changed()
+            else:
+                self._update_if_mounted(self.preset_filter)
+        elif isinstance(event, LibraryReloaded):
+            self.refresh_character_options()
+            self._refresh_preset_options()
+            self._rerun_search()
+
+    @staticmethod
+    def _update_if_mounted(control):
+        try:
+            control.update()
+        except (AssertionError, AttributeError):
+            pass
+
+    def start_loading(self):
+        """Carga la biblioteca en segundo plano mostrando la primera pantalla en cuanto esté lista"""
+        self._first_page_shown = False
+        self.loading_text.value = "Cargando..."
+        self.loading_indicator.visible = True
+        self.app.load_in_background(self._on_load_progress, self._on_load_complete)
+
+    def _on_load_progress(self, loaded, total):
+        """Se llama desde el hilo de carga tras cada lote"""
+        self.loading_text.value = f"Cargando {loaded}/{total}"
+        if not self.app.is_loading:
+            # La carga terminó: _on_load_complete pintará los resultados
+            return
+        if not self._first_page_shown:
+            # ✅ Primer lote: pintar ya la primera pantalla
+            self._first_page_shown = True
+            self.search_handler(None)
+            return
+        try:
+            self.loading_indicator.update()
+        except (AssertionError, AttributeError):
+            pass
+
+    def _on_load_complete(self):
+        """Al terminar la carga se aplican los filtros escritos mientras tanto"""
+        self.loading_indicator.visible = False
+        self.refresh_character_options()
+        self.search_handler(None)
+
+    def _search_text(self):
+        return self.search_field.value.strip() if self.search_field.value else ""
+
+    def _current_filters(self):
+        """Texto, valores elegidos por dimensión y modos (argumentos de search_songs)"""
+        # En modo letras el texto no filtra por título: lo resuelve search_lyrics
+        query = "" if self.lyrics_mode else self._search_text()
+        return query, self.selected["key"], self.selected["character"], self.selected["tempo"], self.modes
+
+    def _filters_changed(self):
+        """Cualquier cambio manual de filtros deja de mostrar la vista guardada"""
+        self.active_preset = None
+        self.preset_filter.value = None
+        self.delete_preset_button.visible = False
+        self.search_handler(None)
+
+    def _rerun_search(self):
+        """Vuelve a pedir los resultados que se muestran (vista guardada, letras o títulos)"""
+        if self.active_preset:
+            self._open_preset(self.active_preset)
+        else:
+            self.search_handler(None)
+
+    def _refresh_preset_options(self):
+        names = [p["name"] for p in self.app.get_presets()]
+        self.preset_filter.options = [ft.dropdown.Option(name) for name in names]
+        if self.active_preset not in names:
+            self.preset_filter.value = None
+
+    def _open_preset(self, name):
+        """Aplica los filtros de una vista guardada y muestra su resultado materializado"""
+        preset = next((p for p in self.app.get_presets() if p["name"] == name), None)
+        songs = self.app.list_preset(name) if preset else None
+        if songs is None:
+            self._filters_changed()
+            return
+        self.active_preset = name
+        self.preset_filter.value = name
+        self.delete_preset_button.visible = True
+        # ✅ Una vista guardada en modo letras vuelve a buscar en las letras
+        self._set_lyrics_mode(bool(preset.get("lyrics")))
+        self.search_field.value = preset.get("lyrics") or preset["query"]
+        self.selected = {d: list(preset[d]) for d in ("key", "character", "tempo")}
+        self.modes = {"key": "or", "character": "or", "tempo": "or"}
+        self.modes.update(preset["modes"])
+        self._refresh_selection_row()
+        self._apply_facets(self.app.facet_counts(*self._current_filters()))
+        self.update_results(songs)
+
+    def _show_save_preset_dialog(self):
+        """Pide un nombre y guarda los filtros actuales como vista"""
+        name_field = ft.TextField(label="Nombre", value=self.active_preset or "", autofocus=True)
+
+        def close(e=None):
+            dialog.open = False
+            self.page.update()
+
+        def save(e):
+            name = (name_field.value or "").strip()
+            if not name:
+                return
+            close()
+            lyrics = self._search_text() if self.lyrics_mode else ""
+            self.app.save_preset(name, *self._current_filters(), lyrics=lyrics)
+            self._open_preset(name)
+
+        dialog = ft.AlertDialog(
+            title=ft.Text("Guardar vista"),
+            content=name_field,
+            actions=[ft.TextButton("Cancelar", on_click=close), ft.TextButton("Guardar", on_click=save)],
+        )
+        open_dialog(self.page, dialog)
+
+    def _delete_active_preset(self):
+        if self.active_preset:
+            self.app.delete_preset(self.active_preset)
+            self._refresh_preset_options()
+            self._filters_changed()
+
+    def _toggle_filter_value(self, dimension, dropdown):
+        """Elegir un valor en un filtro lo agrega a la selección (o lo quita si ya estaba)"""
+        value = dropdown.value
+        dropdown.value = None  # el dropdown vuelve a mostrar su placeholder
+        if not value or value in ("Tono", "Carácter", "Ritmo"):
+            return
+        values = self.selected[dimension]
+        if value in values:
+            values.remove(value)
+        else:
+            values.append(value)
+        self._refresh_selection_row()
+        self._filters_changed()
+
+    def _toggle_mode(self, dimension):
+        self.modes[dimension] = "and" if self.modes[dimension] == "or" else "or"
+        self._refresh_selection_row()
+        self._filters_changed()
+
+    def _remove_filter_value(self, dimension, value):
+        if value in self.selected[dimension]:
+            self.selected[dimension].remove(value)
+        self._refresh_selection_row()
+        self._filters_changed()
+
+    def _refresh_selection_row(self):
+        """Chips con los valores elegidos y, si hay varios, el botón O / Y de la dimensión"""
+        colors = get_theme_colors(self.page)
+        controls = []
+        for dimension, values in self.selected.items():
+            for value in values:
+                controls.append(ft.Chip(
+                    label=ft.Text(value, size=12, color=colors["text_primary"]),
+                    bgcolor=colors["bg_secondary"],
+                    on_delete=lambda e, d=dimension, v=value: self._remove_filter_value(d, v),
+                ))
+            if len(values) > 1:
+                is_and = self.modes[dimension] == "and"
+                controls.append(ft.TextButton(
+                    "Todos (Y)" if is_and else "Alguno (O)",
+                    on_click=lambda e, d=dimension: self._toggle_mode(d),
+                    tooltip="Cambiar entre coincidir con todos o con alguno",
+                ))
+        self.selection_row.controls = controls
+        self.selection_row.visible = bool(controls)
+
+    @perf.timed("MainView.search_handler")
     def search_handler(self, e):
         """Búsqueda con filtros"""
-        query = self.search_field.value.strip() if self.search_field.value else ""
-        key = self.key_filter.value if self.key_filter.value and self.key_filter.value != "Tono" else ""
-        character = self.character_filter.value if self.character_filter.value and self.character_filter.value != "Carácter" else ""
-        tempo = self.tempo_filter.value if self.tempo_filter.value and self.tempo_filter.value != "Ritmo" else ""
-        
-        songs = self.app.search_songs(query, key, character, tempo)
-        self.update_results(songs)
+        lyrics_query = self._search_text() if self.lyrics_mode else ""
+        if lyrics_query:
+            filters = self._current_filters()
+            self._apply_facets(self.app.facet_counts(*filters))
+            self.update_results(self.app.list_lyrics(lyrics_query, *filters[1:]))
+            return
+        result = self.app.list_songs(*self._current_filters())
+        self._apply_facets(result["facets"])
+        self.update_results(result["songs"])
+
+    def _toggle_lyrics_mode(self):
+        """Cambia entre buscar en los títulos y buscar en las letras"""
+        self._set_lyrics_mode(not self.lyrics_mode)
+        self._filters_changed()
+
+    def _set_lyrics_mode(self, enabled):
+        self.lyrics_mode = enabled
+        self.lyrics_button.icon = ft.Icons.LYRICS if self.lyrics_mode else ft.Icons.LYRICS_OUTLINED
+        self.lyrics_button.tooltip = "Buscar en títulos" if self.lyrics_mode else "Buscar en letras"
+        self.search_field.hint_text = "Buscar en letras..." if self.lyrics_mode else "Buscar canción..."
+
+    def _apply_facets(self, facets):
+        """Muestra en cada opción de los filtros cuántas canciones daría"""
+        for dimension, dropdown, placeholder in (
+            ("key", self.key_filter, "Tono"),
+            ("character", self.character_filter, "Carácter"),
+            ("tempo", self.tempo_filter, "Ritmo"),
+        ):
+            counts = facets[dimension]
+            selected = self.selected[dimension]
+            for option in dropdown.options:
+                if option.key != placeholder:
+                    mark = "✓ " if option.key in selected else ""
+                    option.text = f"{mark}{option.key} ({counts.get(option.key, 0)})"
     
     def clear_filters_handler(self, e):
         """Limpia todos los filtros"""
         self.search_field.value = ""
-        self.key_filter.value = "Tono"
-        self.character_filter.value = "Carácter"
-        self.tempo_filter.value = "Ritmo"
-        self.search_handler(None)
+        self.key_filter.value = None
+        self.character_filter.value = None
+        self.tempo_filter.value = None
+        self.selected = {"key": [], "character": [], "tempo": []}
+        self.modes = {"key": "or", "character": "or", "tempo": "or"}
+        self._refresh_selection_row()
+        self._filters_changed()
     
+    def undo_action(self):
+        """
+        Acción "Deshacer" para el aviso de la operación que se acaba de hacer:
+        revierte esa entrada del historial, no la última de cualquier sesión
+        """
+        entry_id = self.app.last_change_id()
+        return lambda e: self.undo_handler(e, entry_id)
+
+    def undo_handler(self, e, entry_id=None):
+        """Deshace la operación `entry_id` o, sin él (botón de la barra), la última de la biblioteca"""
+        label = self.app.undo(entry_id)
+        if label:
+            entry_id = self.app.last_change_id()
+            show_snackbar(self.page, f"Deshecho: {label}", "#6c5ce7", "Rehacer",
+                          lambda e: self.redo_handler(e, entry_id))
+        else:
+            show_snackbar(self.page, "No se pudo deshacer: los datos cambiaron", "#ff7675")
+        self._refresh_history_buttons()
+
+    def redo_handler(self, e, entry_id=None):
+        """Rehace la operación `entry_id` o, sin él, la última deshecha"""
+        label = self.app.redo(entry_id)
+        if label:
+            entry_id = self.app.last_change_id()
+            show_snackbar(self.page, f"Rehecho: {label}", "#6c5ce7", "Deshacer",
+                          lambda e: self.undo_handler(e, entry_id))
+        else:
+            show_snackbar(self.page, "No se pudo rehacer: los datos cambiaron", "#ff7675")
+        self._refresh_history_buttons()
+
+    def _refresh_history_buttons(self):
+        """Habilita deshacer/rehacer y muestra qué harían en el tooltip"""
+        labels = self.app.history_labels()
+        for button, kind, verb in ((self.undo_button, "undo", "Deshacer"), (self.redo_button, "redo", "Rehacer")):
+            button.disabled = not labels[kind]
+            button.tooltip = f"{verb}: {labels[kind]}" if labels[kind] else verb
+            self._update_if_mounted(button)
+
     def go_to_edit(self, song):
-        """Navega a la vista de edición"""
-        self.page.session.set("editing_song", song)
+        """Navega a la vista de edición (la sesión guarda solo el id; EditView pide el registro)"""
+        self.page.session.set("editing_song_id", song.id)
         self.page.go("/edit")
     
     def refresh_character_options(self):
@@ -153,31 +713,32 @@ class MainView:
     def refresh_theme(self):
         """Actualiza los estilos según el tema"""
         colors = get_theme_colors(self.page)
+        self._theme_mode = self.page.session.get("theme_mode") or "dark"
         # Actualizar search field
         self.search_field.border_color = colors["border_color"]
         self.search_field.bgcolor = colors["bg_secondary"]
         self.search_field.color = colors["text_primary"]
         # Actualizar filtros
-        for control in [self.key_filter, self.character_filter, self.tempo_filter]:
+        for control in [self.key_filter, self.character_filter, self.tempo_filter, self.preset_filter]:
             control.border_color = colors["border_color"]
             control.bgcolor = colors["bg_secondary"]
             control.color = colors["text_primary"]
+        self.loading_text.color = colors["text_secondary"]
+        self._refresh_selection_row()
         # Actualizar botón de limpiar
         self.clear_button.bgcolor = colors["bg_secondary"]
         self.clear_button.border = ft.border.all(1, colors["border_color"])
-        # Actualizar resultados (tarjetas)
-        self.update_results(self.app.search_songs(
-            self.search_field.value.strip() if self.search_field.value else "",
-            self.key_filter.value if self.key_filter.value and self.key_filter.value != "Tono" else "",
-            self.character_filter.value if self.character_filter.value and self.character_filter.value != "Carácter" else "",
-            self.tempo_filter.value if self.tempo_filter.value and self.tempo_filter.value != "Ritmo" else "",
-        ))
+        # Actualizar resultados (tarjetas) con la búsqueda activa, también en modo letras
+        self._rerun_search()
 
     def build(self):
         """Construye la vista"""
         colors = get_theme_colors(self.page)
         
-        self.refresh_theme()
+        # ✅ Las tarjetas se mantienen entre navegaciones (los eventos de cambio
+        # las mantienen al día); solo se repintan si cambió el tema
+        if self._theme_mode != (self.page.session.get("theme_mode") or "dark"):
+            self.refresh_theme()
         
         header = create_header(
             self.page,
@@ -200,6 +761,16 @@ class MainView:
                 ),
             ], spacing=12),
             right_buttons=[
+                # Deshacer / rehacer
+                ft.Container(
+                    content=ft.Row([self.undo_button, self.redo_button], spacing=0),
+                    height=48,
+                    alignment=ft.alignment.center,
+                    bgcolor=ft.Colors.with_opacity(0.18, "#ffffff"),
+                    border_radius=16,
+                    blur=14,
+                    border=ft.border.all(1, ft.Colors.with_opacity(0.15, "#ffffff")),
+                ),
                 # Configuración
                 ft.Container(
                     content=ft.IconButton(
@@ -248,6 +819,7 @@ class MainView:
             content=ft.Column([
                 ft.Row([
                     self.search_field,
+                    self.lyrics_button,
                     self.clear_button,
                 ], spacing=8, vertical_alignment=ft.CrossAxisAlignment.CENTER),
                 ft.Row([
@@ -255,6 +827,15 @@ class MainView:
                     self.character_filter,
                     self.tempo_filter,
                 ], spacing=8, expand=True),
+                ft.Row([
+                    self.preset_filter,
+                    self.save_preset_button,
+                    self.delete_preset_button,
+                    self.select_button,
+                ], spacing=4, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+                self.selection_row,
+                self.bulk_bar,
+                self.loading_indicator,
             ], spacing=12),
             padding=16,
         )
@@ -0,0 +1,80 @@
+import flet as ft
+from components import create_header
+from diagnostics import memory, perf, update_meter
+from .theme_utils import get_theme_colors
+
+
+class PerfView:
+    """Vista oculta /debug/perf con los tiempos y el medidor de updates (si están activados)"""
+
+    def __init__(self, page, app):
+        self.page = page
+        self.app = app
+        self.table = ft.Column([], spacing=6, scroll=ft.ScrollMode.AUTO, expand=True)
+
+    def _refresh(self, e=None):
+        colors = get_theme_colors(self.page)
+        self.table.controls = []
+        if perf.ENABLED:
+            self.table.controls.append(self._row(["Span", "N", "p50 ms", "p95 ms", "máx ms"], colors, bold=True))
+            for s in perf.stats():
+                self.table.controls.append(self._row(
+                    [s["name"], str(s["count"]), f"{s['p50']:.1f}", f"{s['p95']:.1f}", f"{s['max']:.1f}"], colors
+                ))
+        if update_meter.ENABLED:
+            self.table.controls.append(self._row(["page.update", "N", "controles", "KB", "redund."], colors, bold=True))
+            for s in update_meter.stats():
+                self.table.controls.append(self._row(
+                    [s["site"], str(s["calls"]), str(s["controls"]), f"{s['bytes'] / 1024:.1f}", str(s["redundant"])], colors
+                ))
+        if memory.ENABLED:
+            self.table.controls.append(ft.Text(
+                memory.report(limit=10), size=11, font_family="monospace", color=colors["text_secondary"], selectable=True
+            ))
+        if e is not None:
+            self.table.update()
+
+    def _reset(self, e):
+        perf.reset()
+        update_meter.reset()
+        memory.reset()
+        self._refresh(e)
+
+    @staticmethod
+    def _row(values, colors, bold=False):
+        weight = ft.FontWeight.BOLD if bold else ft.FontWeight.NORMAL
+        cells = [ft.Text(values[0], size=13, color=colors["text_primary"], weight=weight, expand=True)]
+        cells += [
+            ft.Text(v, size=13, color=colors["text_secondary"], weight=weight, width=64, text_align=ft.TextAlign.RIGHT)
+            for v in values[1:]
+        ]
+        return ft.Row(cells, spacing=8)
+
+    def build(self, main_view):
+        """Construye la vista de tiempos"""
+        colors = get_theme_colors(self.page)
+        self._refresh()
+
+        header = create_header(
+            self.page,
+            "Rendimiento",
+            ["#636e72", "#b2bec3"],
+            left_button=ft.IconButton(
+                icon=ft.Icons.ARROW_BACK,
+                icon_color="#ffffff",
+                icon_size=26,
+                on_click=lambda e: self.page.go("/"),
+                tooltip="Volver"
+            ),
+            right_buttons=[
+                ft.IconButton(icon=ft.Icons.REFRESH, icon_color="#ffffff", on_click=self._refresh, tooltip="Actualizar"),
+                ft.IconButton(icon=ft.Icons.DELETE_SWEEP, icon_color="#ffffff", on_click=self._reset, tooltip="Reiniciar"),
+            ],
+        )
+
+        return ft.View(
+            "/debug/perf",
+            [header, ft.Container(content=self.table, padding=16, expand=True)],
+            bgcolor=colors["bg_primary"],
+            padding=0,
+        )
@@ -96,6 +96,21 @@ class SettingsView:
             ink=True,
         )
 
+        backup_settings_btn = ft.Container(
+            content=ft.Row([
+                ft.Icon(ft.Icons.BACKUP_OUTLINED, size=22, color="#00b894"),
+                ft.Text("Copias de Seguridad", size=16, weight=ft.FontWeight.W_500, color=colors["text_primary"]),
+                ft.Container(expand=True),
+                ft.Icon(ft.Icons.ARROW_FORWARD_IOS, size=18, color=colors["text_secondary"]),
+            ], spacing=10),
+            bgcolor=colors["bg_secondary"],
+            padding=16,
+            border_radius=12,
+            border=ft.border.all(1, colors["border_color"]),
+            on_click=lambda e: self.page.go("/settings/backups"),
+            ink=True,
+        )
+
         content = ft.Container(
             content=ft.Column([
                 ft.Text("Preferencias", size=18, weight=ft.FontWeight.BOLD, color=colors["text_primary"]),
@@ -103,6 +118,8 @@ class SettingsView:
                 theme_settings_container,
                 ft.Container(height=16),
                 character_settings_btn,
+                ft.Container(height=8),
+                backup_settings_btn,
             ], spacing=8, expand=True),
             padding=16,
             expand=True,
@@ -4,7 +4,8 @@ Vista base para agregar/editar canciones con múltiples caracteres
 
 import flet as ft
 from time import sleep
-from models import MUSICAL_KEYS
+from diagnostics import perf
+from models import MUSICAL_KEYS, CharacterAdded, CharacterRemoved, CharacterRenamed, LibraryReloaded
 from components import create_header, show_snackbar
 from .theme_utils import get_theme_colors
 
@@ -31,6 +32,12 @@ class SongFormView:
         self.character_chips_row = ft.Row([], wrap=True, spacing=8)  # ✅ Chips de caracteres
         self.character_dropdown = self._create_character_dropdown()
         self.tempo_dropdown = self._create_tempo_dropdown()
+        # ✅ Letra y acordes: se guardan aparte y solo se leen al abrir la canción
+        self.lyrics_field = self._create_body_field("Letra")
+        self.chords_field = self._create_body_field("Acordes (p. ej. [Re]Santo, [La]santo)")
+
+        # ✅ Mantener las opciones de carácter al día con los eventos del modelo
+        self.app.subscribe(self._on_app_event)
 
     def _create_title_field(self):
         colors = get_theme_colors(self.page)
@@ -44,6 +51,21 @@ class SongFormView:
             border_radius=12,
         )
 
+    def _create_body_field(self, label):
+        colors = get_theme_colors(self.page)
+        return ft.TextField(
+            label=label,
+            multiline=True,
+            min_lines=3,
+            max_lines=12,
+            border_color=colors["border_color"],
+            focused_border_color=colors["border_focused"],
+            bgcolor=colors["bg_secondary"],
+            color=colors["text_primary"],
+            text_size=14,
+            border_radius=12,
+        )
+
     def _create_key_dropdown(self):
         colors = get_theme_colors(self.page)
         # ✅ Agregar opción placeholder al inicio
@@ -200,7 +222,8 @@ class SongFormView:
         """Actualiza los estilos según el tema"""
         colors = get_theme_colors(self.page)
 
-        for control in [self.title_field, self.key_dropdown, self.character_dropdown, self.tempo_dropdown]:
+        for control in [self.title_field, self.key_dropdown, self.character_dropdown, self.tempo_dropdown,
+                        self.lyrics_field, self.chords_field]:
             control.border_color = colors["border_color"]
             control.bgcolor = colors["bg_secondary"]
             control.color = colors["text_primary"]
@@ -213,6 +236,8 @@ class SongFormView:
         self.key_dropdown.value = self.PLACEHOLDER_TONO
         self.character_dropdown.value = self.PLACEHOLDER_CARACTER
         self.tempo_dropdown.value = self.PLACEHOLDER_TEMPO
+        self.lyrics_field.value = ""
+        self.chords_field.value = ""
         self.selected_characters = []
         self._update_character_chips()
         
@@ -222,6 +247,8 @@ class SongFormView:
             self.key_dropdown.update()
             self.character_dropdown.update()
             self.tempo_dropdown.update()
+            self.lyrics_field.update()
+            self.chords_field.update()
         except Exception:
             pass
 
@@ -250,13 +277,20 @@ class SongFormView:
         
         self._update_character_chips()
 
+    def load_body(self, body):
+        """Carga la letra y los acordes en el formulario"""
+        self.lyrics_field.value = body.get("lyrics", "") if body else ""
+        self.chords_field.value = body.get("chords", "") if body else ""
+
+    @perf.timed("SongFormView.save_song_handler")
     def save_song_handler(self, main_view):
         """Guarda la canción (agregar o editar)"""
         if not self.title_field.value or not self.title_field.value.strip():
             show_snackbar(self.page, "El nombre de la canción es obligatorio", "#ff7675")
             return
 
-        editing_song = self.page.session.get("editing_song")
+        # ✅ Solo la vista de edición actualiza (la sesión puede conservar el id al volver atrás)
+        editing_id = self.page.session.get("editing_song_id") if self.route == "/edit" else None
         
         # ✅ Validar y obtener valores reales (no placeholders)
         key_value = self.key_dropdown.value
@@ -279,29 +313,77 @@ class SongFormView:
             )
             return
 
-        if editing_song:
-            self.app.update_song(
-                editing_song["id"],
+        if editing_id is not None:
+            updated = self.app.update_song(
+                editing_id,
                 title=self.title_field.value.strip(),
                 key=key_value,
                 character=characters_str,
                 tempo=tempo_value
             )
-            self.page.session.remove("editing_song")
-            show_snackbar(self.page, "Canción actualizada exitosamente", "#00b894")
+            self.page.session.remove("editing_song_id")
+            if updated:
+                self.app.save_body(editing_id, self.lyrics_field.value, self.chords_field.value)
+                show_snackbar(self.page, "Canción actualizada exitosamente", "#00b894")
+            else:
+                # ✅ Otra sesión (u otro proceso) la eliminó mientras se editaba
+                show_snackbar(self.page, "No se pudo guardar: la canción ya no existe", "#ff7675")
         else:
-            self.app.add_song(
+            song = self.app.add_song(
                 self.title_field.value.strip(),
                 key=key_value,
                 character=characters_str,
                 tempo=tempo_value
             )
-            show_snackbar(self.page, "Canción agregada exitosamente", "#00b894")
-
+            undo = main_view.undo_action()
+            if self.lyrics_field.value or self.chords_field.value:
+                self.app.save_body(song["id"], self.lyrics_field.value, self.chords_field.value)
+            # ✅ Avisar si ya había una canción con un título casi igual
+            duplicates = self.app.find_duplicates(song["title"], song["id"])
+            if duplicates:
+                show_snackbar(
+                    self.page,
+                    f"Canción agregada. Posible duplicado de «{duplicates[0].title}»",
+                    "#e17055",
+                    "Deshacer",
+                    undo,
+                )
+            else:
+                show_snackbar(self.page, "Canción agregada exitosamente", "#00b894")
+
+        # ✅ MainView actualiza la tarjeta afectada con el evento de cambio
         self.clear_form()
-        main_view.search_handler(None)
         self.page.go("/")
 
+    def _on_app_event(self, event):
+        """Parchea solo la opción de carácter afectada"""
+        if isinstance(event, CharacterAdded):
+            self.character_dropdown.options.append(ft.dropdown.Option(event.name))
+        elif isinstance(event, CharacterRemoved):
+            self.character_dropdown.options = [
+                o for o in self.character_dropdown.options if o.key != event.name
+            ]
+            # ✅ No volver a escribir un carácter eliminado (o fusionado en otro)
+            if event.name in self.selected_characters:
+                self.selected_characters.remove(event.name)
+                self._update_character_chips()
+        elif isinstance(event, CharacterRenamed):
+            for option in self.character_dropdown.options:
+                if option.key == event.old:
+                    option.key = event.new
+            if event.old in self.selected_characters:
+                position = self.selected_characters.index(event.old)
+                self.selected_characters[position] = event.new
+                self._update_character_chips()
+        elif isinstance(event, LibraryReloaded):
+            self.refresh_character_options()
+        else:
+            return
+        try:
+            self.character_dropdown.update()
+        except (AssertionError, AttributeError):
+            pass
+
     def refresh_character_options(self):
         """Actualiza las opciones de caracteres en el dropdown"""
         # ✅ Mantener el placeholder al inicio
@@ -314,6 +396,9 @@ class SongFormView:
         colors = get_theme_colors(self.page)
 
         self.refresh_theme()
+        # ✅ El formulario se crea antes de que termine la carga en segundo plano:
+        # sin esto mostraría los caracteres por defecto y no los de la biblioteca
+        self.refresh_character_options()
 
         right_buttons = []
 
@@ -333,11 +418,11 @@ class SongFormView:
             ),
             right_buttons=right_buttons
         )
-        editing_song = self.page.session.get("editing_song")
+        editing = self.route == "/edit" and self.page.session.get("editing_song_id") is not None
 
         save_button = ft.ElevatedButton(
-            text="Guardar cambios" if editing_song else "Añadir canción",
-            icon=ft.Icons.SAVE if editing_song else ft.Icons.ADD,
+            text="Guardar cambios" if editing else "Añadir canción",
+            icon=ft.Icons.SAVE if editing else ft.Icons.ADD,
             on_click=lambda e: self.save_song_handler(main_view),
             style=ft.ButtonStyle(
                 shape=ft.RoundedRectangleBorder(radius=12),
@@ -397,6 +482,9 @@ class SongFormView:
                     ft.Container(content=self.tempo_dropdown, expand=True),
                     clear_tempo_button,
                 ], spacing=8),
+                ft.Container(height=8),
+                self.lyrics_field,
+                self.chords_field,
                 ft.Container(height=22),
                 ft.Row(
                     [
@@ -407,8 +495,9 @@ class SongFormView:
                     ],
                     alignment=ft.MainAxisAlignment.CENTER,
                 ),
-            ], spacing=8),
+            ], spacing=8, scroll=ft.ScrollMode.AUTO),
             padding=16,
+            expand=True,
         )
 
         return ft.View(